@@ -1,26 +1,91 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
+import argparse
 import logging
-from typing import Any, Optional
+import time
+from typing import TYPE_CHECKING, Any, Optional, TextIO
+
+from arrsync.config import (
+    configure_logging,
+    create_config_parser,
+    logger,
+    parse_args,
+    set_debug_level,
+)
+
+if TYPE_CHECKING:
+    from arrsync.metrics import MetricsRegistry
+
+
+def run(
+    args: argparse.Namespace,
+    config_file: TextIO,
+    registry: Optional[MetricsRegistry] = None,
+) -> None:
+    # Importing requests, pydantic and the models is most of the startup time,
+    # so --help and argument errors do without them
+    from arrsync import cli
+
+    dry_run = True if args.dry_run else False
+
+    config_parser = create_config_parser()
 
-from arrsync import cli
-from arrsync.config import create_config_parser, parse_args, set_debug_level
+    config_parser.read_file(config_file)
+
+    if args.check_config:
+        if not cli.check_config(config_parser, cache_path=args.config_cache):
+            raise SystemExit(1)
+
+        return
+
+    cli.main(
+        config_parser,
+        dry_run,
+        metrics_path=args.metrics,
+        metrics_format=args.metrics_format,
+        registry=registry,
+        profile=True if args.profile else False,
+        profile_dir=args.profile_dir,
+        plan_path=args.plan,
+        apply_path=args.apply,
+        cache_path=args.config_cache,
+    )
 
 
 def main(args: Optional[Any] = None) -> None:
     args = parse_args(args=args)
 
+    configure_logging()
+
     debug = True if args.debug else False
-    dry_run = True if args.dry_run else False
 
     if debug:
         set_debug_level(logging.DEBUG)
 
-    config_parser = create_config_parser()
+    registry = None
+
+    if args.metrics_port is not None:
+        from arrsync.metrics import MetricsRegistry, serve_metrics
+
+        registry = MetricsRegistry()
+        serve_metrics(registry, args.metrics_host, args.metrics_port)
+
+    run(args, args.config, registry)
 
-    config_parser.read_file(args.config)
+    # A plan is made or applied, or the config checked, once, so --interval does not
+    # repeat it
+    while args.interval and not (args.plan or args.apply or args.check_config):
+        time.sleep(args.interval)
 
-    cli.main(config_parser, dry_run)
+        try:
+            # Re-read the config every cycle so edits are picked up without a restart
+            with open(args.config.name) as config_file:
+                run(args, config_file, registry)
+        except Exception as e:
+            logger.error("failed to run sync jobs")
+            logger.error(e)
 
 
 if __name__ == "__main__":
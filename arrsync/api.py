@@ -2,43 +2,174 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict
+import codecs
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+from urllib import parse
 
+from pydantic import TypeAdapter
+from requests.adapters import HTTPAdapter
 from requests.models import Response
 from requests.sessions import Session
 
 from arrsync import routes
+from arrsync.breaker import CircuitBreaker
 from arrsync.common import (
+    Albums,
     ContentItem,
     ContentItems,
+    Index,
     Initialize,
     JobType,
     Language,
     Languages,
+    LidarrAlbum,
     LidarrContent,
     Profile,
     Profiles,
     RadarrContent,
+    RootFolder,
+    RootFolders,
     SonarrContent,
     Status,
     Tag,
     Tags,
+    Timeouts,
 )
 from arrsync.config import logger
+from arrsync.metrics import JobMetrics
+from arrsync.retry import (
+    RetryPolicy,
+    get_backoff,
+    get_retry_after,
+    is_retryable_error,
+    is_retryable_status,
+)
 from arrsync.utils import _assert_never
 
 
+class ApiError(Exception):
+    """An error status returned by the server, keeping the status and body"""
+
+    status_code: int
+    body: str
+
+    def __init__(self, message: str, status_code: int, body: str = ""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+@lru_cache(maxsize=None)
+def get_content_adapter(job_type: JobType) -> TypeAdapter[ContentItems]:
+    """Return the validator for a content response of job_type, which parses and
+    validates the whole body in one pass without building the JSON as dicts"""
+
+    if job_type is JobType.Sonarr:
+        return TypeAdapter(List[SonarrContent])  # type: ignore[arg-type]
+    elif job_type is JobType.Radarr:
+        return TypeAdapter(List[RadarrContent])  # type: ignore[arg-type]
+    elif job_type is JobType.Lidarr:
+        return TypeAdapter(List[LidarrContent])  # type: ignore[arg-type]
+    else:
+        _assert_never(job_type)
+
+
+# Bytes to read from a streamed response at a time
+STREAM_READ_SIZE = 65536
+
+# Whitespace and the commas between the items of a JSON array
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+class JsonArrayReader(object):
+    """Decodes the items of a JSON array incrementally from pieces of its text, so
+    the whole array never has to be held in memory at once"""
+
+    def __init__(self) -> None:
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Return the items completed by text, keeping any partial item for the
+        next call"""
+
+        self.buffer += text
+        items: List[Any] = []
+        index = 0
+
+        while not self.finished:
+            index = SEPARATORS.match(self.buffer, index).end()  # type: ignore[union-attr]
+
+            if index == len(self.buffer):
+                break
+
+            if not self.started or self.buffer[index] == "]":
+                index = self._bracket(index)
+                continue
+
+            try:
+                item, index = self.decoder.raw_decode(self.buffer, index)
+            except json.JSONDecodeError:
+                # Most likely the rest of the item is in the next piece
+                break
+
+            items.append(item)
+
+        self.buffer = self.buffer[index:]
+        return items
+
+    def _bracket(self, index: int) -> int:
+        bracket = "]" if self.started else "["
+
+        if self.buffer[index] != bracket:
+            raise ValueError(f"expected '{bracket}' in a JSON array")
+
+        self.finished = self.started
+        self.started = True
+        return index + 1
+
+    def close(self) -> None:
+        if not self.finished or self.buffer.strip():
+            raise ValueError("response ended before the end of its JSON array")
+
+
 class Api(object):
     session: Session
     job_type: JobType
     url: str
+    metrics: JobMetrics
+    retry: RetryPolicy
 
     def __init__(
-        self, job_type: JobType, url: str, api_key: str, headers: Dict[str, str] = {}
+        self,
+        job_type: JobType,
+        url: str,
+        api_key: str,
+        headers: Dict[str, str] = {},
+        metrics: Optional[JobMetrics] = None,
+        retry: Optional[RetryPolicy] = None,
+        pool_size: int = 10,
+        breaker: Optional[CircuitBreaker] = None,
+        timeout: Optional[Timeouts] = None,
+        chunk_size: int = 0,
     ):
         self.session = Session()
+        # Size the connection pool for concurrent requests to this host
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
         self.job_type = job_type
         self.url = self._normalize_url(url)
+        self.metrics = metrics if metrics else JobMetrics(self.url)
+        self.retry = retry if retry else RetryPolicy()
+        self.breaker = breaker
+        self.timeout = timeout
+        self.chunk_size = chunk_size
 
         if api_key == "":
             init = self.initialize()
@@ -54,26 +185,136 @@ class Api(object):
     def _normalize_url(self, url: str) -> str:
         return url if url.endswith("/") else f"{url}/"
 
-    def _response_json(self, response: Response, url: str) -> Any:
+    def _route(self, url: str) -> str:
+        route = url[len(self.url) :] if url.startswith(self.url) else url
+        # Record requests for single items under one route
+        return re.sub(r"/\d+(?=/|$)", "/{id}", route.split("?")[0])
+
+    def _record(
+        self, url: str, response: Response, started: float, stream: bool = False
+    ) -> None:
+        # Reading the content of a streamed response would load all of it
+        size = (
+            int(response.headers.get("Content-Length", 0))
+            if stream
+            else len(response.content)
+        )
+
+        self.metrics.record_request(
+            route=self._route(url),
+            status=response.status_code,
+            size=size,
+            latency=time.monotonic() - started,
+            host=parse.urlparse(url).netloc,
+        )
+
+    def _raise_for_status(self, response: Response, url: str) -> None:
         if not response.ok:
-            raise Exception(
-                f"failed to check status for {url} got {response.status_code}"
+            raise ApiError(
+                f"failed to check status for {url} got {response.status_code}",
+                status_code=response.status_code,
+                body=response.text,
             )
 
-        if not response.text:
+    def _response_body(self, response: Response, url: str) -> bytes:
+        self._raise_for_status(response=response, url=url)
+
+        # Check the raw body, decoding a large library to text is not free
+        if not response.content:
             logger.error("%s response_text: %s", url, response.text)
             raise Exception(
                 f"no response in status for {url}. Is the server set up correctly?"
             )
 
+        return response.content
+
+    def _response_json(self, response: Response, url: str) -> Any:
+        self._response_body(response=response, url=url)
         return response.json()
 
+    def _send(self, method: str, url: str, **kwargs: Any) -> Response:
+        started = time.monotonic()
+        response = self.session.request(
+            method=method, url=url, timeout=self.timeout, **kwargs
+        )
+        self._record(
+            url=url,
+            response=response,
+            started=started,
+            stream=kwargs.get("stream", False),
+        )
+        return response
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> Response:
+        """Send a request through the breaker, if there is one"""
+
+        if not self.breaker:
+            return self._retry_request(method, url, **kwargs)
+
+        self.breaker.check()
+
+        try:
+            response = self._retry_request(method, url, **kwargs)
+        except Exception as e:
+            self.breaker.record_error(e)
+            raise
+
+        self.breaker.record_status(response.status_code)
+        return response
+
+    def _retry_request(self, method: str, url: str, **kwargs: Any) -> Response:
+        """Send a request, retrying failures that are safe to retry for method"""
+
+        attempt = 0
+
+        while True:
+            retry_after: Optional[float] = None
+
+            try:
+                response = self._send(method, url, **kwargs)
+            except Exception as e:
+                if attempt >= self.retry.retries or not is_retryable_error(method, e):
+                    raise
+                reason = type(e).__name__
+            else:
+                if attempt >= self.retry.retries or not is_retryable_status(
+                    method, response.status_code
+                ):
+                    return response
+                reason = str(response.status_code)
+                retry_after = get_retry_after(response)
+                # Free the connection of a streamed response for the retry
+                response.close()
+
+            delay = get_backoff(self.retry, attempt, retry_after)
+            attempt += 1
+
+            self.metrics.record_retry(self._route(url))
+            logger.warning(
+                "%s %s failed with %s, retrying in %.2fs (%d of %d)",
+                method,
+                url,
+                reason,
+                delay,
+                attempt,
+                self.retry.retries,
+            )
+            time.sleep(delay)
+
     def get(self, url: str) -> Any:
-        response = self.session.get(url=url)
+        response = self._request("GET", url=url)
         return self._response_json(response=response, url=url)
 
+    def get_body(self, url: str) -> bytes:
+        response = self._request("GET", url=url)
+        return self._response_body(response=response, url=url)
+
     def post(self, url: str, json: Dict[Any, Any]) -> Any:
-        response = self.session.post(url=url, json=json)
+        response = self._request("POST", url=url, json=json)
+        return self._response_json(response=response, url=url)
+
+    def put(self, url: str, json: Dict[Any, Any]) -> Any:
+        response = self._request("PUT", url=url, json=json)
         return self._response_json(response=response, url=url)
 
     def initialize(self) -> Initialize:
@@ -89,44 +330,127 @@ class Api(object):
     def profile(self) -> Profiles:
         full_url = routes.profile(job_type=self.job_type, url=self.url)
         json = self.get(url=full_url)
-        return list(map(Profile.model_validate, json))
+        return Index(map(Profile.model_validate, json))
 
     def tag(self) -> Tags:
         full_url = routes.tag(job_type=self.job_type, url=self.url)
         json = self.get(url=full_url)
-        return list(map(Tag.model_validate, json))
+        return Index(map(Tag.model_validate, json))
+
+    def album(self) -> Albums:
+        full_url = routes.album(job_type=self.job_type, url=self.url)
+        json = self.get(url=full_url)
+        return list(map(LidarrAlbum.model_validate, json))
+
+    def monitor_albums(self, album_ids: List[int], monitored: bool) -> Any:
+        full_url = routes.album_monitor(job_type=self.job_type, url=self.url)
+        return self.put(
+            url=full_url, json={"albumIds": album_ids, "monitored": monitored}
+        )
+
+    def root_folder(self) -> RootFolders:
+        full_url = routes.root_folder(job_type=self.job_type, url=self.url)
+        json = self.get(url=full_url)
+        return list(map(RootFolder.model_validate, json))
+
+    def create_tag(self, label: str) -> Tag:
+        full_url = routes.tag(job_type=self.job_type, url=self.url)
+        json = self.post(url=full_url, json={"label": label})
+        return Tag.model_validate(json)
 
     def language(self) -> Languages:
         # Only Sonarr supports setting languageProfileId
         if self.job_type != JobType.Sonarr:
-            return []
+            return Index()
 
         full_url = routes.language(job_type=self.job_type, url=self.url)
         json = self.get(url=full_url)
-        return list(map(Language.model_validate, json))
+        return Index(map(Language.model_validate, json))
 
     def metadata(self) -> Profiles:
         # Only Lidarr supports setting metadataProfileId
         if self.job_type != JobType.Lidarr:
-            return []
+            return Index()
 
         full_url = routes.metadata(job_type=self.job_type, url=self.url)
         json = self.get(url=full_url)
-        return list(map(Profile.model_validate, json))
+        return Index(map(Profile.model_validate, json))
+
+    def get_stream(self, url: str) -> Iterator[List[Any]]:
+        """Yield the items of the JSON array at url in lists of up to chunk_size,
+        as they are read from the response"""
+
+        with self._request("GET", url=url, stream=True) as response:
+            self._raise_for_status(response=response, url=url)
+
+            reader = JsonArrayReader()
+            text = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+            chunk: List[Any] = []
+
+            for data in response.iter_content(chunk_size=STREAM_READ_SIZE):
+                chunk.extend(reader.feed(text.decode(data)))
+
+                while len(chunk) >= self.chunk_size:
+                    yield chunk[: self.chunk_size]
+                    chunk = chunk[self.chunk_size :]
+
+            chunk.extend(reader.feed(text.decode(b"", final=True)))
+            reader.close()
+
+            if chunk:
+                yield chunk
 
     def content(self) -> ContentItems:
         full_url = routes.content(job_type=self.job_type, url=self.url)
-        json = self.get(url=full_url)
 
-        if self.job_type is JobType.Sonarr:
-            return list(map(SonarrContent.model_validate, json))
-        elif self.job_type is JobType.Radarr:
-            return list(map(RadarrContent.model_validate, json))
-        elif self.job_type is JobType.Lidarr:
-            return list(map(LidarrContent.model_validate, json))
-        else:
-            _assert_never(self.job_type)
+        if self.chunk_size:
+            return self._content_chunked(full_url)
+
+        body = self.get_body(url=full_url)
+
+        with self.metrics.stage("validate"):
+            return get_content_adapter(self.job_type).validate_json(body)
+
+    def _content_chunked(self, url: str) -> ContentItems:
+        adapter = get_content_adapter(self.job_type)
+        content: ContentItems = []
+
+        for chunk in self.get_stream(url):
+            # Only a chunk of the response is held as dicts at any time
+            with self.metrics.stage("validate"):
+                content.extend(adapter.validate_python(chunk))
+
+        return content
 
     def save(self, content_item: ContentItem) -> Any:
         full_url = routes.content(job_type=self.job_type, url=self.url)
         return self.post(url=full_url, json=content_item.model_dump(by_alias=True))
+
+    def update(self, content_item: ContentItem, changes: Dict[str, Any]) -> Any:
+        """Apply changes to the current record of content_item, keeping any fields
+        the content models do not know about"""
+
+        if content_item.id is None:
+            raise Exception(f"{content_item._id_attr} has no id to update")
+
+        full_url = routes.content_item(
+            job_type=self.job_type, url=self.url, id=content_item.id
+        )
+        record = self.get(url=full_url)
+        return self.put(url=full_url, json={**record, **changes})
+
+    def delete(self, content_item: ContentItem) -> bool:
+        """Remove content_item from the instance, keeping its files on disk"""
+
+        if content_item.id is None:
+            raise Exception(f"{content_item._id_attr} has no id to delete")
+
+        full_url = routes.content_item(
+            job_type=self.job_type, url=self.url, id=content_item.id
+        )
+        response = self._request(
+            "DELETE", url=full_url, params={"deleteFiles": "false"}
+        )
+        self._raise_for_status(response=response, url=full_url)
+
+        return True
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import threading
+from typing import Dict, FrozenSet
+from urllib import parse
+
+from requests.exceptions import ConnectionError, Timeout
+
+# Responses that mean the host itself is unavailable, rather than that it
+# rejected a particular request
+UNAVAILABLE_STATUSES: FrozenSet[int] = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """A request was not sent because its host recently failed"""
+
+
+class CircuitBreaker(object):
+    """Fails requests to a host immediately once it has failed threshold times
+    in a row, until the breaker is reset"""
+
+    host: str
+    threshold: int
+    failures: int
+
+    def __init__(self, host: str, threshold: int = 1):
+        self.host = host
+        self.threshold = threshold
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def check(self) -> None:
+        if self.is_open:
+            raise CircuitOpenError(
+                f"skipping request to {self.host}, it failed {self.failures} times"
+            )
+
+    def record_error(self, error: Exception) -> None:
+        if isinstance(error, (ConnectionError, Timeout)):
+            with self.lock:
+                self.failures += 1
+
+    def record_status(self, status: int) -> None:
+        with self.lock:
+            self.failures = self.failures + 1 if status in UNAVAILABLE_STATUSES else 0
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Return the breaker shared by every job that makes requests to the host of url"""
+
+    host = parse.urlparse(url).netloc
+
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+
+        if not breaker:
+            breaker = _breakers[host] = CircuitBreaker(host)
+
+        return breaker
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
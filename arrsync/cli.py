@@ -1,13 +1,104 @@
 #!/usr/bin/env python
 
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from typing import List
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
 
-from pydantic import ValidationError
+import pydantic
+from pydantic import AnyHttpUrl, TypeAdapter, ValidationError
 
-from arrsync.common import JobType, LidarrSyncJob, RadarrSyncJob, SonarrSyncJob, SyncJob
+from arrsync import common
+from arrsync.api import Api
+from arrsync.breaker import reset_breakers
+from arrsync.common import (
+    JobType,
+    LidarrSyncJob,
+    RadarrSyncJob,
+    SeasonMonitor,
+    SonarrSyncJob,
+    SyncJob,
+    SyncMode,
+)
 from arrsync.config import logger
-from arrsync.lib import start_sync_job
+from arrsync.lib import (
+    apply_job_plan,
+    create_dest_api,
+    create_source_api,
+    get_merge_job,
+    get_reverse_job,
+    start_fan_out_job,
+    start_merge_job,
+    start_sync_job,
+)
+from arrsync.metrics import JobMetrics, MetricsRegistry, write_metrics
+from arrsync.plan import Plan
+from arrsync.profiling import profile_job
+
+
+def expand_named_options(
+    section_name: str, job_opts: Dict[str, str]
+) -> List[Dict[str, str]]:
+    """Return the options of a job per destination named by dest_*.<name> options,
+    or per source named by source_*.<name> options, sharing the rest of the
+    options of the section"""
+
+    base_opts: Dict[str, str] = {}
+    named_opts: Dict[str, Dict[str, str]] = {}
+    prefixes = set()
+
+    for option_name, value in job_opts.items():
+        base_name, _, name = option_name.partition(".")
+        prefix = base_name.split("_")[0]
+
+        if not name:
+            base_opts[option_name] = value
+        elif prefix in ("source", "dest"):
+            named_opts.setdefault(name, {})[base_name] = value
+            prefixes.add(prefix)
+        else:
+            raise Exception(
+                f"{section_name}: {option_name} is not a source or destination option"
+            )
+
+    if prefixes and base_opts.get("mode") == SyncMode.Bidirectional.value:
+        raise Exception(
+            f"{section_name}: bidirectional jobs may not name sources or destinations"
+        )
+
+    if len(prefixes) > 1:
+        raise Exception(
+            f"{section_name}: only sources or destinations may be named, not both"
+        )
+
+    names = list(named_opts)
+
+    if "source" in prefixes:
+        precedence = [
+            name.strip()
+            for name in base_opts.get("source_precedence", "").split(",")
+            if name.strip()
+        ]
+        # Sources missing from source_precedence follow in config order
+        names.sort(
+            key=lambda name: (
+                precedence.index(name) if name in precedence else len(precedence)
+            )
+        )
+
+    return [
+        {
+            **base_opts,
+            **named_opts[name],
+            "name": f"{section_name}.{name}",
+            "group": section_name,
+            "merge": "1" if "source" in prefixes else "0",
+        }
+        for name in names
+    ] or [base_opts]
 
 
 def get_sync_jobs(config: ConfigParser) -> List[SyncJob]:
@@ -16,39 +107,411 @@ def get_sync_jobs(config: ConfigParser) -> List[SyncJob]:
     for section_name in config.sections():
         section = config[section_name]
 
-        job_opts = {"name": section_name}
+        section_opts = {"name": section_name}
 
         for option_name in section:
-            job_opts[option_name] = section[option_name]
+            section_opts[option_name] = section[option_name]
+
+        for job_opts in expand_named_options(section_name, section_opts):
+            sync_jobs.append(get_sync_job(section_name, job_opts))
+
+    return sync_jobs
+
+
+def get_sync_job(section_name: str, job_opts: Dict[str, str]) -> SyncJob:
+    try:
+        job_type = JobType(job_opts["type"])
+
+        if job_type == JobType.Sonarr:
+            return SonarrSyncJob.model_validate(job_opts)
+        if job_type == JobType.Radarr:
+            return RadarrSyncJob.model_validate(job_opts)
+
+        return LidarrSyncJob.model_validate(job_opts)
+
+    except ValidationError as e:
+        logger.error("%s: config error", section_name)
+        logger.error(e)
+        raise
+
+
+def get_config_key(config: ConfigParser) -> str:
+    """Hash the options of every section, the code expanding and validating them,
+    and the pydantic version, so editing the config or upgrading either arrsync
+    or pydantic invalidates the jobs compiled from it"""
+
+    digest = hashlib.sha256(pydantic.VERSION.encode())
+
+    for path in (common.__file__, __file__):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+
+    options = {section_name: dict(config[section_name]) for section_name in config}
+    digest.update(json.dumps(options, sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+
+url_adapter: TypeAdapter[AnyHttpUrl] = TypeAdapter(AnyHttpUrl)
 
-        try:
-            job_type = JobType(job_opts["type"])
 
-            if job_type == JobType.Sonarr:
-                sync_jobs.append(SonarrSyncJob.model_validate(job_opts))
-            elif job_type == JobType.Radarr:
-                sync_jobs.append(RadarrSyncJob.model_validate(job_opts))
-            elif job_type == JobType.Lidarr:
-                sync_jobs.append(LidarrSyncJob.model_validate(job_opts))
+def construct_sync_job(fields: Dict[str, Any]) -> SyncJob:
+    """Rebuild a job dumped to JSON without validating it again, converting back
+    the fields JSON has no type for"""
 
-        except ValidationError as e:
-            logger.error("%s: config error", section_name)
-            logger.error(e)
-            raise
+    fields = {
+        **fields,
+        "type": JobType(fields["type"]),
+        "source_url": url_adapter.validate_python(fields["source_url"]),
+        "dest_url": url_adapter.validate_python(fields["dest_url"]),
+        "source_timeout": tuple(fields["source_timeout"]),
+        "dest_timeout": tuple(fields["dest_timeout"]),
+        "mode": SyncMode(fields["mode"]),
+        "root_folder_map": [tuple(rule) for rule in fields["root_folder_map"]],
+    }
+
+    if fields["type"] == JobType.Sonarr:
+        fields["dest_season_monitor"] = SeasonMonitor(fields["dest_season_monitor"])
+        return SonarrSyncJob.model_construct(**fields)
+    if fields["type"] == JobType.Radarr:
+        return RadarrSyncJob.model_construct(**fields)
+
+    return LidarrSyncJob.model_construct(**fields)
+
+
+def read_job_cache(cache_path: str, key: str) -> Optional[List[SyncJob]]:
+    try:
+        with open(cache_path) as file:
+            cache = json.load(file)
+
+        if cache["key"] != key:
+            return None
+
+        return [construct_sync_job(fields) for fields in cache["jobs"]]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("ignoring unreadable config cache %s: %s", cache_path, e)
+        return None
+
+
+def write_job_cache(cache_path: str, key: str, sync_jobs: List[SyncJob]) -> None:
+    temp_path = f"{cache_path}.tmp"
+    # The jobs hold the api keys, so only the owner may read them
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+
+    with open(fd, "w") as file:
+        json.dump(
+            {"key": key, "jobs": [job.model_dump(mode="json") for job in sync_jobs]},
+            file,
+        )
+
+    os.replace(temp_path, cache_path)
+
+
+def load_sync_jobs(
+    config: ConfigParser, cache_path: Optional[str] = None
+) -> List[SyncJob]:
+    """Return the jobs of config, reading them from cache_path if they were compiled
+    from the same options before, and writing them there otherwise"""
+
+    if not cache_path:
+        return get_sync_jobs(config)
+
+    key = get_config_key(config)
+    sync_jobs = read_job_cache(cache_path, key)
+
+    if sync_jobs is None:
+        sync_jobs = get_sync_jobs(config)
+        write_job_cache(cache_path, key, sync_jobs)
+    else:
+        logger.debug("read %d jobs from config cache %s", len(sync_jobs), cache_path)
 
     return sync_jobs
 
 
-def main(config: ConfigParser, dry_run: bool = False) -> None:
-    sync_jobs = get_sync_jobs(config)
-    logger.debug(sync_jobs)
+def check_host(
+    job: SyncJob, url: str, create_api: Callable[[SyncJob, JobMetrics], Api]
+) -> bool:
+    try:
+        # Without an api key the Api initializes on creation, which needs the host
+        with create_api(job, JobMetrics(job.name)) as api:
+            status = api.status()
+    except Exception as e:
+        logger.error("%s: could not reach %s: %s", job.name, url, e)
+        return False
+
+    logger.info(
+        "%s: reached %s %s at %s", job.name, job.type.value, status.version, url
+    )
+
+    return True
+
+
+def check_config(config: ConfigParser, cache_path: Optional[str] = None) -> bool:
+    """Validate every job and check each host they sync between answers, in
+    parallel and without syncing anything"""
+
+    try:
+        sync_jobs = load_sync_jobs(config, cache_path)
+    except Exception as e:
+        logger.error("config error: %s", e)
+        return False
+
+    hosts: Dict[
+        Tuple[str, str], Tuple[SyncJob, str, Callable[[SyncJob, JobMetrics], Api]]
+    ] = {}
 
     for job in sync_jobs:
-        name = job.name
+        source_url, dest_url = str(job.source_url), str(job.dest_url)
+        hosts.setdefault(
+            (source_url, job.source_key), (job, source_url, create_source_api)
+        )
+        hosts.setdefault((dest_url, job.dest_key), (job, dest_url, create_dest_api))
+
+    with ThreadPoolExecutor(max_workers=max(len(hosts), 1)) as executor:
+        reached = list(executor.map(lambda host: check_host(*host), hosts.values()))
+
+    logger.info(
+        "checked %d jobs, reached %d of %d hosts",
+        len(sync_jobs),
+        sum(reached),
+        len(hosts),
+    )
+
+    return all(reached)
+
+
+def group_sync_jobs(sync_jobs: List[SyncJob]) -> List[List[SyncJob]]:
+    """Group the jobs expanded from the same section, in config order"""
+
+    groups: Dict[str, List[SyncJob]] = {}
+
+    for job in sync_jobs:
+        groups.setdefault(job.group or job.name, []).append(job)
+
+    return list(groups.values())
+
+
+def finish_job(
+    name: str,
+    metrics: JobMetrics,
+    error: Optional[BaseException],
+    registry: Optional[MetricsRegistry],
+) -> None:
+    if error:
+        logger.error("%s: error", name)
+        logger.error(error)
+    else:
+        logger.info("%s: finished", name)
+
+    metrics.finish()
+    logger.info("%s: %s", name, metrics.log_line())
+    logger.debug(metrics.summary())
+
+    if registry:
+        registry.observe(metrics, error is None)
+
+
+def run_sync_job(
+    job: SyncJob,
+    dry_run: bool,
+    registry: Optional[MetricsRegistry],
+    profiler: ContextManager[None],
+    plan: Optional[Plan] = None,
+) -> List[JobMetrics]:
+    metrics = JobMetrics(job.name)
+    error: Optional[Exception] = None
+
+    try:
+        logger.info("%s: starting", job.name)
+        with profiler:
+            start_sync_job(job, dry_run, metrics=metrics, plan=plan)
+    except Exception as e:
+        error = e
+    finally:
+        finish_job(job.name, metrics, error, registry)
+
+    return [metrics]
+
+
+def run_fan_out_job(
+    jobs: List[SyncJob],
+    dry_run: bool,
+    registry: Optional[MetricsRegistry],
+    profiler: ContextManager[None],
+    plan: Optional[Plan] = None,
+) -> List[JobMetrics]:
+    # The source requests are recorded under the name of the section
+    name = str(jobs[0].group)
+    source_metrics = JobMetrics(name)
+    job_metrics = [JobMetrics(job.name) for job in jobs]
+    errors: List[Optional[BaseException]] = []
+
+    try:
+        logger.info("%s: starting, syncing to %d destinations", name, len(jobs))
+        with profiler:
+            errors = start_fan_out_job(
+                jobs, dry_run, job_metrics, source_metrics, plan=plan
+            )
+    except Exception as e:
+        errors = [e] * len(jobs)
+    finally:
+        for job, metrics, error in zip(jobs, job_metrics, errors):
+            finish_job(job.name, metrics, error, registry)
+
+        finish_job(name, source_metrics, next(filter(None, errors), None), registry)
+
+    return [source_metrics, *job_metrics]
+
+
+def run_merge_job(
+    jobs: List[SyncJob],
+    dry_run: bool,
+    registry: Optional[MetricsRegistry],
+    profiler: ContextManager[None],
+    plan: Optional[Plan] = None,
+) -> List[JobMetrics]:
+    name = str(jobs[0].group)
+    metrics = JobMetrics(name)
+    error: Optional[Exception] = None
+
+    try:
+        logger.info("%s: starting, merging %d sources", name, len(jobs))
+        with profiler:
+            start_merge_job(jobs, dry_run, metrics=metrics, plan=plan)
+    except Exception as e:
+        error = e
+    finally:
+        finish_job(name, metrics, error, registry)
+
+    return [metrics]
+
+
+def get_planned_jobs(sync_jobs: List[SyncJob]) -> List[SyncJob]:
+    """Return the jobs that save to a destination, under the names their changes
+    are planned with"""
+
+    planned_jobs: List[SyncJob] = []
+
+    for jobs in group_sync_jobs(sync_jobs):
+        if jobs[0].merge:
+            planned_jobs.append(get_merge_job(jobs))
+            continue
+
+        for job in jobs:
+            planned_jobs.append(job)
+
+            if job.mode is SyncMode.Bidirectional:
+                planned_jobs.append(get_reverse_job(job))
+
+    return planned_jobs
+
+
+def run_planned_jobs(
+    sync_jobs: List[SyncJob],
+    plan: Plan,
+    dry_run: bool,
+    registry: Optional[MetricsRegistry],
+) -> List[JobMetrics]:
+    """Make the changes of plan, for each job it has changes for"""
+
+    job_metrics: List[JobMetrics] = []
+    names = set()
+
+    for job in get_planned_jobs(sync_jobs):
+        planned = plan.jobs.get(job.name)
+        names.add(job.name)
+
+        if not planned:
+            logger.info("%s: nothing planned, skipping", job.name)
+            continue
+
+        metrics = JobMetrics(job.name)
+        error: Optional[Exception] = None
+
         try:
-            logger.info("%s: starting", name)
-            start_sync_job(job, dry_run)
-            logger.info("%s: finished", name)
+            logger.info("%s: applying plan", job.name)
+            apply_job_plan(job, planned, dry_run, metrics=metrics)
         except Exception as e:
-            logger.error("%s: error", name)
-            logger.error(e)
+            error = e
+        finally:
+            finish_job(job.name, metrics, error, registry)
+
+        job_metrics.append(metrics)
+
+    for name in plan.jobs.keys() - names:
+        logger.warning("%s: planned job is not in the config, skipping", name)
+
+    return job_metrics
+
+
+def run_sync_jobs(
+    sync_jobs: List[SyncJob],
+    dry_run: bool,
+    registry: Optional[MetricsRegistry],
+    profile: bool,
+    profile_dir: str,
+    plan: Optional[Plan] = None,
+) -> List[JobMetrics]:
+    job_metrics: List[JobMetrics] = []
+
+    for jobs in group_sync_jobs(sync_jobs):
+        name = jobs[0].group or jobs[0].name
+        profiler: ContextManager[None] = (
+            profile_job(name, profile_dir)
+            if profile or any(job.profile for job in jobs)
+            else nullcontext()
+        )
+
+        if jobs[0].merge:
+            job_metrics += run_merge_job(jobs, dry_run, registry, profiler, plan)
+        elif len(jobs) > 1:
+            job_metrics += run_fan_out_job(jobs, dry_run, registry, profiler, plan)
+        else:
+            job_metrics += run_sync_job(jobs[0], dry_run, registry, profiler, plan)
+
+    return job_metrics
+
+
+def main(
+    config: ConfigParser,
+    dry_run: bool = False,
+    metrics_path: Optional[str] = None,
+    metrics_format: str = "json",
+    registry: Optional[MetricsRegistry] = None,
+    profile: bool = False,
+    profile_dir: str = ".",
+    plan_path: Optional[str] = None,
+    apply_path: Optional[str] = None,
+    cache_path: Optional[str] = None,
+) -> None:
+    sync_jobs = load_sync_jobs(config, cache_path)
+    logger.debug(sync_jobs)
+
+    # Give hosts that failed during the previous run another chance
+    reset_breakers()
+
+    if apply_path:
+        job_metrics = run_planned_jobs(
+            sync_jobs, Plan.read(apply_path), dry_run, registry
+        )
+    else:
+        plan = Plan() if plan_path else None
+
+        # Planning saves nothing, the plan is applied later
+        job_metrics = run_sync_jobs(
+            sync_jobs,
+            dry_run or plan is not None,
+            registry,
+            profile,
+            profile_dir,
+            plan,
+        )
+
+        if plan_path and plan:
+            plan.write(plan_path)
+            logger.info("wrote the plan of %d jobs to %s", len(plan.jobs), plan_path)
+
+    if metrics_path:
+        write_metrics(metrics_path, job_metrics, metrics_format)
@@ -1,17 +1,42 @@
 #!/usr/bin/env python
 
 import configparser
+import re
 from abc import abstractmethod
 from enum import Enum
-from typing import Any, Dict, List, Literal, Optional, Union
-
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Protocol,
+    SupportsIndex,
+    Tuple,
+    TypeVar,
+    Union,
+    get_args,
+)
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    GetCoreSchemaHandler,
+    field_validator,
+    model_validator,
+)
 from pydantic.networks import AnyHttpUrl
+from pydantic_core import core_schema
 from typing_extensions import Annotated
 
 Headers = Dict[str, str]
 TagList = List[str]
 ProfileList = List[str]
+# Seconds to wait to connect, and between bytes read
+Timeouts = Tuple[float, float]
 
 
 class JobType(Enum):
@@ -20,12 +45,26 @@ class JobType(Enum):
     Lidarr = "lidarr"
 
 
+class SyncMode(Enum):
+    OneWay = "oneway"
+    Bidirectional = "bidirectional"
+
+
+class SeasonMonitor(Enum):
+    Source = "source"
+    All = "all"
+    Latest = "latest"
+    First = "first"
+    Off = "none"
+
+
 class BaseSyncJob(BaseModel):
     name: str
     type: JobType
     source_url: AnyHttpUrl
     source_key: str = ""
     source_headers: Headers = {}
+    source_timeout: Timeouts = (10.0, 60.0)
     source_tag_exclude: TagList = []
     source_tag_include: TagList = []
     source_profile_include: ProfileList = []
@@ -33,10 +72,35 @@ class BaseSyncJob(BaseModel):
     dest_url: AnyHttpUrl
     dest_key: str = ""
     dest_headers: Headers = {}
+    dest_timeout: Timeouts = (10.0, 60.0)
     dest_path: str
     dest_profile: str
     dest_search_missing: bool = False
     dest_monitor: bool = False
+    dest_max_concurrency: Annotated[int, Field(ge=1)] = 8
+    profile: bool = False
+    retries: int = 3
+    retry_backoff: float = 0.5
+    retry_backoff_max: float = 30.0
+    journal_dir: Optional[str] = None
+    continue_on_error: bool = False
+    quarantine_file: Optional[str] = None
+    quarantine_backoff: float = 86400.0
+    deadline: Optional[float] = None
+    group: Optional[str] = None
+    merge: bool = False
+    source_precedence: List[str] = []
+    mode: SyncMode = SyncMode.OneWay
+    source_path: Optional[str] = None
+    source_profile: Optional[str] = None
+    dest_update: bool = False
+    dest_delete: bool = False
+    dest_delete_max: int = 10
+    profile_map: Dict[str, str] = {}
+    tag_map: Dict[str, str] = {}
+    dest_tag_create: bool = False
+    root_folder_map: List[Tuple[str, str]] = []
+    fetch_chunk_size: Annotated[int, Field(ge=0)] = 0
 
     @field_validator("type", mode="before")
     def type_from_option(cls, opt: str) -> JobType:  # noqa: N805
@@ -47,34 +111,71 @@ class BaseSyncJob(BaseModel):
         "source_tag_exclude",
         "source_profile_include",
         "source_profile_exclude",
+        "source_precedence",
         mode="before",
     )
     def list_from_option(cls, opt: str) -> List[str]:  # noqa: N805
         return [] if not opt else [item.strip() for item in opt.split(",")]
 
+    @field_validator("source_timeout", "dest_timeout", mode="before")
+    def timeouts_from_option(cls, opt: Any) -> Any:  # noqa: N805
+        if not isinstance(opt, str):
+            return opt
+
+        timeouts = [float(timeout) for timeout in opt.split(",")]
+
+        # A single value is used for both the connect and read timeouts
+        return timeouts * 2 if len(timeouts) == 1 else timeouts
+
     @field_validator("source_headers", "dest_headers", mode="before")
     def dict_from_option(cls, opt: str) -> Headers:  # noqa: N805
-        headers: Dict[str, str] = {}
+        return dict(parse_headers(opt))
+
+    @field_validator("profile_map", "tag_map", mode="before")
+    def map_from_option(cls, opt: Any) -> Any:  # noqa: N805
+        if not isinstance(opt, str):
+            return opt
+
+        pairs = [item.split(":", 1) for item in opt.split(",") if item.strip()]
+
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError("expected a comma separated list of source: dest pairs")
+
+        return {source.strip(): dest.strip() for source, dest in pairs}
 
-        config = OptDictConfigParser(strict=True)
+    @field_validator("root_folder_map", mode="before")
+    def rules_from_option(cls, opt: Any) -> Any:  # noqa: N805
+        if not isinstance(opt, str):
+            return opt
 
-        # Add a section so we can look up the header config options
-        headers_string = f"[headers]\n{opt}"
+        rules = [item.split("->", 1) for item in opt.split(",") if item.strip()]
 
-        config.read_string(headers_string)
-        headers_section = config["headers"]
+        if any(len(rule) != 2 for rule in rules):
+            raise ValueError("expected a comma separated list of source -> dest rules")
 
-        for option in headers_section:
-            headers[option] = headers_section[option]
+        return [(source.strip(), dest.strip()) for source, dest in rules]
 
-        return headers
+    @model_validator(mode="after")
+    def check_mode(self) -> "BaseSyncJob":
+        if self.mode is SyncMode.Bidirectional and not self.source_path:
+            raise ValueError("source_path is required for bidirectional jobs")
 
-    model_config = ConfigDict(extra="forbid")
+        if self.mode is SyncMode.Bidirectional and self.dest_delete:
+            raise ValueError("dest_delete is not supported for bidirectional jobs")
+
+        # Both directions plan from the same snapshot, so each would undo the other
+        if self.mode is SyncMode.Bidirectional and self.dest_update:
+            raise ValueError("dest_update is not supported for bidirectional jobs")
+
+        return self
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 class SonarrSyncJob(BaseSyncJob):
     type: Literal[JobType.Sonarr] = JobType.Sonarr
     dest_language_profile: Optional[str] = None
+    dest_season_monitor: SeasonMonitor = SeasonMonitor.Source
 
 
 class RadarrSyncJob(BaseSyncJob):
@@ -85,18 +186,32 @@ class RadarrSyncJob(BaseSyncJob):
 class LidarrSyncJob(BaseSyncJob):
     type: Literal[JobType.Lidarr] = JobType.Lidarr
     dest_metadata_profile: Optional[str] = None
+    dest_album_monitor: bool = False
+
+    @model_validator(mode="after")
+    def check_album_monitor(self) -> "LidarrSyncJob":
+        # Each direction would copy the album monitoring the other just changed
+        if self.mode is SyncMode.Bidirectional and self.dest_album_monitor:
+            raise ValueError(
+                "dest_album_monitor is not supported for bidirectional jobs"
+            )
+
+        return self
 
 
 SyncJob = Union[SonarrSyncJob, RadarrSyncJob, LidarrSyncJob]
 
 
 class ContentImage(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     cover_type: Annotated[str, Field(..., alias="coverType")]
     remote_url: Annotated[str, Field(..., alias="remoteUrl")]
 
 
 class BaseContent(BaseModel):
-    model_config = ConfigDict(populate_by_name=True)
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
+    # The id of the item on the instance it was fetched from, never sent back
+    id: Annotated[Optional[int], Field(None, exclude=True)] = None
     monitored: bool
     tags: List[int]
     quality_profile_id: Annotated[int, Field(..., alias="qualityProfileId")]
@@ -123,6 +238,12 @@ class BaseContent(BaseModel):
         return NotImplemented
 
 
+class SonarrSeason(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
+    season_number: Annotated[int, Field(..., alias="seasonNumber")]
+    monitored: bool
+
+
 class SonarrContent(BaseContent):
     title: str
     title_slug: Annotated[str, Field(..., alias="titleSlug")]
@@ -135,7 +256,7 @@ class SonarrContent(BaseContent):
         Optional[int], Field(None, alias="languageProfileId")
     ] = None
     images: List[Optional[ContentImage]]
-    seasons: Any
+    seasons: List[SonarrSeason] = []
 
     @property
     def _id_attr(self) -> int:
@@ -157,6 +278,7 @@ class RadarrContent(BaseContent):
 
 
 class LidarrContentImage(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     cover_type: str = Field(..., alias="coverType")
     url: str
 
@@ -175,21 +297,35 @@ class LidarrContent(BaseContent):
         return self.foreign_artist_id
 
 
+class LidarrAlbum(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    id: int
+    title: str
+    foreign_album_id: Annotated[str, Field(..., alias="foreignAlbumId")]
+    artist_id: Annotated[int, Field(..., alias="artistId")]
+    monitored: bool
+
+
+Albums = List[LidarrAlbum]
+
 ContentItem = Union[SonarrContent, RadarrContent, LidarrContent]
 ContentItems = List[ContentItem]
 
 
 class Initialize(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     api_root: Annotated[str, Field(..., alias="apiRoot")]
     api_key: Annotated[str, Field(..., alias="apiKey")]
     url_base: Annotated[str, Field(..., alias="urlBase")]
 
 
 class Status(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     version: str
 
 
 class Tag(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     label: str
     id: int
 
@@ -197,10 +333,8 @@ class Tag(BaseModel):
         return self.label.lower()
 
 
-Tags = List[Tag]
-
-
 class Profile(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     name: str
     id: int
 
@@ -208,10 +342,8 @@ class Profile(BaseModel):
         return self.name.lower()
 
 
-Profiles = List[Profile]
-
-
 class Language(BaseModel):
+    model_config = ConfigDict(defer_build=True)
     name: str
     id: int
 
@@ -219,9 +351,207 @@ class Language(BaseModel):
         return self.name.lower()
 
 
-Languages = List[Language]
+class Named(Protocol):
+    id: int
+
+    def normalized_title(self) -> str: ...
+
+
+T = TypeVar("T", bound=Named)
+
+
+class Index(List[T]):
+    """A list of tags, profiles or languages, indexed by id and normalized name as
+    it is built so looking an item up does not scan the list"""
+
+    by_id: Dict[str, T]
+    by_name: Dict[str, List[T]]
+
+    def __init__(self, items: Iterable[T] = ()):
+        super().__init__(items)
+        self._reindex()
+
+    def _index(self, item: T) -> None:
+        # Keep the first of any duplicate ids, as a scan of the list would
+        self.by_id.setdefault(str(item.id), item)
+        self.by_name.setdefault(item.normalized_title(), []).append(item)
+
+    def _reindex(self) -> None:
+        self.by_id = {}
+        self.by_name = {}
+
+        for item in self:
+            self._index(item)
+
+    # Every other change to the list indexes it again, so lookups never see a
+    # stale item, while append stays cheap for tags created one at a time
+    def append(self, item: T) -> None:
+        super().append(item)
+        self._index(item)
+
+    def extend(self, items: Iterable[T]) -> None:
+        super().extend(items)
+        self._reindex()
+
+    def insert(self, index: SupportsIndex, item: T) -> None:
+        super().insert(index, item)
+        self._reindex()
+
+    def remove(self, item: T) -> None:
+        super().remove(item)
+        self._reindex()
+
+    def pop(self, index: SupportsIndex = -1) -> T:
+        item = super().pop(index)
+        self._reindex()
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._reindex()
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def __iadd__(  # type: ignore[override, misc]
+        self, items: Iterable[T]
+    ) -> "Index[T]":
+        super().__iadd__(items)
+        self._reindex()
+        return self
+
+    def __imul__(self, count: SupportsIndex) -> "Index[T]":
+        super().__imul__(count)
+        self._reindex()
+        return self
+
+    def find(self, query: str) -> Optional[T]:
+        """Return the item whose id is query, or else the first whose name is query
+        ignoring case"""
+
+        return self.by_id.get(query) or next(iter(self.find_all(query)), None)
+
+    def find_all(self, query: str) -> List[T]:
+        """Return the item whose id is query and every item whose name is query
+        ignoring case"""
+
+        by_id = self.by_id.get(query)
+        by_name = self.by_name.get(query.lower(), [])
+
+        return [by_id, *by_name] if by_id and by_id not in by_name else by_name
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (item_type,) = get_args(source)
+
+        return core_schema.no_info_after_validator_function(
+            cls, handler.generate_schema(List[item_type])  # type: ignore[valid-type]
+        )
+
+
+Tags = Index[Tag]
+Profiles = Index[Profile]
+Languages = Index[Language]
+
+
+class SourceLibrary(BaseModel):
+    """The content of a source instance and the tags and profiles it references"""
+
+    model_config = ConfigDict(defer_build=True)
+    tags: Tags
+    profiles: Profiles
+    content: ContentItems
+
+
+class DestLibrary(BaseModel):
+    """The content of a destination instance and the profiles items are saved with"""
+
+    model_config = ConfigDict(defer_build=True)
+    profiles: Profiles
+    metadata_profiles: Profiles
+    languages: Languages
+    content: ContentItems
+    tags: Tags = Field(default_factory=Index)
+
+
+class RootFolder(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    id: int
+    path: str
+
+
+RootFolders = List[RootFolder]
+
+
+class RootFolderMap(object):
+    """The root_folder_map rules of a job, compiled once. Each rule matches root
+    folders under a path prefix, or a regular expression when it starts with ^"""
+
+    def __init__(self, rules: List[Tuple[str, str]], default: str):
+        self.rules = [
+            (
+                re.compile(
+                    source
+                    if source.startswith("^")
+                    else re.escape(source.rstrip("/")) + "(/|$)"
+                ),
+                dest,
+            )
+            for source, dest in rules
+        ]
+        self.default = default
+
+    def get(self, path: Optional[str]) -> str:
+        """Return the destination root folder of the first rule matching path"""
+
+        for pattern, dest in self.rules:
+            if path and pattern.match(path):
+                return dest
+
+        return self.default
+
+
+class ContentMapping(BaseModel):
+    """The destination profile and tag ids for the ids of one source, and the
+    root folder rules of its job"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True, defer_build=True)
+
+    profiles: Dict[int, int] = {}
+    # None keeps the source tag ids, for jobs that map no tags
+    tags: Optional[Dict[int, int]] = None
+    root_folders: Optional[RootFolderMap] = None
+
+    def map_tags(self, tags: List[int]) -> List[int]:
+        if self.tags is None:
+            return tags
+
+        mapped = [self.tags[tag] for tag in tags if tag in self.tags]
+
+        return list(dict.fromkeys(mapped))
 
 
 class OptDictConfigParser(configparser.ConfigParser):
     def optionxform(self, optionstr: str) -> str:
         return optionstr
+
+
+@lru_cache(maxsize=None)
+def parse_headers(opt: str) -> Tuple[Tuple[str, str], ...]:
+    """Parse header options, once per distinct value as jobs expanded from the
+    same section, or sharing [common], repeat them"""
+
+    config = OptDictConfigParser(strict=True)
+
+    # Add a section so we can look up the header config options
+    config.read_string(f"[headers]\n{opt}")
+    headers_section = config["headers"]
+
+    return tuple((option, headers_section[option]) for option in headers_section)
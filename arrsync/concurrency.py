@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib import parse
+
+
+class AdaptiveLimiter(object):
+    """An AIMD concurrency limit driven by response latency and errors
+
+    The limit grows by roughly one per window of successful requests while
+    latency stays within tolerance of the baseline, and is multiplied by
+    backoff on an error or a latency spike. Requests that were already in
+    flight when the limit was last lowered do not lower it again.
+    """
+
+    limit: float
+    min_limit: int
+    max_limit: int
+    in_flight: int
+    baseline: Optional[float]
+
+    def __init__(
+        self,
+        initial: int = 1,
+        min_limit: int = 1,
+        max_limit: int = 8,
+        tolerance: float = 2.0,
+        backoff: float = 0.5,
+        smoothing: float = 0.1,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.baseline = None
+        self.last_decrease = float("-inf")
+        self.condition = threading.Condition()
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.current)
+            self.in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Adjust the limit using the outcome of a request made under acquire()"""
+
+        now = time.monotonic()
+
+        with self.condition:
+            spiked = self.baseline is not None and latency > (
+                self.baseline * self.tolerance
+            )
+
+            if not ok or spiked:
+                if now - latency >= self.last_decrease:
+                    self.limit = max(self.limit * self.backoff, float(self.min_limit))
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+
+            if ok:
+                self.baseline = (
+                    latency
+                    if self.baseline is None
+                    else self.baseline + self.smoothing * (latency - self.baseline)
+                )
+
+            self.condition.notify_all()
+
+    def resize(self, max_limit: int) -> None:
+        with self.condition:
+            self.max_limit = max(max_limit, self.min_limit)
+            self.limit = min(self.limit, float(self.max_limit))
+            self.condition.notify_all()
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url: str, max_limit: int) -> AdaptiveLimiter:
+    """Return the limiter shared by every job that saves to the host of url"""
+
+    host = parse.urlparse(url).netloc
+
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+
+        if not limiter:
+            limiter = _limiters[host] = AdaptiveLimiter(max_limit=max_limit)
+        else:
+            limiter.resize(max_limit)
+
+        return limiter
+
+
+def reset_limiters() -> None:
+    with _limiters_lock:
+        _limiters.clear()
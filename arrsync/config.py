@@ -6,14 +6,18 @@ import logging
 import os
 from typing import Any, Optional
 
-logging.basicConfig(
-    level=os.environ.get("SYNCARR_DEBUG_LEVEL", logging.INFO),
-    datefmt="%Y-%m-%d %H:%M:%S",
-    format="[%(asctime)s] %(levelname)-6s %(message)s",
-)
+logger = logging.getLogger()
 
 
-logger = logging.getLogger()
+def configure_logging() -> None:
+    """Log to stderr, at SYNCARR_DEBUG_LEVEL if set. Called by the entry points
+    rather than on import, so importing arrsync leaves logging alone"""
+
+    logging.basicConfig(
+        level=os.environ.get("SYNCARR_DEBUG_LEVEL", logging.INFO),
+        datefmt="%Y-%m-%d %H:%M:%S",
+        format="[%(asctime)s] %(levelname)-6s %(message)s",
+    )
 
 
 def create_config_parser() -> configparser.ConfigParser:
@@ -42,6 +46,79 @@ def parse_args(args: Optional[Any] = None) -> argparse.Namespace:
         "--dry-run", action="store_true", help="Do not sync anything"
     )
 
+    plan_group = arg_parser.add_mutually_exclusive_group()
+
+    plan_group.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="Do not sync anything, write the changes each job would make to FILE",
+    )
+
+    plan_group.add_argument(
+        "--apply",
+        metavar="FILE",
+        help="Make the changes planned in FILE by --plan instead of syncing",
+    )
+
+    plan_group.add_argument(
+        "--check-config",
+        action="store_true",
+        help="Do not sync anything, validate every job and check its hosts answer",
+    )
+
+    arg_parser.add_argument(
+        "--config-cache",
+        metavar="FILE",
+        help="Keep the jobs compiled from the config in FILE, until the config changes",
+    )
+
+    arg_parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Write per job metrics to FILE after the run",
+    )
+
+    arg_parser.add_argument(
+        "--metrics-format",
+        choices=["json", "prometheus"],
+        default="json",
+        help="Format of the --metrics file",
+    )
+
+    arg_parser.add_argument(
+        "--interval",
+        type=float,
+        metavar="SECONDS",
+        help="Keep running, syncing every SECONDS and re-reading the config each time",
+    )
+
+    arg_parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve Prometheus metrics on PORT at /metrics while running",
+    )
+
+    arg_parser.add_argument(
+        "--metrics-host",
+        default="",
+        metavar="HOST",
+        help="Address to bind the metrics endpoint to (defaults to all interfaces)",
+    )
+
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each job, writing JOB_NAME.prof to --profile-dir",
+    )
+
+    arg_parser.add_argument(
+        "--profile-dir",
+        default=".",
+        metavar="DIR",
+        help="Directory to write profiles to (defaults to the current directory)",
+    )
+
     return arg_parser.parse_args(args=args)
 
 
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from arrsync.common import ContentItem, ContentItems, JobType
+from arrsync.config import logger
+from arrsync.plan import JobPlan
+from arrsync.utils import get_file_name
+
+# Resumes in a row that saved nothing before the journal is given up on, so an
+# item that always fails cannot keep later runs from diffing again
+MAX_STALLED_RESUMES = 3
+
+
+class Journal(object):
+    """An append-only record of the changes a job planned and the saves it
+    completed
+
+    Each run that has something to change starts the journal over with the
+    planned payloads, updates, deletions and album changes, then appends a
+    line per saved item and a final line once every change was made. A run
+    that finds a plan without that final line resumes it instead of diffing
+    both libraries again.
+    """
+
+    path: str
+
+    def __init__(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{get_file_name(name)}.journal")
+        self.lock = threading.Lock()
+
+    def _read(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+
+        entries: List[Dict[str, Any]] = []
+
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line cut short when the previous run was killed
+                    logger.warning("ignoring a malformed line in %s", self.path)
+
+        return entries
+
+    def _append(self, entries: List[Dict[str, Any]], mode: str = "a") -> None:
+        with self.lock, open(self.path, mode) as file:
+            file.writelines(
+                json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+            )
+            file.flush()
+            os.fsync(file.fileno())
+
+    def pending(self, job_type: JobType) -> Optional[JobPlan]:
+        """Return the planned changes with the items that were never saved, or
+        None if there is no interrupted plan to resume"""
+
+        planned: Dict[str, Any] = {}
+        changes: Dict[str, Any] = {}
+        saved: Set[str] = set()
+        complete = True
+        stalled = 0
+
+        for entry in self._read():
+            event = entry.get("event")
+
+            if event == "plan":
+                planned, saved, complete, stalled = {}, set(), False, 0
+                changes = entry.get("changes", {})
+            elif event == "planned":
+                planned[entry["id"]] = entry["item"]
+            elif event == "saved":
+                saved.add(entry["id"])
+                stalled = 0
+            elif event == "resume":
+                stalled += 1
+            elif event == "complete":
+                complete = True
+
+        if complete:
+            return None
+
+        if stalled >= MAX_STALLED_RESUMES:
+            logger.warning(
+                "%s: the last %d resumes saved nothing, planning again",
+                self.path,
+                stalled,
+            )
+            self.complete()
+            return None
+
+        return JobPlan.model_validate(
+            {
+                "type": job_type,
+                "dest_url": "",
+                **changes,
+                "add": [item for id, item in planned.items() if id not in saved],
+            }
+        )
+
+    def plan(self, content: ContentItems, changes: Optional[JobPlan] = None) -> None:
+        """Start over with the payloads of content, and the updates, deletions and
+        album changes of changes"""
+
+        self._append(
+            [
+                {
+                    "event": "plan",
+                    "changes": (
+                        changes.model_dump(
+                            mode="json", exclude={"add"}, exclude_defaults=True
+                        )
+                        if changes
+                        else {}
+                    ),
+                }
+            ]
+            + [
+                {
+                    "event": "planned",
+                    "id": str(item._id_attr),
+                    "item": item.model_dump(by_alias=True),
+                }
+                for item in content
+            ],
+            mode="w",
+        )
+
+    def resume(self) -> None:
+        self._append([{"event": "resume"}])
+
+    def saved(self, item: ContentItem) -> None:
+        self._append([{"event": "saved", "id": str(item._id_attr)}])
+
+    def complete(self) -> None:
+        self._append([{"event": "complete"}])
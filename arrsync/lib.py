@@ -1,29 +1,110 @@
 #!/usr/bin/env python
 
-import pprint
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import as_completed
+from contextlib import ExitStack
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
 
 from arrsync.api import Api
+from arrsync.breaker import CircuitOpenError, get_breaker
 from arrsync.common import (
+    Albums,
+    ContentItem,
     ContentItems,
-    JobType,
+    ContentMapping,
+    DestLibrary,
     Languages,
     LidarrContent,
+    LidarrSyncJob,
+    Profile,
     Profiles,
     RadarrContent,
     RadarrSyncJob,
+    RootFolderMap,
+    SeasonMonitor,
     SonarrContent,
+    SonarrSeason,
+    SonarrSyncJob,
+    SourceLibrary,
     SyncJob,
+    SyncMode,
+    Tag,
     Tags,
 )
+from arrsync.concurrency import AdaptiveLimiter, get_limiter
 from arrsync.config import logger
+from arrsync.journal import Journal
+from arrsync.metrics import JobMetrics
+from arrsync.plan import JobPlan, Plan
+from arrsync.quarantine import Quarantine
+from arrsync.retry import RetryPolicy
 from arrsync.utils import (
+    _assert_never,
     find_ids_in_list,
+    find_in_list,
     find_in_list_with_fallback,
     get_debug_title,
     get_search_missing_attribute,
 )
 
-pp = pprint.PrettyPrinter()
+# The items to add, the items to update with their changes, the items to delete,
+# and the album ids to monitor or unmonitor on a destination
+Changes = Tuple[
+    ContentItems,
+    List[Tuple[ContentItem, Dict[str, Any]]],
+    ContentItems,
+    Dict[bool, List[int]],
+]
+
+# The most album ids to change the monitoring of in one request
+ALBUM_BATCH_SIZE = 100
+
+
+def get_dest_profile(job: SyncJob, dest_profiles: Profiles) -> Profile:
+    dest_profile = find_in_list_with_fallback(
+        dest_profiles, job.dest_profile, "profiles"
+    )
+
+    if not dest_profile:
+        raise Exception("A profile is required to be set an no profiles are available")
+
+    return dest_profile
+
+
+def get_monitored_seasons(
+    seasons: List[SonarrSeason], season_monitor: SeasonMonitor
+) -> List[SonarrSeason]:
+    """Return seasons monitored as season_monitor chooses, copying only the seasons
+    that change. Specials are only monitored when following the source"""
+
+    if season_monitor is SeasonMonitor.Source:
+        return seasons
+
+    numbers = [season.season_number for season in seasons if season.season_number]
+
+    if season_monitor is SeasonMonitor.All:
+        chosen = set(numbers)
+    elif season_monitor is SeasonMonitor.Latest:
+        chosen = {max(numbers)} if numbers else set()
+    elif season_monitor is SeasonMonitor.First:
+        chosen = {min(numbers)} if numbers else set()
+    elif season_monitor is SeasonMonitor.Off:
+        chosen = set()
+    else:
+        _assert_never(season_monitor)
+
+    return [
+        (
+            season
+            if season.monitored == (season.season_number in chosen)
+            else season.model_copy(update={"monitored": season.season_number in chosen})
+        )
+        for season in seasons
+    ]
 
 
 def get_content_payloads(
@@ -32,23 +113,28 @@ def get_content_payloads(
     dest_profiles: Profiles,
     dest_metadata_profiles: Profiles,
     dest_languages: Languages,
+    mapping: Optional[ContentMapping] = None,
 ) -> ContentItems:
     payload_items: ContentItems = []
 
-    dest_profile = find_in_list_with_fallback(
-        dest_profiles, job.dest_profile, "profiles"
-    )
-
-    if not dest_profile:
-        raise Exception("A profile is required to be set an no profiles are available")
+    dest_profile = get_dest_profile(job, dest_profiles)
+    mapping = mapping if mapping else ContentMapping()
 
     for item in content:
+        # Only add_options is changed in place, so the rest is shared with item
         payload = item.model_copy(
-            deep=True,
             update={
-                "quality_profile_id": dest_profile.id,
-                "root_folder_path": job.dest_path,
+                "quality_profile_id": mapping.profiles.get(
+                    item.quality_profile_id, dest_profile.id
+                ),
+                "tags": mapping.map_tags(item.tags),
+                "root_folder_path": (
+                    mapping.root_folders.get(item.root_folder_path)
+                    if mapping.root_folders
+                    else job.dest_path
+                ),
                 "monitored": job.dest_monitor,
+                "add_options": dict(item.add_options),
             },
         )
 
@@ -59,19 +145,27 @@ def get_content_payloads(
                 {search_missing_attribute: job.dest_search_missing}
             )
 
-        if isinstance(payload, SonarrContent) and job.type == JobType.Sonarr:
+        if isinstance(payload, SonarrContent) and isinstance(job, SonarrSyncJob):
             dest_language = find_in_list_with_fallback(
                 dest_languages, job.dest_language_profile, "languages"
             )
 
+            payload.seasons = get_monitored_seasons(
+                payload.seasons, job.dest_season_monitor
+            )
+
             if dest_language:
                 payload.language_profile_id = dest_language.id
 
-        if isinstance(payload, LidarrContent) and job.type == JobType.Lidarr:
+        if isinstance(payload, LidarrContent) and isinstance(job, LidarrSyncJob):
             dest_metadata_profile = find_in_list_with_fallback(
                 dest_metadata_profiles, job.dest_metadata_profile, "metadata profiles"
             )
 
+            if job.dest_album_monitor:
+                # Albums are monitored to match the source once they are fetched
+                payload.add_options.update({"monitor": "none"})
+
             if dest_metadata_profile:
                 payload.metadata_profile_id = dest_metadata_profile.id
             else:
@@ -84,19 +178,322 @@ def get_content_payloads(
     return payload_items
 
 
-def sync_content(content: ContentItems, dest_api: Api, dry_run: bool = False) -> None:
-    for item in content:
-        post_json = None
-        if not dry_run:
-            post_json = dest_api.save(content_item=item)
+class DeleteLimitError(Exception):
+    """A job planned to delete more items than its dest_delete_max allows"""
 
-        if not post_json and not dry_run:
-            logger.error("failed to sync %s", get_debug_title(item))
-            raise Exception(f"Failed to create {get_debug_title(item)}")
-        else:
-            logger.info(
-                "synced %s%s", get_debug_title(item), " (dry-run)" if dry_run else ""
+
+class DeadlineExceededError(Exception):
+    """A job ran past its deadline and its remaining saves were cancelled"""
+
+
+def get_remaining(deadline: Optional[float]) -> Optional[float]:
+    """Return the seconds left until the monotonic deadline, None if there is none"""
+
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def call_limited(limiter: AdaptiveLimiter, call: Callable[[], Any]) -> Any:
+    """Make a request through the limiter, recording how long it took"""
+
+    with limiter.acquire():
+        started = time.monotonic()
+
+        try:
+            result = call()
+        except Exception:
+            limiter.record(time.monotonic() - started, ok=False)
+            raise
+
+        limiter.record(time.monotonic() - started, ok=bool(result))
+
+    return result
+
+
+def save_content_item(
+    item: ContentItem,
+    dest_api: Api,
+    limiter: AdaptiveLimiter,
+    metrics: JobMetrics,
+    journal: Optional[Journal] = None,
+) -> None:
+    post_json = call_limited(limiter, partial(dest_api.save, content_item=item))
+
+    if not post_json:
+        logger.error("failed to sync %s", get_debug_title(item))
+        raise Exception(f"Failed to create {get_debug_title(item)}")
+
+    if journal:
+        journal.saved(item)
+
+    metrics.increment("saved")
+    logger.info("synced %s", get_debug_title(item))
+
+
+def update_content_item(
+    item: ContentItem,
+    dest_api: Api,
+    limiter: AdaptiveLimiter,
+    metrics: JobMetrics,
+    changes: Dict[ContentItem, Dict[str, Any]],
+) -> None:
+    put_json = call_limited(
+        limiter, partial(dest_api.update, content_item=item, changes=changes[item])
+    )
+
+    if not put_json:
+        logger.error("failed to update %s", get_debug_title(item))
+        raise Exception(f"Failed to update {get_debug_title(item)}")
+
+    metrics.increment("updated")
+    logger.info("updated %s", get_debug_title(item))
+
+
+def delete_content_item(
+    item: ContentItem,
+    dest_api: Api,
+    limiter: AdaptiveLimiter,
+    metrics: JobMetrics,
+) -> None:
+    call_limited(limiter, partial(dest_api.delete, content_item=item))
+
+    metrics.increment("deleted")
+    logger.info("deleted %s", get_debug_title(item))
+
+
+def check_save_result(
+    future: "Future[None]",
+    item: ContentItem,
+    metrics: JobMetrics,
+    quarantine: Optional[Quarantine],
+    continue_on_error: bool,
+) -> None:
+    """Quarantine a failed save, raising the error unless continue_on_error"""
+
+    try:
+        future.result()
+    except CircuitOpenError:
+        # The destination is down, so the item is not to blame
+        raise
+    except Exception as e:
+        if quarantine:
+            quarantine.add(item, e)
+
+        if not continue_on_error:
+            raise
+
+        metrics.increment("failed")
+        logger.error("failed to sync %s: %s", get_debug_title(item), e)
+    else:
+        if quarantine:
+            quarantine.remove(item)
+
+
+def sync_content(
+    content: ContentItems,
+    dest_api: Api,
+    dry_run: bool = False,
+    metrics: Optional[JobMetrics] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    journal: Optional[Journal] = None,
+    quarantine: Optional[Quarantine] = None,
+    continue_on_error: bool = False,
+    deadline: Optional[float] = None,
+) -> None:
+    metrics = metrics if metrics else JobMetrics("sync")
+    limiter = limiter if limiter else AdaptiveLimiter(max_limit=1)
+
+    if dry_run:
+        for item in content:
+            metrics.increment("saved")
+            logger.info("synced %s (dry-run)", get_debug_title(item))
+        return
+
+    run_content_tasks(
+        content=content,
+        task=partial(
+            save_content_item,
+            dest_api=dest_api,
+            limiter=limiter,
+            metrics=metrics,
+            journal=journal,
+        ),
+        limiter=limiter,
+        metrics=metrics,
+        quarantine=quarantine,
+        continue_on_error=continue_on_error,
+        deadline=deadline,
+    )
+
+
+def update_content(
+    updates: List[Tuple[ContentItem, Dict[str, Any]]],
+    dest_api: Api,
+    dry_run: bool,
+    metrics: JobMetrics,
+    limiter: AdaptiveLimiter,
+    continue_on_error: bool = False,
+    deadline: Optional[float] = None,
+) -> None:
+    if dry_run:
+        for item, _ in updates:
+            metrics.increment("updated")
+            logger.info("updated %s (dry-run)", get_debug_title(item))
+        return
+
+    changes = dict(updates)
+
+    run_content_tasks(
+        content=list(changes),
+        task=partial(
+            update_content_item,
+            dest_api=dest_api,
+            limiter=limiter,
+            metrics=metrics,
+            changes=changes,
+        ),
+        limiter=limiter,
+        metrics=metrics,
+        continue_on_error=continue_on_error,
+        deadline=deadline,
+    )
+
+
+def delete_content(
+    deletions: ContentItems,
+    dest_api: Api,
+    dry_run: bool,
+    metrics: JobMetrics,
+    limiter: AdaptiveLimiter,
+    continue_on_error: bool = False,
+    deadline: Optional[float] = None,
+) -> None:
+    if dry_run:
+        for item in deletions:
+            metrics.increment("deleted")
+            logger.info("deleted %s (dry-run)", get_debug_title(item))
+        return
+
+    run_content_tasks(
+        content=deletions,
+        task=partial(
+            delete_content_item, dest_api=dest_api, limiter=limiter, metrics=metrics
+        ),
+        limiter=limiter,
+        metrics=metrics,
+        continue_on_error=continue_on_error,
+        deadline=deadline,
+    )
+
+
+def run_content_tasks(
+    content: ContentItems,
+    task: Callable[[ContentItem], None],
+    limiter: AdaptiveLimiter,
+    metrics: JobMetrics,
+    quarantine: Optional[Quarantine] = None,
+    continue_on_error: bool = False,
+    deadline: Optional[float] = None,
+) -> None:
+    """Run task for each item as concurrently as the limiter allows, cancelling
+    the queued tasks on an error or once the deadline passes"""
+
+    executor = ThreadPoolExecutor(max_workers=limiter.max_limit)
+    futures: Dict["Future[None]", ContentItem] = {}
+
+    try:
+        futures = {executor.submit(task, item): item for item in content}
+
+        for future in as_completed(futures, timeout=get_remaining(deadline)):
+            check_save_result(
+                future, futures[future], metrics, quarantine, continue_on_error
             )
+    except FutureTimeoutError:
+        executor.shutdown(wait=True, cancel_futures=True)
+        cancelled = [item for future, item in futures.items() if future.cancelled()]
+
+        metrics.increment("cancelled", len(cancelled))
+        logger.debug(
+            "cancelled %s", ", ".join(get_debug_title(item) for item in cancelled)
+        )
+
+        raise DeadlineExceededError(
+            f"{metrics.name}: deadline passed, cancelled {len(cancelled)} saves"
+        )
+    finally:
+        # Stop queued tasks as soon as one fails, waiting for those in flight
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if metrics.counters.get("failed"):
+        logger.warning(
+            "%s: %d items failed to sync", metrics.name, metrics.counters["failed"]
+        )
+
+
+def get_filter_reason(
+    job: SyncJob,
+    item: ContentItem,
+    tag_include_ids: List[str],
+    tag_exclude_ids: List[str],
+    quality_profile_include_ids: List[str],
+    quality_profile_exclude_ids: List[str],
+) -> Optional[str]:
+    """Return the name of the option that filters item out, or None to include it"""
+
+    if tag_exclude_ids and (
+        set(map(lambda t: str(t), item.tags)) & set(tag_exclude_ids)
+    ):
+        logger.debug(
+            "skipping %s: source_tag_exclude source (%s) config (%s)",
+            get_debug_title(item),
+            item.tags,
+            tag_exclude_ids,
+        )
+        return "source_tag_exclude"
+
+    if tag_include_ids and not (
+        set(map(lambda t: str(t), item.tags)) & set(tag_include_ids)
+    ):
+        logger.debug(
+            "skipping %s: source_tag_include source (%s) config (%s)",
+            get_debug_title(item),
+            item.tags,
+            tag_include_ids,
+        )
+        return "source_tag_include"
+
+    if (
+        quality_profile_exclude_ids
+        and str(item.quality_profile_id) in quality_profile_exclude_ids
+    ):
+        logger.debug(
+            "skipping %s: source_profile_exclude source (%s) config (%s)",
+            get_debug_title(item),
+            item.quality_profile_id,
+            quality_profile_exclude_ids,
+        )
+        return "source_profile_exclude"
+
+    if (
+        quality_profile_include_ids
+        and str(item.quality_profile_id) not in quality_profile_include_ids
+    ):
+        logger.debug(
+            "skipping %s: source_profile_include source (%s) config (%s)",
+            get_debug_title(item),
+            item.quality_profile_id,
+            quality_profile_include_ids,
+        )
+        return "source_profile_include"
+
+    if isinstance(job, RadarrSyncJob) and isinstance(item, RadarrContent):
+        if not job.source_include_missing and not item.has_file:
+            logger.debug(
+                "skipping %s: source_include_missing is False",
+                get_debug_title(item),
+            )
+            return "source_include_missing"
+
+    return None
 
 
 def calculate_content_diff(
@@ -105,8 +502,39 @@ def calculate_content_diff(
     source_tags: Tags,
     source_profiles: Profiles,
     dest_content: ContentItems,
+    metrics: Optional[JobMetrics] = None,
+    quarantine: Optional[Quarantine] = None,
+    skipped: Optional[List[Tuple[ContentItem, str]]] = None,
 ) -> ContentItems:
+    metrics = metrics if metrics else JobMetrics(job.name)
+
     diff_content = list(set(source_content) - set(dest_content))
+
+    metrics.increment("diffed", len(diff_content))
+
+    return filter_content(
+        job=job,
+        content=diff_content,
+        source_tags=source_tags,
+        source_profiles=source_profiles,
+        metrics=metrics,
+        quarantine=quarantine,
+        skipped=skipped,
+    )
+
+
+def filter_content(
+    job: SyncJob,
+    content: ContentItems,
+    source_tags: Tags,
+    source_profiles: Profiles,
+    metrics: Optional[JobMetrics] = None,
+    quarantine: Optional[Quarantine] = None,
+    skipped: Optional[List[Tuple[ContentItem, str]]] = None,
+) -> ContentItems:
+    """Return the content the source options of job include, counting the reason
+    for each item filtered out in metrics and adding it to skipped if given"""
+
     filtered_content: ContentItems = []
 
     tag_include_ids = find_ids_in_list(source_tags, job.source_tag_include)
@@ -119,116 +547,1010 @@ def calculate_content_diff(
         source_profiles, job.source_profile_exclude
     )
 
-    for item in diff_content:
-        if tag_exclude_ids and (
-            set(map(lambda t: str(t), item.tags)) & set(tag_exclude_ids)
-        ):
-            logger.debug(
-                "skipping %s: source_tag_exclude source (%s) config (%s)",
-                get_debug_title(item),
-                item.tags,
-                tag_exclude_ids,
+    for item in content:
+        if quarantine and quarantine.is_quarantined(item):
+            logger.debug("skipping %s: quarantined", get_debug_title(item))
+            reason: Optional[str] = "quarantined"
+        else:
+            reason = get_filter_reason(
+                job=job,
+                item=item,
+                tag_include_ids=tag_include_ids,
+                tag_exclude_ids=tag_exclude_ids,
+                quality_profile_include_ids=quality_profile_include_ids,
+                quality_profile_exclude_ids=quality_profile_exclude_ids,
             )
+
+        if reason:
+            if metrics:
+                metrics.filter(reason)
+            if skipped is not None:
+                skipped.append((item, reason))
             continue
 
-        if tag_include_ids and not (
-            set(map(lambda t: str(t), item.tags)) & set(tag_include_ids)
-        ):
-            logger.debug(
-                "skipping %s: source_tag_include source (%s) config (%s)",
-                get_debug_title(item),
-                item.tags,
-                tag_include_ids,
+        logger.debug("including %s", get_debug_title(item))
+        filtered_content.append(item)
+
+    return filtered_content
+
+
+def get_fingerprint(
+    monitored: bool, tags: List[int], quality_profile_id: int
+) -> Hashable:
+    """Return what update mode compares between the source and destination copy of
+    an item, so only these fields are compared rather than whole models"""
+
+    return hash((monitored, tuple(sorted(tags)), quality_profile_id))
+
+
+def plan_updates(
+    job: SyncJob,
+    sources: List[Tuple[SyncJob, SourceLibrary]],
+    dest: DestLibrary,
+    metrics: JobMetrics,
+    mappings: Optional[List[ContentMapping]] = None,
+) -> List[Tuple[ContentItem, Dict[str, Any]]]:
+    """Return the destination items whose monitored state, profile or tags differ
+    from the source, with the changes to make to each"""
+
+    dest_items = {item: item for item in dest.content}
+    mappings = mappings if mappings else [ContentMapping() for _ in sources]
+
+    with metrics.stage("diff"):
+        # Filtered counts were already recorded when diffing the missing items
+        source_items: Dict[ContentItem, Tuple[ContentItem, ContentMapping]] = {}
+
+        for (source_job, source), mapping in zip(sources, mappings):
+            for item in filter_content(
+                job=source_job,
+                content=[item for item in source.content if item in dest_items],
+                source_tags=source.tags,
+                source_profiles=source.profiles,
+            ):
+                source_items.setdefault(item, (item, mapping))
+
+        updates: List[Tuple[ContentItem, Dict[str, Any]]] = []
+
+        for item, mapping in source_items.values():
+            dest_item = dest_items[item]
+            # Source profile and tag ids mean nothing on the destination, so they
+            # are only changed when the job maps them
+            profile_id = mapping.profiles.get(
+                item.quality_profile_id, dest_item.quality_profile_id
+            )
+            tags = (
+                dest_item.tags if mapping.tags is None else mapping.map_tags(item.tags)
             )
-            continue
 
-        if (
-            quality_profile_exclude_ids
-            and str(item.quality_profile_id) in quality_profile_exclude_ids
-        ):
-            logger.debug(
-                "skipping %s: source_profile_exclude source (%s) config (%s)",
-                get_debug_title(item),
-                item.quality_profile_id,
-                quality_profile_exclude_ids,
+            if get_fingerprint(item.monitored, tags, profile_id) == get_fingerprint(
+                dest_item.monitored, dest_item.tags, dest_item.quality_profile_id
+            ):
+                continue
+
+            logger.debug("changed %s", get_debug_title(item))
+            updates.append(
+                (
+                    dest_item,
+                    {
+                        "monitored": item.monitored,
+                        "tags": tags,
+                        "qualityProfileId": profile_id,
+                    },
+                )
             )
-            continue
 
-        if (
-            quality_profile_include_ids
-            and str(item.quality_profile_id) not in quality_profile_include_ids
-        ):
-            logger.debug(
-                "skipping %s: source_profile_include source (%s) config (%s)",
-                get_debug_title(item),
-                item.quality_profile_id,
-                quality_profile_include_ids,
+    return updates
+
+
+def resolve_profile_map(
+    job: SyncJob, source_profiles: Profiles, dest_profiles: Profiles
+) -> Dict[int, int]:
+    """Resolve the profile_map of job to destination profile ids by source id"""
+
+    profile_map: Dict[int, int] = {}
+
+    for source_query, dest_query in job.profile_map.items():
+        source_profile = find_in_list(source_profiles, source_query)
+        dest_profile = find_in_list(dest_profiles, dest_query)
+
+        if not source_profile or not dest_profile:
+            raise Exception(
+                f"{job.name}: unable to map profile '{source_query}' to '{dest_query}'"
             )
-            continue
 
-        if isinstance(job, RadarrSyncJob) and isinstance(item, RadarrContent):
-            if not job.source_include_missing and not item.has_file:
-                logger.debug(
-                    "skipping %s: source_include_missing is False",
-                    get_debug_title(item),
+        profile_map[source_profile.id] = dest_profile.id
+
+    return profile_map
+
+
+def get_placeholder_tags(dest_tags: Tags) -> List[Tag]:
+    """Return the tags a dry run would have created"""
+
+    return [tag for tag in dest_tags if tag.id < 0]
+
+
+def create_planned_tags(
+    job: SyncJob, planned: JobPlan, dest_api: Api, dry_run: bool
+) -> JobPlan:
+    """Create the tags planned with dest_tag_create, unless they were created since,
+    and point the planned changes at them"""
+
+    if not planned.create_tags:
+        return planned
+
+    dest_tags = dest_api.tag()
+    tag_ids: Dict[int, int] = {}
+
+    for placeholder in planned.create_tags:
+        tag = find_in_list(dest_tags, placeholder.label) or create_dest_tag(
+            job, placeholder.label, dest_tags, dest_api, dry_run
+        )
+
+        if tag:
+            tag_ids[placeholder.id] = tag.id
+
+    return planned.map_tags(tag_ids)
+
+
+def create_dest_tag(
+    job: SyncJob, label: str, dest_tags: Tags, dest_api: Api, dry_run: bool
+) -> Optional[Tag]:
+    if not job.dest_tag_create:
+        logger.debug("%s: tag %s is not on the destination", job.name, label)
+        return None
+
+    if dry_run:
+        # A placeholder with a negative id, which a plan records so --apply creates
+        # the tag and saves the items with it
+        tag = Tag(id=-1 - len(get_placeholder_tags(dest_tags)), label=label)
+        dest_tags.append(tag)
+        logger.info("created tag %s (dry-run)", label)
+        return tag
+
+    tag = dest_api.create_tag(label)
+    # Later sources of the same destination map to the created tag
+    dest_tags.append(tag)
+    logger.info("created tag %s", label)
+
+    return tag
+
+
+def resolve_tag_map(
+    job: SyncJob,
+    source_tags: Tags,
+    dest_tags: Tags,
+    dest_api: Api,
+    dry_run: bool,
+    tag_ids: Set[int],
+) -> Optional[Dict[int, int]]:
+    """Resolve the source tags in tag_ids to the destination tag tag_map names, or
+    with the same label, creating missing tags with dest_tag_create. Returns None
+    to keep the source tag ids when the job maps no tags"""
+
+    if not job.tag_map and not job.dest_tag_create:
+        return None
+
+    dest_queries = {tag.id: tag.label for tag in source_tags if tag.id in tag_ids}
+
+    for source_query, dest_query in job.tag_map.items():
+        source_tag = find_in_list(source_tags, source_query)
+
+        if not source_tag:
+            raise Exception(f"{job.name}: unable to map unknown tag '{source_query}'")
+
+        if source_tag.id in tag_ids:
+            dest_queries[source_tag.id] = dest_query
+
+    tag_map: Dict[int, int] = {}
+
+    for source_id, dest_query in dest_queries.items():
+        dest_tag = find_in_list(dest_tags, dest_query) or create_dest_tag(
+            job, dest_query, dest_tags, dest_api, dry_run
+        )
+
+        if dest_tag:
+            tag_map[source_id] = dest_tag.id
+
+    return tag_map
+
+
+def get_synced_tag_ids(
+    job: SyncJob, source: SourceLibrary, dest: DestLibrary, update: bool
+) -> Set[int]:
+    """Return the ids of the tags on the source items the source options of job
+    include that would be added to dest, or also updated on it with update set"""
+
+    dest_items = set(dest.content)
+    content = filter_content(
+        job=job,
+        content=[item for item in source.content if update or item not in dest_items],
+        source_tags=source.tags,
+        source_profiles=source.profiles,
+    )
+
+    return {tag for item in content for tag in item.tags}
+
+
+def get_root_folder_map(job: SyncJob, dest_api: Api) -> Optional[RootFolderMap]:
+    """Compile the root_folder_map of job, checking every folder it saves items to
+    is a root folder of the destination"""
+
+    if not job.root_folder_map:
+        return None
+
+    root_folders = {folder.path.rstrip("/") for folder in dest_api.root_folder()}
+
+    for path in [job.dest_path] + [dest for _, dest in job.root_folder_map]:
+        if path.rstrip("/") not in root_folders:
+            raise Exception(
+                f"{job.name}: {path} is not a root folder of the destination"
+            )
+
+    return RootFolderMap(job.root_folder_map, job.dest_path)
+
+
+def resolve_mapping(
+    job: SyncJob,
+    source: SourceLibrary,
+    dest: DestLibrary,
+    dest_api: Api,
+    dry_run: bool,
+    root_folders: Optional[RootFolderMap] = None,
+    update: bool = False,
+) -> ContentMapping:
+    # Only the tags that are synced are mapped, so filtered out items never have
+    # their tags created on the destination
+    tag_ids = get_synced_tag_ids(job, source, dest, update)
+
+    return ContentMapping(
+        profiles=resolve_profile_map(job, source.profiles, dest.profiles),
+        tags=resolve_tag_map(job, source.tags, dest.tags, dest_api, dry_run, tag_ids),
+        root_folders=root_folders,
+    )
+
+
+class SourceCache(object):
+    """Fetches the source library of job once, for every destination synced from it"""
+
+    library: Optional[SourceLibrary]
+    error: Optional[Exception]
+
+    def __init__(
+        self,
+        job: SyncJob,
+        source_api: Api,
+        metrics: JobMetrics,
+        library: Optional[SourceLibrary] = None,
+    ):
+        self.job = job
+        self.source_api = source_api
+        self.metrics = metrics
+        self.library = library
+        self.albums: Optional[Albums] = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def get(self) -> SourceLibrary:
+        with self.lock:
+            # Fail every destination with the first error rather than refetching
+            if self.error:
+                raise self.error
+
+            if not self.library:
+                try:
+                    with self.metrics.stage("fetch"):
+                        check_status(self.job, self.source_api)
+
+                        self.library = SourceLibrary.model_construct(
+                            tags=self.source_api.tag(),
+                            profiles=self.source_api.profile(),
+                            content=self.source_api.content(),
+                        )
+                except Exception as e:
+                    self.error = e
+                    raise
+
+            return self.library
+
+    def get_albums(self) -> Albums:
+        with self.lock:
+            if self.albums is None:
+                with self.metrics.stage("fetch"):
+                    self.albums = self.source_api.album()
+
+            return self.albums
+
+
+def merge_content(contents: List[ContentItems]) -> ContentItems:
+    """Return the union of contents, keeping the first of any equal items so
+    earlier contents take precedence"""
+
+    merged: Dict[ContentItem, ContentItem] = {}
+
+    for content in contents:
+        for item in content:
+            merged.setdefault(item, item)
+
+    return list(merged.values())
+
+
+def fetch_dest_library(dest_api: Api, metrics: JobMetrics) -> DestLibrary:
+    with metrics.stage("fetch"):
+        return DestLibrary.model_construct(
+            profiles=dest_api.profile(),
+            metadata_profiles=dest_api.metadata(),
+            languages=dest_api.language(),
+            content=dest_api.content(),
+            tags=dest_api.tag(),
+        )
+
+
+def fetch_libraries(
+    job: SyncJob, api: Api, metrics: JobMetrics
+) -> Tuple[SourceLibrary, DestLibrary]:
+    """Fetch an instance once for syncing both from and to it"""
+
+    with metrics.stage("fetch"):
+        check_status(job, api)
+
+        tags = api.tag()
+        profiles = api.profile()
+        content = api.content()
+
+        return SourceLibrary.model_construct(
+            tags=tags, profiles=profiles, content=content
+        ), DestLibrary.model_construct(
+            profiles=profiles,
+            metadata_profiles=api.metadata(),
+            languages=api.language(),
+            content=content,
+            tags=tags,
+        )
+
+
+def plan_sync_job(
+    job: SyncJob,
+    sources: List[Tuple[SyncJob, SourceLibrary]],
+    dest: DestLibrary,
+    metrics: JobMetrics,
+    quarantine: Optional[Quarantine] = None,
+    mappings: Optional[List[ContentMapping]] = None,
+    skipped: Optional[List[Tuple[ContentItem, str]]] = None,
+) -> ContentItems:
+    """Return the payloads for the content of sources missing from dest, filtering
+    each source with the options of its job and mapping it with its mapping"""
+
+    mappings = mappings if mappings else [ContentMapping() for _ in sources]
+
+    with metrics.stage("diff"):
+        content_diffs = [
+            calculate_content_diff(
+                job=source_job,
+                source_content=source.content,
+                source_tags=source.tags,
+                source_profiles=source.profiles,
+                dest_content=dest.content,
+                metrics=metrics,
+                quarantine=quarantine,
+                skipped=skipped,
+            )
+            for source_job, source in sources
+        ]
+
+    with metrics.stage("payloads"):
+        return merge_content(
+            [
+                get_content_payloads(
+                    job=job,
+                    content=content_diff,
+                    dest_profiles=dest.profiles,
+                    dest_metadata_profiles=dest.metadata_profiles,
+                    dest_languages=dest.languages,
+                    mapping=mapping,
                 )
-                continue
+                for content_diff, mapping in zip(content_diffs, mappings)
+            ]
+        )
 
-        logger.debug("including %s", get_debug_title(item))
-        filtered_content.append(item)
 
-    return filtered_content
+def plan_deletions(
+    job: SyncJob,
+    sources: List[Tuple[SyncJob, SourceLibrary]],
+    dest: DestLibrary,
+    metrics: JobMetrics,
+) -> ContentItems:
+    """Return the destination items that are on none of the sources, refusing to
+    delete more than dest_delete_max of them"""
 
+    with metrics.stage("diff"):
+        source_items = {item for _, source in sources for item in source.content}
+        deletions = [item for item in dest.content if item not in source_items]
 
-def start_sync_job(job: SyncJob, dry_run: bool = False) -> None:
-    logger.debug("starting %s job", job.name)
+    if len(deletions) > job.dest_delete_max:
+        # Most likely a source returned less than its whole library
+        raise DeleteLimitError(
+            f"{job.name}: refusing to delete {len(deletions)} items, "
+            f"more than dest_delete_max ({job.dest_delete_max})"
+        )
+
+    return deletions
+
+
+def plan_album_monitoring(
+    sources: List[Tuple[SyncJob, SourceLibrary, Albums]],
+    dest: DestLibrary,
+    dest_albums: Albums,
+    metrics: JobMetrics,
+) -> Dict[bool, List[int]]:
+    """Return the ids of the destination albums to monitor (True) and unmonitor
+    (False) to match the source, by foreign album id, for the artists on both"""
+
+    with metrics.stage("diff"):
+        dest_items = set(dest.content)
+        source_monitored: Dict[str, bool] = {}
+
+        for source_job, source, albums in sources:
+            artist_ids = {
+                item.id
+                for item in filter_content(
+                    job=source_job,
+                    content=[item for item in source.content if item in dest_items],
+                    source_tags=source.tags,
+                    source_profiles=source.profiles,
+                )
+            }
+
+            for album in albums:
+                if album.artist_id in artist_ids:
+                    source_monitored.setdefault(album.foreign_album_id, album.monitored)
+
+        changes: Dict[bool, List[int]] = {True: [], False: []}
+
+        for album in dest_albums:
+            monitored = source_monitored.get(album.foreign_album_id, album.monitored)
+
+            if monitored != album.monitored:
+                changes[monitored].append(album.id)
+
+    # Leave out empty keys, so a run with nothing to change plans no changes
+    return {monitored: ids for monitored, ids in changes.items() if ids}
+
+
+def monitor_albums(
+    changes: Dict[bool, List[int]],
+    dest_api: Api,
+    dry_run: bool,
+    metrics: JobMetrics,
+    limiter: AdaptiveLimiter,
+) -> None:
+    """Change the monitoring of albums in batches, sent concurrently"""
+
+    batches = [
+        (monitored, album_ids[start : start + ALBUM_BATCH_SIZE])
+        for monitored, album_ids in changes.items()
+        for start in range(0, len(album_ids), ALBUM_BATCH_SIZE)
+    ]
+
+    def monitor(monitored: bool, album_ids: List[int]) -> None:
+        if not dry_run:
+            call_limited(
+                limiter, partial(dest_api.monitor_albums, album_ids, monitored)
+            )
+
+        metrics.increment(
+            "albums_monitored" if monitored else "albums_unmonitored", len(album_ids)
+        )
+        logger.info(
+            "%s %d albums%s",
+            "monitored" if monitored else "unmonitored",
+            len(album_ids),
+            " (dry-run)" if dry_run else "",
+        )
 
-    with Api(
+    with ThreadPoolExecutor(max_workers=limiter.max_limit) as executor:
+        for future in [executor.submit(monitor, *batch) for batch in batches]:
+            future.result()
+
+
+def resume_sync_job(
+    job: SyncJob,
+    dest_content: ContentItems,
+    pending: JobPlan,
+    quarantine: Optional[Quarantine],
+) -> Changes:
+    """Return the journaled changes that still apply: the payloads still missing
+    from the destination and not quarantined since, and the updates and deletions
+    of items still on it"""
+
+    dest_items = set(dest_content)
+    dest_ids = {item.id for item in dest_content}
+    content_payloads: ContentItems = []
+
+    for item in pending.get_content():
+        if item in dest_items:
+            continue
+
+        if quarantine and quarantine.is_quarantined(item):
+            logger.debug("skipping %s: quarantined", get_debug_title(item))
+            continue
+
+        content_payloads.append(item)
+
+    updates = [
+        (item, changes)
+        for item, changes in pending.get_updates()
+        if item.id in dest_ids
+    ]
+    deletions = [item for item in pending.get_deletions() if item.id in dest_ids]
+
+    logger.info(
+        "%s: resuming %d unsaved items from the journal",
+        job.name,
+        len(content_payloads),
+    )
+
+    return content_payloads, updates, deletions, pending.get_album_changes()
+
+
+def get_retry_policy(job: SyncJob) -> RetryPolicy:
+    return RetryPolicy(
+        retries=job.retries,
+        backoff=job.retry_backoff,
+        backoff_max=job.retry_backoff_max,
+    )
+
+
+def create_source_api(job: SyncJob, metrics: JobMetrics) -> Api:
+    return Api(
         job_type=job.type,
         url=str(job.source_url),
         api_key=job.source_key,
         headers=job.source_headers,
-    ) as source_api, Api(
+        metrics=metrics,
+        retry=get_retry_policy(job),
+        breaker=get_breaker(str(job.source_url)),
+        timeout=job.source_timeout,
+        chunk_size=job.fetch_chunk_size,
+    )
+
+
+def create_dest_api(job: SyncJob, metrics: JobMetrics) -> Api:
+    return Api(
         job_type=job.type,
         url=str(job.dest_url),
         api_key=job.dest_key,
         headers=job.dest_headers,
-    ) as dest_api:
-        source_status = source_api.status()
-        dest_status = dest_api.status()
+        metrics=metrics,
+        retry=get_retry_policy(job),
+        pool_size=job.dest_max_concurrency,
+        breaker=get_breaker(str(job.dest_url)),
+        timeout=job.dest_timeout,
+        chunk_size=job.fetch_chunk_size,
+    )
 
-        if not source_status or not dest_status:
-            logger.error("failed %s job", job.name)
-            raise Exception("failed to check stauts")
 
-        source_tags = source_api.tag()
+def check_status(job: SyncJob, api: Api) -> None:
+    if not api.status():
+        logger.error("failed %s job", job.name)
+        raise Exception("failed to check stauts")
 
-        source_profiles = source_api.profile()
 
-        dest_profiles = dest_api.profile()
+def get_deadline(job: SyncJob) -> Optional[float]:
+    return time.monotonic() + job.deadline if job.deadline else None
 
-        dest_metadata_profiles = dest_api.metadata()
 
-        dest_languages = dest_api.language()
+def fetch_sources(
+    sources: List[SourceCache],
+) -> List[Tuple[SyncJob, SourceLibrary]]:
+    if len(sources) == 1:
+        # Most jobs have one source, fetched on this thread as nothing runs beside it
+        libraries = [sources[0].get()]
+    else:
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            libraries = list(executor.map(SourceCache.get, sources))
 
-        source_content = source_api.content()
+    return [(source.job, library) for source, library in zip(sources, libraries)]
 
-        dest_content = dest_api.content()
 
-        content_diff = calculate_content_diff(
-            job=job,
-            source_content=source_content,
-            source_tags=source_tags,
-            source_profiles=source_profiles,
-            dest_content=dest_content,
+def plan_destination(
+    job: SyncJob,
+    sources: List[SourceCache],
+    dest_api: Api,
+    dry_run: bool,
+    metrics: JobMetrics,
+    quarantine: Optional[Quarantine],
+    dest: Optional[DestLibrary] = None,
+    plan: Optional[Plan] = None,
+) -> Changes:
+    """Return the changes to make to the destination of job, adding them to plan
+    under the name of job if given"""
+
+    source_libraries = fetch_sources(sources)
+    dest = dest if dest else fetch_dest_library(dest_api, metrics)
+
+    with metrics.stage("map"):
+        root_folders = get_root_folder_map(job, dest_api)
+        mappings = [
+            resolve_mapping(
+                source_job,
+                library,
+                dest,
+                dest_api,
+                dry_run,
+                root_folders,
+                job.dest_update,
+            )
+            for source_job, library in source_libraries
+        ]
+
+    skipped: List[Tuple[ContentItem, str]] = []
+    content_payloads = plan_sync_job(
+        job, source_libraries, dest, metrics, quarantine, mappings, skipped
+    )
+    updates: List[Tuple[ContentItem, Dict[str, Any]]] = []
+    deletions: ContentItems = []
+    album_changes: Dict[bool, List[int]] = {}
+
+    if job.dest_update:
+        updates = plan_updates(job, source_libraries, dest, metrics, mappings)
+
+    if job.dest_delete:
+        deletions = plan_deletions(job, source_libraries, dest, metrics)
+
+    if isinstance(job, LidarrSyncJob) and job.dest_album_monitor:
+        album_changes = plan_album_monitoring(
+            [
+                (source_job, library, source.get_albums())
+                for source, (source_job, library) in zip(sources, source_libraries)
+            ],
+            dest,
+            dest_api.album(),
+            metrics,
+        )
+
+    if plan is not None:
+        plan.jobs[job.name] = JobPlan.create(
+            job.type,
+            str(job.dest_url),
+            content_payloads,
+            updates,
+            deletions,
+            album_changes,
+            skipped,
+            get_placeholder_tags(dest.tags),
+        )
+
+    return content_payloads, updates, deletions, album_changes
+
+
+def sync_destination(
+    job: SyncJob,
+    sources: List[SourceCache],
+    dest_api: Api,
+    dry_run: bool,
+    metrics: JobMetrics,
+    deadline: Optional[float],
+    dest: Optional[DestLibrary] = None,
+    plan: Optional[Plan] = None,
+    planned: Optional[JobPlan] = None,
+) -> None:
+    """Sync the content of sources missing from the destination of job, fetching
+    the destination unless dest was already fetched. Changes are added to plan if
+    given, or taken from planned without fetching either library"""
+
+    if not dest:
+        with metrics.stage("fetch"):
+            check_status(job, dest_api)
+
+    # A dry run saves nothing, so it neither resumes nor records a plan
+    journal = Journal(job.journal_dir, job.name) if job.journal_dir else None
+    journal = None if dry_run else journal
+
+    quarantine = (
+        Quarantine(job.quarantine_file, job.name, job.quarantine_backoff)
+        if job.quarantine_file
+        else None
+    )
+
+    pending = journal.pending(job.type) if journal else None
+
+    if pending is not None and planned is not None:
+        logger.warning(
+            "%s: applying the plan instead of resuming the unfinished journal",
+            job.name,
+        )
+        pending = None
+
+    if journal and pending is not None:
+        with metrics.stage("fetch"):
+            dest_content = dest.content if dest else dest_api.content()
+
+        with metrics.stage("verify"):
+            changes = resume_sync_job(job, dest_content, pending, quarantine)
+
+        journal.resume()
+    elif planned is not None:
+        changes = (
+            planned.get_content(),
+            planned.get_updates(),
+            planned.get_deletions(),
+            planned.get_album_changes(),
+        )
+    else:
+        changes = plan_destination(
+            job, sources, dest_api, dry_run, metrics, quarantine, dest, plan
+        )
+
+    content_payloads, updates, deletions, album_changes = changes
+
+    if journal and pending is None and any(changes):
+        journal.plan(
+            content_payloads,
+            JobPlan.create(
+                job.type, str(job.dest_url), [], updates, deletions, album_changes, []
+            ),
+        )
+
+    limiter = get_limiter(str(job.dest_url), job.dest_max_concurrency)
+
+    with metrics.stage("sync"):
+        try:
+            sync_content(
+                content=content_payloads,
+                dest_api=dest_api,
+                dry_run=dry_run,
+                metrics=metrics,
+                limiter=limiter,
+                journal=journal,
+                quarantine=quarantine,
+                continue_on_error=job.continue_on_error,
+                deadline=deadline,
+            )
+        finally:
+            if quarantine:
+                quarantine.save()
+
+        update_content(
+            updates=updates,
+            dest_api=dest_api,
+            dry_run=dry_run,
+            metrics=metrics,
+            limiter=limiter,
+            continue_on_error=job.continue_on_error,
+            deadline=deadline,
+        )
+
+        delete_content(
+            deletions=deletions,
+            dest_api=dest_api,
+            dry_run=dry_run,
+            metrics=metrics,
+            limiter=limiter,
+            continue_on_error=job.continue_on_error,
+            deadline=deadline,
+        )
+
+        monitor_albums(album_changes, dest_api, dry_run, metrics, limiter)
+
+    if journal and (pending is not None or any(changes)):
+        journal.complete()
+
+    logger.debug(
+        "%s: concurrency limit for %s is %d",
+        job.name,
+        job.dest_url,
+        limiter.current,
+    )
+
+
+def get_reverse_job(job: SyncJob) -> SyncJob:
+    """Return the job syncing the destination of a bidirectional job to its source"""
+
+    return job.model_copy(
+        update={
+            "name": f"{job.name}.reverse",
+            "source_url": job.dest_url,
+            "source_key": job.dest_key,
+            "source_headers": job.dest_headers,
+            "source_timeout": job.dest_timeout,
+            "dest_url": job.source_url,
+            "dest_key": job.source_key,
+            "dest_headers": job.source_headers,
+            "dest_timeout": job.source_timeout,
+            "dest_path": job.source_path,
+            "dest_profile": job.source_profile or "",
+            "profile_map": {dest: source for source, dest in job.profile_map.items()},
+            "tag_map": {dest: source for source, dest in job.tag_map.items()},
+            # Rules match the source's folders, so they do not reverse
+            "root_folder_map": [],
+        }
+    )
+
+
+def start_bidirectional_job(
+    job: SyncJob,
+    dry_run: bool,
+    metrics: JobMetrics,
+    deadline: Optional[float],
+    plan: Optional[Plan] = None,
+) -> None:
+    """Fetch both instances once and sync the content each is missing from the
+    other, in both directions at the same time"""
+
+    reverse_job = get_reverse_job(job)
+
+    with create_source_api(job, metrics) as source_api, create_dest_api(
+        job, metrics
+    ) as dest_api, ThreadPoolExecutor(max_workers=2) as executor:
+        source_future = executor.submit(fetch_libraries, job, source_api, metrics)
+        dest_future = executor.submit(fetch_libraries, reverse_job, dest_api, metrics)
+
+        source_library, source_dest_library = source_future.result()
+        dest_source_library, dest_library = dest_future.result()
+
+        # Both differences are planned before either direction saves anything,
+        # so items synced one way are not sent back the other
+        futures = [
+            executor.submit(
+                sync_destination,
+                job,
+                [SourceCache(job, source_api, metrics, source_library)],
+                dest_api,
+                dry_run,
+                metrics,
+                deadline,
+                dest_library,
+                plan,
+            ),
+            executor.submit(
+                sync_destination,
+                reverse_job,
+                [SourceCache(reverse_job, dest_api, metrics, dest_source_library)],
+                source_api,
+                dry_run,
+                metrics,
+                deadline,
+                source_dest_library,
+                plan,
+            ),
+        ]
+
+        for future in futures:
+            future.result()
+
+
+def apply_job_plan(
+    job: SyncJob,
+    planned: JobPlan,
+    dry_run: bool = False,
+    metrics: Optional[JobMetrics] = None,
+) -> None:
+    """Make the changes planned for job by --plan, without fetching its source or
+    diffing it against the destination again"""
+
+    logger.debug("applying %s job plan", job.name)
+
+    if planned.type is not job.type or planned.dest_url != str(job.dest_url):
+        raise Exception(
+            f"{job.name}: the plan is for a {planned.type.value} destination at "
+            f"{planned.dest_url}, not {job.dest_url}"
+        )
+
+    metrics = metrics if metrics else JobMetrics(job.name)
+
+    with create_dest_api(job, metrics) as dest_api:
+        planned = create_planned_tags(job, planned, dest_api, dry_run)
+        sync_destination(
+            job, [], dest_api, dry_run, metrics, get_deadline(job), planned=planned
         )
 
-        content_payloads = get_content_payloads(
+
+def start_sync_job(
+    job: SyncJob,
+    dry_run: bool = False,
+    metrics: Optional[JobMetrics] = None,
+    plan: Optional[Plan] = None,
+) -> None:
+    logger.debug("starting %s job", job.name)
+
+    deadline = get_deadline(job)
+    metrics = metrics if metrics else JobMetrics(job.name)
+
+    if job.mode is SyncMode.Bidirectional:
+        start_bidirectional_job(job, dry_run, metrics, deadline, plan)
+        return
+
+    with create_source_api(job, metrics) as source_api, create_dest_api(
+        job, metrics
+    ) as dest_api:
+        sync_destination(
             job=job,
-            content=content_diff,
-            dest_profiles=dest_profiles,
-            dest_metadata_profiles=dest_metadata_profiles,
-            dest_languages=dest_languages,
+            sources=[SourceCache(job, source_api, metrics)],
+            dest_api=dest_api,
+            dry_run=dry_run,
+            metrics=metrics,
+            deadline=deadline,
+            plan=plan,
         )
 
-        sync_content(content=content_payloads, dest_api=dest_api, dry_run=dry_run)
+
+def start_fan_out_destination(
+    job: SyncJob,
+    source: SourceCache,
+    dry_run: bool,
+    metrics: JobMetrics,
+    deadline: Optional[float],
+    plan: Optional[Plan] = None,
+) -> None:
+    logger.debug("starting %s job", job.name)
+
+    with create_dest_api(job, metrics) as dest_api:
+        sync_destination(job, [source], dest_api, dry_run, metrics, deadline, plan=plan)
+
+
+def start_fan_out_job(
+    jobs: List[SyncJob],
+    dry_run: bool,
+    metrics: List[JobMetrics],
+    source_metrics: JobMetrics,
+    plan: Optional[Plan] = None,
+) -> List[Optional[BaseException]]:
+    """Fetch the source shared by jobs once and sync it to each of their
+    destinations at the same time, returning the error of each job, if any"""
+
+    deadlines = [get_deadline(job) for job in jobs]
+
+    with create_source_api(jobs[0], source_metrics) as source_api:
+        source = SourceCache(jobs[0], source_api, source_metrics)
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [
+                executor.submit(
+                    start_fan_out_destination,
+                    job,
+                    source,
+                    dry_run,
+                    job_metrics,
+                    deadline,
+                    plan,
+                )
+                for job, job_metrics, deadline in zip(jobs, metrics, deadlines)
+            ]
+
+            return [future.exception() for future in futures]
+
+
+def get_merge_job(jobs: List[SyncJob]) -> SyncJob:
+    """Return the job saving the merged sources of jobs, named after their group"""
+
+    return jobs[0].model_copy(update={"name": jobs[0].group or jobs[0].name})
+
+
+def start_merge_job(
+    jobs: List[SyncJob],
+    dry_run: bool = False,
+    metrics: Optional[JobMetrics] = None,
+    plan: Optional[Plan] = None,
+) -> None:
+    """Sync the union of the sources of jobs to the destination they share, in
+    one pipeline named after their group. Earlier jobs take precedence"""
+
+    job = get_merge_job(jobs)
+
+    logger.debug("starting %s job", job.name)
+
+    deadline = get_deadline(job)
+    metrics = metrics if metrics else JobMetrics(job.name)
+
+    with ExitStack() as stack:
+        sources = [
+            SourceCache(
+                source_job,
+                stack.enter_context(create_source_api(source_job, metrics)),
+                metrics,
+            )
+            for source_job in jobs
+        ]
+        dest_api = stack.enter_context(create_dest_api(job, metrics))
+
+        sync_destination(job, sources, dest_api, dry_run, metrics, deadline, plan=plan)
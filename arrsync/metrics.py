@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+
+PERCENTILES = [50, 90, 99]
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of values, 0 when values is empty"""
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+
+    return ordered[rank - 1]
+
+
+class RouteMetrics(object):
+    count: int
+    bytes: int
+    retries: int
+    latencies: List[float]
+    statuses: Dict[int, int]
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.bytes = 0
+        self.retries = 0
+        self.latencies = []
+        self.statuses = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "statuses": {str(status): n for status, n in self.statuses.items()},
+            "latency": {
+                f"p{pct}": round(percentile(self.latencies, pct), 6)
+                for pct in PERCENTILES
+            },
+        }
+
+
+class JobMetrics(object):
+    """Collects request, stage and item counts for a single sync job"""
+
+    name: str
+    routes: Dict[str, RouteMetrics]
+    hosts: Dict[str, RouteMetrics]
+    stages: Dict[str, float]
+    counters: Dict[str, int]
+    filtered: Dict[str, int]
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.routes = {}
+        self.hosts = {}
+        self.stages = {}
+        self.counters = {}
+        self.filtered = {}
+
+    def record_request(
+        self, route: str, status: int, size: int, latency: float, host: str = ""
+    ) -> None:
+        with self.lock:
+            for request_metrics in [
+                self.routes.setdefault(route, RouteMetrics()),
+                self.hosts.setdefault(host, RouteMetrics()),
+            ]:
+                request_metrics.count += 1
+                request_metrics.bytes += size
+                request_metrics.latencies.append(latency)
+                request_metrics.statuses[status] = (
+                    request_metrics.statuses.get(status, 0) + 1
+                )
+
+    def record_retry(self, route: str) -> None:
+        with self.lock:
+            self.routes.setdefault(route, RouteMetrics()).retries += 1
+            self.counters["retries"] = self.counters.get("retries", 0) + 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def increment(self, counter: str, count: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + count
+
+    def filter(self, reason: str) -> None:
+        with self.lock:
+            self.filtered[reason] = self.filtered.get(reason, 0) + 1
+
+    def finish(self) -> None:
+        self.duration = time.monotonic() - self.started
+
+    @property
+    def saves_per_second(self) -> float:
+        sync_time = self.stages.get("sync", 0.0)
+        saved = self.counters.get("saved", 0)
+
+        return saved / sync_time if sync_time else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "name": self.name,
+                "duration": round(self.duration, 6),
+                "requests": sum(route.count for route in self.routes.values()),
+                "bytes": sum(route.bytes for route in self.routes.values()),
+                "routes": {
+                    route: route_metrics.summary()
+                    for route, route_metrics in self.routes.items()
+                },
+                "stages": {
+                    stage: round(elapsed, 6) for stage, elapsed in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                "filtered": dict(self.filtered),
+                "saves_per_second": round(self.saves_per_second, 3),
+            }
+
+    def log_line(self) -> str:
+        summary = self.summary()
+
+        return (
+            f"{summary['requests']} requests ({summary['bytes']} bytes), "
+            f"{summary['counters'].get('diffed', 0)} diffed, "
+            f"{sum(summary['filtered'].values())} filtered, "
+            f"{summary['counters'].get('saved', 0)} saved "
+            f"({summary['saves_per_second']}/s) in {summary['duration']:.2f}s"
+        )
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**label_values: str) -> str:
+    return ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in label_values.items()
+    )
+
+
+def to_json(job_metrics: List[JobMetrics]) -> str:
+    return json.dumps([metrics.summary() for metrics in job_metrics], indent=2)
+
+
+def to_prometheus(job_metrics: List[JobMetrics]) -> str:
+    """Render job metrics in the Prometheus text exposition format"""
+
+    lines: List[str] = [
+        "# TYPE arrsync_job_duration_seconds gauge",
+        "# TYPE arrsync_job_stage_seconds gauge",
+        "# TYPE arrsync_job_items gauge",
+        "# TYPE arrsync_job_filtered_items gauge",
+        "# TYPE arrsync_job_requests gauge",
+        "# TYPE arrsync_job_request_bytes gauge",
+        "# TYPE arrsync_job_request_retries gauge",
+        "# TYPE arrsync_job_request_latency_seconds summary",
+    ]
+
+    for metrics in job_metrics:
+        summary = metrics.summary()
+        job = metrics.name
+
+        lines.append(
+            f"arrsync_job_duration_seconds{{{labels(job=job)}}} {summary['duration']}"
+        )
+
+        for stage, elapsed in summary["stages"].items():
+            lines.append(
+                f"arrsync_job_stage_seconds{{{labels(job=job, stage=stage)}}} {elapsed}"
+            )
+
+        for counter, count in summary["counters"].items():
+            lines.append(
+                f"arrsync_job_items{{{labels(job=job, counter=counter)}}} {count}"
+            )
+
+        for reason, count in summary["filtered"].items():
+            lines.append(
+                f"arrsync_job_filtered_items{{{labels(job=job, reason=reason)}}} {count}"
+            )
+
+        for route, route_summary in summary["routes"].items():
+            route_labels = labels(job=job, route=route)
+
+            lines.append(
+                f"arrsync_job_requests{{{route_labels}}} {route_summary['count']}"
+            )
+            lines.append(
+                f"arrsync_job_request_bytes{{{route_labels}}} {route_summary['bytes']}"
+            )
+            lines.append(
+                f"arrsync_job_request_retries{{{route_labels}}} {route_summary['retries']}"
+            )
+
+            for pct in PERCENTILES:
+                quantile_labels = labels(job=job, route=route, quantile=str(pct / 100))
+                lines.append(
+                    f"arrsync_job_request_latency_seconds{{{quantile_labels}}} "
+                    f"{route_summary['latency'][f'p{pct}']}"
+                )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str, job_metrics: List[JobMetrics], format: str) -> None:
+    """Write job metrics to path as json or prometheus text"""
+
+    output = (
+        to_prometheus(job_metrics) if format == "prometheus" else to_json(job_metrics)
+    )
+
+    with open(path, "w") as file:
+        file.write(output)
+
+
+class Histogram(object):
+    buckets: Tuple[float, ...]
+    counts: Dict[LabelValues, List[int]]
+    sums: Dict[LabelValues, float]
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = {}
+        self.sums = {}
+
+    def observe(self, label_values: LabelValues, value: float) -> None:
+        counts = self.counts.setdefault(label_values, [0] * (len(self.buckets) + 1))
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+
+        counts[-1] += 1
+        self.sums[label_values] = self.sums.get(label_values, 0.0) + value
+
+    def render(self, name: str) -> List[str]:
+        lines = [f"# TYPE {name} histogram"]
+
+        for label_values, counts in self.counts.items():
+            bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+
+            for bound, count in zip(bounds, counts):
+                bucket_labels = labels(**dict(label_values), le=bound)
+                lines.append(f"{name}_bucket{{{bucket_labels}}} {count}")
+
+            series_labels = labels(**dict(label_values))
+            lines.append(f"{name}_sum{{{series_labels}}} {self.sums[label_values]}")
+            lines.append(f"{name}_count{{{series_labels}}} {counts[-1]}")
+
+        return lines
+
+
+class MetricsRegistry(object):
+    """Accumulates job metrics across runs for the Prometheus metrics endpoint"""
+
+    counters: Dict[str, Dict[LabelValues, float]]
+    gauges: Dict[str, Dict[LabelValues, float]]
+    histograms: Dict[str, Histogram]
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {
+            "arrsync_job_duration_seconds": Histogram(JOB_BUCKETS),
+            "arrsync_request_duration_seconds": Histogram(REQUEST_BUCKETS),
+        }
+
+    def _inc(self, name: str, label_values: LabelValues, value: float = 1) -> None:
+        series = self.counters.setdefault(name, {})
+        series[label_values] = series.get(label_values, 0) + value
+
+    def _set(self, name: str, label_values: LabelValues, value: float) -> None:
+        self.gauges.setdefault(name, {})[label_values] = value
+
+    def observe(self, metrics: JobMetrics, success: bool) -> None:
+        """Fold the metrics of a finished job run into the registry"""
+
+        job = (("job", metrics.name),)
+        diffed = metrics.counters.get("diffed", 0)
+        synced = metrics.counters.get("saved", 0)
+        retries = metrics.counters.get("retries", 0)
+        failed = metrics.counters.get("failed", 0)
+
+        with self.lock, metrics.lock:
+            result = (("result", "success" if success else "error"),)
+            self._inc("arrsync_job_runs_total", job + result)
+            self._inc("arrsync_job_items_diffed_total", job, diffed)
+            self._inc("arrsync_job_items_synced_total", job, synced)
+            self._inc("arrsync_job_request_retries_total", job, retries)
+            self._inc("arrsync_job_items_failed_total", job, failed)
+            self._set("arrsync_job_last_run_duration_seconds", job, metrics.duration)
+            self._set("arrsync_job_last_run_timestamp_seconds", job, time.time())
+            self._set("arrsync_job_last_items_diffed", job, diffed)
+            self._set("arrsync_job_last_items_synced", job, synced)
+
+            if success:
+                self._set(
+                    "arrsync_job_last_success_timestamp_seconds", job, time.time()
+                )
+
+            self.histograms["arrsync_job_duration_seconds"].observe(
+                job, metrics.duration
+            )
+
+            for host, host_metrics in metrics.hosts.items():
+                host_labels = job + (("host", host),)
+
+                for latency in host_metrics.latencies:
+                    self.histograms["arrsync_request_duration_seconds"].observe(
+                        host_labels, latency
+                    )
+
+                for status, count in host_metrics.statuses.items():
+                    if status >= 400:
+                        self._inc(
+                            "arrsync_http_errors_total",
+                            host_labels + (("status", str(status)),),
+                            count,
+                        )
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        with self.lock:
+            for kind, metric_series in [
+                ("counter", self.counters),
+                ("gauge", self.gauges),
+            ]:
+                for name, series in sorted(metric_series.items()):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for label_values, value in series.items():
+                        lines.append(
+                            f"{name}{{{labels(**dict(label_values))}}} {value}"
+                        )
+
+            for name, histogram in sorted(self.histograms.items()):
+                lines.extend(histogram.render(name))
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        payload = self.server.registry.render().encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    registry: MetricsRegistry
+
+    def __init__(self, registry: MetricsRegistry, address: Tuple[str, int]):
+        super().__init__(address, MetricsRequestHandler)
+        self.registry = registry
+
+
+def serve_metrics(
+    registry: MetricsRegistry, host: str = "", port: int = 9717
+) -> MetricsServer:
+    """Serve the registry at /metrics from a background thread"""
+
+    server = MetricsServer(registry, (host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
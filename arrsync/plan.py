@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from arrsync.common import ContentItem, ContentItems, JobType, Tag
+from arrsync.utils import get_content_model, get_debug_title
+
+
+class PlannedItem(BaseModel):
+    """An item on the destination, with the id it has there"""
+
+    id: int
+    item: Dict[str, Any]
+
+
+class PlannedUpdate(PlannedItem):
+    changes: Dict[str, Any]
+
+
+class SkippedItem(BaseModel):
+    id: str
+    title: str
+    reason: str
+
+
+class JobPlan(BaseModel):
+    """The changes a job planned to make to its destination"""
+
+    type: JobType
+    dest_url: str
+    add: List[Dict[str, Any]] = []
+    update: List[PlannedUpdate] = []
+    delete: List[PlannedItem] = []
+    monitor_albums: List[int] = []
+    unmonitor_albums: List[int] = []
+    skipped: List[SkippedItem] = []
+    # Tags dest_tag_create makes, with the placeholder ids the changes refer to
+    create_tags: List[Tag] = []
+
+    @classmethod
+    def create(
+        cls,
+        job_type: JobType,
+        dest_url: str,
+        content: ContentItems,
+        updates: List[Tuple[ContentItem, Dict[str, Any]]],
+        deletions: ContentItems,
+        album_changes: Dict[bool, List[int]],
+        skipped: List[Tuple[ContentItem, str]],
+        create_tags: Optional[List[Tag]] = None,
+    ) -> "JobPlan":
+        return cls(
+            type=job_type,
+            dest_url=dest_url,
+            add=[item.model_dump(by_alias=True) for item in content],
+            update=[
+                PlannedUpdate(
+                    id=item.id, item=item.model_dump(by_alias=True), changes=changes
+                )
+                for item, changes in updates
+                if item.id is not None
+            ],
+            delete=[
+                PlannedItem(id=item.id, item=item.model_dump(by_alias=True))
+                for item in deletions
+                if item.id is not None
+            ],
+            monitor_albums=album_changes.get(True, []),
+            unmonitor_albums=album_changes.get(False, []),
+            skipped=[
+                SkippedItem(
+                    id=str(item._id_attr), title=get_debug_title(item), reason=reason
+                )
+                for item, reason in skipped
+            ],
+            create_tags=create_tags or [],
+        )
+
+    def map_tags(self, tag_ids: Dict[int, int]) -> "JobPlan":
+        """Return the plan with the placeholder ids of the tags it creates replaced
+        by tag_ids, dropping the placeholders of tags that were not created"""
+
+        def map_ids(tags: List[int]) -> List[int]:
+            return [tag_ids.get(tag, tag) for tag in tags if tag >= 0 or tag in tag_ids]
+
+        return self.model_copy(
+            update={
+                "add": [
+                    {**item, "tags": map_ids(item.get("tags", []))} for item in self.add
+                ],
+                "update": [
+                    (
+                        update.model_copy(
+                            update={
+                                "changes": {
+                                    **update.changes,
+                                    "tags": map_ids(update.changes["tags"]),
+                                }
+                            }
+                        )
+                        if "tags" in update.changes
+                        else update
+                    )
+                    for update in self.update
+                ],
+                "create_tags": [],
+            }
+        )
+
+    def _dest_item(self, planned: PlannedItem) -> ContentItem:
+        item = get_content_model(self.type).model_validate(planned.item)
+        return item.model_copy(update={"id": planned.id})
+
+    def get_content(self) -> ContentItems:
+        model = get_content_model(self.type)
+        return [model.model_validate(item) for item in self.add]
+
+    def get_updates(self) -> List[Tuple[ContentItem, Dict[str, Any]]]:
+        return [(self._dest_item(update), update.changes) for update in self.update]
+
+    def get_deletions(self) -> ContentItems:
+        return [self._dest_item(item) for item in self.delete]
+
+    def get_album_changes(self) -> Dict[bool, List[int]]:
+        changes = {True: self.monitor_albums, False: self.unmonitor_albums}
+        return {monitored: ids for monitored, ids in changes.items() if ids}
+
+
+class Plan(BaseModel):
+    """The changes planned for each job by --plan, keyed by job name, for --apply
+    to make later without fetching or diffing either library again"""
+
+    jobs: Dict[str, JobPlan] = {}
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as file:
+            file.write(self.model_dump_json(exclude_defaults=True))
+
+    @classmethod
+    def read(cls, path: str) -> "Plan":
+        with open(path) as file:
+            return cls.model_validate_json(file.read())
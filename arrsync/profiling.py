@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import io
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from types import FrameType
+from typing import TYPE_CHECKING, Any, Iterator, List
+
+from arrsync.config import logger
+from arrsync.utils import get_file_name
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+def get_profile_path(name: str, directory: str) -> str:
+    """Return the profile file path for the job name, safe to use as a file name"""
+
+    return os.path.join(directory, f"{get_file_name(name)}.prof")
+
+
+# From Python 3.12 cProfile sees every thread, and only one profiler can be
+# active at a time, so the threads are only given profilers of their own before
+PROFILE_THREADS = sys.version_info < (3, 12)
+
+
+class ThreadProfilers(object):
+    """A threading.setprofile hook giving each thread started while it is set a
+    profiler of its own, as cProfile only sees the thread enabling it"""
+
+    profilers: List["cProfile.Profile"]
+
+    def __init__(self) -> None:
+        self.profilers = []
+        self.lock = threading.Lock()
+
+    def __call__(self, frame: FrameType, event: str, arg: Any) -> None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+        with self.lock:
+            self.profilers.append(profiler)
+
+        profiler.enable()
+
+
+@contextmanager
+def profile_job(name: str, directory: str = ".", limit: int = 20) -> Iterator[None]:
+    """Profile the wrapped block, and the threads it starts, write the stats to
+    directory and log the top entries"""
+
+    # Only pay for importing the profiler when profiling is turned on
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    thread_profilers = ThreadProfilers()
+
+    if PROFILE_THREADS:
+        threading.setprofile(thread_profilers)
+
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+        if PROFILE_THREADS:
+            threading.setprofile(None)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+
+        with thread_profilers.lock:
+            for thread_profiler in thread_profilers.profilers:
+                stats.add(thread_profiler)
+
+        path = get_profile_path(name, directory)
+        os.makedirs(directory, exist_ok=True)
+        stats.dump_stats(path)
+
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+
+        logger.info("%s: profile written to %s", name, path)
+        logger.info(stream.getvalue())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from arrsync.api import ApiError
+from arrsync.common import ContentItem
+from arrsync.config import logger
+from arrsync.utils import get_debug_title
+
+# Enough of an error response to tell what the server rejected
+MAX_BODY_LENGTH = 1000
+
+
+class QuarantineEntry(BaseModel):
+    title: str
+    error: str
+    status_code: Optional[int] = None
+    body: str = ""
+    failed_at: float
+    failures: int = 1
+
+
+class Quarantine(object):
+    """Items that failed to sync for a job, skipped until backoff seconds pass
+
+    The file is shared by jobs and holds an object of entries per job name,
+    keyed by the item id.
+    """
+
+    path: str
+    name: str
+    backoff: float
+    entries: Dict[str, QuarantineEntry]
+
+    def __init__(self, path: str, name: str, backoff: float):
+        self.path = path
+        self.name = name
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.changed = False
+        self.entries = {
+            id: QuarantineEntry.model_validate(entry)
+            for id, entry in self._read().get(name, {}).items()
+        }
+
+    def _read(self) -> Dict[str, Dict[str, object]]:
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path) as file:
+            data: Dict[str, Dict[str, object]] = json.load(file)
+            return data
+
+    def is_quarantined(self, item: ContentItem) -> bool:
+        entry = self.entries.get(str(item._id_attr))
+
+        return entry is not None and time.time() < entry.failed_at + self.backoff
+
+    def add(self, item: ContentItem, error: Exception) -> None:
+        id = str(item._id_attr)
+
+        with self.lock:
+            previous = self.entries.get(id)
+
+            self.entries[id] = QuarantineEntry(
+                title=get_debug_title(item),
+                error=str(error),
+                status_code=error.status_code if isinstance(error, ApiError) else None,
+                body=(
+                    error.body[:MAX_BODY_LENGTH] if isinstance(error, ApiError) else ""
+                ),
+                failed_at=time.time(),
+                failures=previous.failures + 1 if previous else 1,
+            )
+            self.changed = True
+
+        logger.warning("quarantined %s: %s", get_debug_title(item), error)
+
+    def remove(self, item: ContentItem) -> None:
+        with self.lock:
+            if self.entries.pop(str(item._id_attr), None):
+                self.changed = True
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+
+        with self.lock:
+            # Re-read so entries saved by other jobs since we loaded are kept
+            data = self._read()
+            data[self.name] = {
+                id: entry.model_dump() for id, entry in self.entries.items()
+            }
+
+            directory = os.path.dirname(self.path)
+
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            temp_path = f"{self.path}.tmp"
+
+            with open(temp_path, "w") as file:
+                json.dump(data, file, indent=2)
+
+            os.replace(temp_path, self.path)
+            self.changed = False
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import FrozenSet, Optional
+
+from pydantic import BaseModel
+from requests.exceptions import ConnectionError, Timeout
+from requests.models import Response
+
+# POST is not idempotent so it is only retried when the server could not have
+# acted on the request: it was rate limited, or never reached the application
+POST_RETRY_STATUSES: FrozenSet[int] = frozenset({429, 502, 503, 504})
+GET_RETRY_STATUSES: FrozenSet[int] = POST_RETRY_STATUSES | {500}
+
+# Repeating these has the same effect as sending them once
+IDEMPOTENT_METHODS: FrozenSet[str] = frozenset({"GET", "PUT", "DELETE"})
+
+
+class RetryPolicy(BaseModel):
+    retries: int = 0
+    backoff: float = 0.5
+    backoff_max: float = 30.0
+
+
+def is_retryable_error(method: str, error: Exception) -> bool:
+    if method in IDEMPOTENT_METHODS:
+        return isinstance(error, (ConnectionError, Timeout))
+
+    return isinstance(error, ConnectionError)
+
+
+def is_retryable_status(method: str, status: int) -> bool:
+    if method in IDEMPOTENT_METHODS:
+        return status in GET_RETRY_STATUSES
+
+    return status in POST_RETRY_STATUSES
+
+
+def get_retry_after(response: Response) -> Optional[float]:
+    """Return the seconds requested by a Retry-After header, if there is one"""
+
+    value = response.headers.get("Retry-After")
+
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def get_backoff(
+    policy: RetryPolicy, attempt: int, retry_after: Optional[float] = None
+) -> float:
+    """Return how long to wait before retrying attempt, using full jitter"""
+
+    if retry_after is not None:
+        return min(retry_after, policy.backoff_max)
+
+    return random.uniform(0, min(policy.backoff_max, policy.backoff * 2**attempt))
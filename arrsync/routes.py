@@ -39,6 +39,17 @@ def content(job_type: JobType, url: str) -> str:
         _assert_never(job_type)
 
 
+def content_item(job_type: JobType, url: str, id: int) -> str:
+    if job_type is JobType.Sonarr:
+        return parse.urljoin(url, f"api/v3/series/{id}")
+    if job_type is JobType.Radarr:
+        return parse.urljoin(url, f"api/v3/movie/{id}")
+    if job_type is JobType.Lidarr:
+        return parse.urljoin(url, f"api/v1/artist/{id}")
+    else:
+        _assert_never(job_type)
+
+
 def profile(job_type: JobType, url: str) -> str:
     if job_type is JobType.Sonarr:
         return parse.urljoin(url, "api/v3/qualityprofile")
@@ -50,6 +61,17 @@ def profile(job_type: JobType, url: str) -> str:
         _assert_never(job_type)
 
 
+def root_folder(job_type: JobType, url: str) -> str:
+    if job_type is JobType.Sonarr:
+        return parse.urljoin(url, "api/v3/rootfolder")
+    if job_type is JobType.Radarr:
+        return parse.urljoin(url, "api/v3/rootfolder")
+    if job_type is JobType.Lidarr:
+        return parse.urljoin(url, "api/v1/rootfolder")
+    else:
+        _assert_never(job_type)
+
+
 def tag(job_type: JobType, url: str) -> str:
     if job_type is JobType.Sonarr:
         return parse.urljoin(url, "api/v3/tag")
@@ -81,3 +103,25 @@ def metadata(job_type: JobType, url: str) -> str:
         raise Exception(f"{job_type} does not support metadata")
     else:
         _assert_never(job_type)
+
+
+def album(job_type: JobType, url: str) -> str:
+    if job_type is JobType.Lidarr:
+        return parse.urljoin(url, "api/v1/album")
+    if job_type is JobType.Radarr:
+        raise Exception(f"{job_type} does not support albums")
+    if job_type is JobType.Sonarr:
+        raise Exception(f"{job_type} does not support albums")
+    else:
+        _assert_never(job_type)
+
+
+def album_monitor(job_type: JobType, url: str) -> str:
+    if job_type is JobType.Lidarr:
+        return parse.urljoin(url, "api/v1/album/monitor")
+    if job_type is JobType.Radarr:
+        raise Exception(f"{job_type} does not support albums")
+    if job_type is JobType.Sonarr:
+        raise Exception(f"{job_type} does not support albums")
+    else:
+        _assert_never(job_type)
@@ -0,0 +1,542 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib import parse
+
+from pydantic import BaseModel
+
+from arrsync import routes
+from arrsync.common import JobType
+from arrsync.config import configure_logging, logger
+from arrsync.utils import _assert_never
+
+StubRecord = Dict[str, Any]
+StubResponse = Tuple[int, Any]
+
+
+class StubOptions(BaseModel):
+    job_type: JobType
+    api_key: str = "stub"
+    size: int = 100
+    latency: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float = 0.0
+    seed: int = 0
+
+
+def get_id_alias(job_type: JobType) -> str:
+    if job_type is JobType.Sonarr:
+        return "tvdbId"
+    if job_type is JobType.Radarr:
+        return "tmdbId"
+    if job_type is JobType.Lidarr:
+        return "foreignArtistId"
+    else:
+        _assert_never(job_type)
+
+
+def get_root_folder_path(job_type: JobType) -> str:
+    if job_type is JobType.Sonarr:
+        return "/tv/"
+    if job_type is JobType.Radarr:
+        return "/movies/"
+    if job_type is JobType.Lidarr:
+        return "/music/"
+    else:
+        _assert_never(job_type)
+
+
+def create_content_record(
+    job_type: JobType, index: int, rng: random.Random
+) -> StubRecord:
+    base_record: StubRecord = {
+        "id": index,
+        "monitored": rng.random() < 0.8,
+        "tags": [index % 4 + 1] if index % 3 == 0 else [],
+        "qualityProfileId": index % 2 + 1,
+        "images": [],
+        "addOptions": {},
+    }
+
+    if job_type is JobType.Sonarr:
+        return {
+            **base_record,
+            "title": f"Series {index}",
+            "titleSlug": f"series-{index}",
+            "tvdbId": 100000 + index,
+            "useSceneNumbering": False,
+            "seasonFolder": True,
+            "languageProfileId": 1,
+            "rootFolderPath": get_root_folder_path(job_type),
+            "seasons": [
+                {"seasonNumber": number, "monitored": number > 0}
+                for number in range(rng.randint(1, 6))
+            ],
+        }
+    if job_type is JobType.Radarr:
+        return {
+            **base_record,
+            "title": f"Movie {index}",
+            "titleSlug": f"movie-{index}",
+            "tmdbId": 100000 + index,
+            "year": 1950 + index % 70,
+            "hasFile": rng.random() < 0.7,
+            "rootFolderPath": get_root_folder_path(job_type),
+        }
+    if job_type is JobType.Lidarr:
+        return {
+            **base_record,
+            "artistName": f"Artist {index}",
+            "foreignArtistId": f"00000000-0000-0000-0000-{index:012d}",
+            "metadataProfileId": 1,
+            "rootFolderPath": get_root_folder_path(job_type),
+        }
+    else:
+        _assert_never(job_type)
+
+
+def create_album_records(
+    artists: List[StubRecord], rng: random.Random
+) -> List[StubRecord]:
+    """Return a few albums for each artist, with ids counting from 1 and foreign
+    ids that are the same whatever the seed"""
+
+    albums: List[StubRecord] = []
+
+    for artist in artists:
+        for number in range(1, 4):
+            albums.append(
+                {
+                    "id": len(albums) + 1,
+                    "title": f"{artist['artistName']} Album {number}",
+                    "foreignAlbumId": f"{artist['foreignArtistId']}-{number}",
+                    "artistId": artist["id"],
+                    "monitored": rng.random() < 0.5,
+                }
+            )
+
+    return albums
+
+
+class StubLibrary(object):
+    job_type: JobType
+    content: List[StubRecord]
+    tags: List[StubRecord]
+    profiles: List[StubRecord]
+    languages: List[StubRecord]
+    metadata_profiles: List[StubRecord]
+    albums: List[StubRecord]
+    root_folders: List[StubRecord]
+    last_id: int
+
+    def __init__(self, options: StubOptions):
+        rng = random.Random(options.seed)
+
+        self.job_type = options.job_type
+        self.lock = threading.Lock()
+        self.content = [
+            create_content_record(options.job_type, index, rng)
+            for index in range(1, options.size + 1)
+        ]
+        self.tags = [{"id": tag_id, "label": f"tag-{tag_id}"} for tag_id in range(1, 5)]
+        self.profiles = [{"id": 1, "name": "Any"}, {"id": 2, "name": "HD-1080p"}]
+        self.languages = [{"id": 1, "name": "English"}]
+        self.metadata_profiles = [{"id": 1, "name": "Standard"}]
+        self.last_id = options.size
+        self.root_folders = [{"id": 1, "path": get_root_folder_path(options.job_type)}]
+        self.albums = (
+            create_album_records(self.content, rng)
+            if options.job_type is JobType.Lidarr
+            else []
+        )
+
+    def next_id(self) -> int:
+        # Ids are never reused, even once the last item was deleted
+        self.last_id += 1
+        return self.last_id
+
+    def add(self, record: StubRecord) -> StubResponse:
+        id_alias = get_id_alias(self.job_type)
+
+        with self.lock:
+            if id_alias not in record:
+                return 400, [{"propertyName": id_alias, "errorMessage": "missing"}]
+
+            if any(item[id_alias] == record[id_alias] for item in self.content):
+                return 400, [
+                    {"propertyName": id_alias, "errorMessage": "already been added"}
+                ]
+
+            created = {**record, "id": self.next_id()}
+            self.content.append(created)
+
+        return 201, created
+
+    def get(self, id: int) -> StubResponse:
+        record = next((item for item in self.content if item["id"] == id), None)
+
+        return (200, record) if record else (404, {"message": "not found"})
+
+    def update(self, id: int, record: StubRecord) -> StubResponse:
+        with self.lock:
+            for index, item in enumerate(self.content):
+                if item["id"] == id:
+                    self.content[index] = {**record, "id": id}
+                    return 202, self.content[index]
+
+        return 404, {"message": "not found"}
+
+    def add_tag(self, record: StubRecord) -> StubResponse:
+        label = record.get("label")
+
+        with self.lock:
+            if not label or any(tag["label"] == label for tag in self.tags):
+                return 400, [{"propertyName": "label", "errorMessage": "invalid"}]
+
+            created = {"id": max(tag["id"] for tag in self.tags) + 1, "label": label}
+            self.tags.append(created)
+
+        return 201, created
+
+    def monitor_albums(self, body: Dict[str, Any]) -> StubResponse:
+        album_ids = set(body.get("albumIds", []))
+
+        with self.lock:
+            updated = [album for album in self.albums if album["id"] in album_ids]
+
+            for album in updated:
+                album["monitored"] = bool(body.get("monitored"))
+
+        return 202, updated
+
+    def delete(self, id: int) -> StubResponse:
+        with self.lock:
+            for index, item in enumerate(self.content):
+                if item["id"] == id:
+                    del self.content[index]
+                    return 200, {}
+
+        return 404, {"message": "not found"}
+
+
+class StubRateLimiter(object):
+    """A token bucket allowing rate requests per second, 0 disables limiting"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        # Hold at least one token, or rates below 1 could never allow a request
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    options: StubOptions
+    library: StubLibrary
+    limiter: StubRateLimiter
+    random: random.Random
+
+    def __init__(self, options: StubOptions, address: Tuple[str, int]):
+        super().__init__(address, StubRequestHandler)
+        self.options = options
+        self.library = StubLibrary(options)
+        self.limiter = StubRateLimiter(options.rate_limit)
+        self.random = random.Random(options.seed)
+        self.request_count = 0
+        self.request_count_lock = threading.Lock()
+        self.get_routes, self.post_routes, self.put_routes = get_stub_routes(
+            self.library
+        )
+        self.item_path = parse.urlparse(
+            routes.content(options.job_type, "http://stub/")
+        ).path
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{str(host)}:{port}/"
+
+    def count_request(self) -> None:
+        # Requests are handled on a thread each
+        with self.request_count_lock:
+            self.request_count += 1
+
+    def should_fail(self) -> bool:
+        return self.random.random() < self.options.error_rate
+
+
+def get_stub_routes(
+    library: StubLibrary,
+) -> Tuple[
+    Dict[str, Callable[[], StubResponse]],
+    Dict[str, Callable[[Any], StubResponse]],
+    Dict[str, Callable[[Any], StubResponse]],
+]:
+    job_type = library.job_type
+
+    def path(route: Callable[[JobType, str], str]) -> str:
+        return parse.urlparse(route(job_type, "http://stub/")).path
+
+    get_routes: Dict[str, Callable[[], StubResponse]] = {
+        path(routes.status): lambda: (200, {"version": "3.0.0-stub"}),
+        path(routes.profile): lambda: (200, library.profiles),
+        path(routes.tag): lambda: (200, library.tags),
+        path(routes.content): lambda: (200, library.content),
+        path(routes.root_folder): lambda: (200, library.root_folders),
+    }
+
+    post_routes: Dict[str, Callable[[Any], StubResponse]] = {
+        path(routes.content): library.add,
+        path(routes.tag): library.add_tag,
+    }
+
+    put_routes: Dict[str, Callable[[Any], StubResponse]] = {}
+
+    if job_type is JobType.Sonarr:
+        get_routes[path(routes.language)] = lambda: (200, library.languages)
+
+    if job_type is JobType.Lidarr:
+        get_routes[path(routes.metadata)] = lambda: (200, library.metadata_profiles)
+        get_routes[path(routes.album)] = lambda: (200, library.albums)
+        put_routes[path(routes.album_monitor)] = library.monitor_albums
+
+    return get_routes, post_routes, put_routes
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("stub: " + format, *args)
+
+    def _send_json(self, status: int, body: Any, headers: Dict[str, str] = {}) -> None:
+        payload = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _precheck(self, path: str) -> Optional[StubResponse]:
+        """Apply the latency, rate limit, auth and error rate options to a request"""
+
+        server = self.server
+        server.count_request()
+
+        if server.options.latency:
+            time.sleep(server.options.latency)
+
+        if not server.limiter.allow():
+            return 429, {"message": "rate limited"}
+
+        if path == path_of_initialize(server.options.job_type):
+            return None
+
+        if self.headers.get("X-Api-Key") != server.options.api_key:
+            return 401, {"message": "unauthorized"}
+
+        if server.should_fail():
+            return 503, {"message": "injected failure"}
+
+        return None
+
+    def _handle(self, handler: Callable[[str], StubResponse]) -> None:
+        path = parse.urlparse(self.path).path
+
+        failure = self._precheck(path)
+
+        if failure:
+            status, body = failure
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            self._send_json(status, body, headers)
+            return
+
+        self._send_json(*handler(path))
+
+    def _get(self, path: str) -> StubResponse:
+        server = self.server
+
+        if path == path_of_initialize(server.options.job_type):
+            return 200, {
+                "apiRoot": "/api",
+                "apiKey": server.options.api_key,
+                "urlBase": "",
+            }
+
+        route = server.get_routes.get(path)
+
+        if route:
+            return route()
+
+        item_id = self._item_id(path)
+
+        if item_id is not None:
+            return server.library.get(item_id)
+
+        return 404, {"message": "not found"}
+
+    def _item_id(self, path: str) -> Optional[int]:
+        """Return the id of a content item path, None for any other path"""
+
+        prefix, _, id = path.rpartition("/")
+
+        return int(id) if prefix == self.server.item_path and id.isdigit() else None
+
+    def _put(self, path: str) -> StubResponse:
+        route = self.server.put_routes.get(path)
+
+        if route:
+            return route(self._read_json())
+
+        item_id = self._item_id(path)
+
+        if item_id is None:
+            return 404, {"message": "not found"}
+
+        return self.server.library.update(item_id, self._read_json())
+
+    def _delete(self, path: str) -> StubResponse:
+        item_id = self._item_id(path)
+
+        if item_id is None:
+            return 404, {"message": "not found"}
+
+        return self.server.library.delete(item_id)
+
+    def _post(self, path: str) -> StubResponse:
+        route = self.server.post_routes.get(path)
+
+        return route(self._read_json()) if route else (404, {"message": "not found"})
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._handle(self._get)
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle(self._post)
+
+    def do_PUT(self) -> None:  # noqa: N802
+        self._handle(self._put)
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._handle(self._delete)
+
+
+def path_of_initialize(job_type: JobType) -> str:
+    return parse.urlparse(routes.initialize(job_type, "http://stub/")).path
+
+
+def serve_in_thread(
+    options: StubOptions, host: str = "127.0.0.1", port: int = 0
+) -> StubServer:
+    """Start a stub server on a background thread. Call shutdown() when done"""
+
+    server = StubServer(options, (host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
+
+
+def parse_args(args: Optional[Any] = None) -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser(
+        prog="arrsync.stub",
+        description="Serve a stand-in Sonarr, Radarr, or Lidarr API for testing",
+    )
+
+    arg_parser.add_argument(
+        "--type",
+        type=JobType,
+        required=True,
+        help="One of: sonarr | radarr | lidarr",
+    )
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    arg_parser.add_argument("--port", type=int, default=8989, help="Port to bind")
+    arg_parser.add_argument("--api-key", default="stub", help="API key to require")
+    arg_parser.add_argument(
+        "--size", type=int, default=100, help="Number of items in the library"
+    )
+    arg_parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to delay each response"
+    )
+    arg_parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with a 503",
+    )
+    arg_parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=0.0,
+        help="Requests per second before answering with a 429",
+    )
+    arg_parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for the generated library"
+    )
+
+    return arg_parser.parse_args(args=args)
+
+
+def main(args: Optional[Any] = None) -> None:
+    opts = parse_args(args=args)
+
+    configure_logging()
+
+    options = StubOptions(
+        job_type=opts.type,
+        api_key=opts.api_key,
+        size=opts.size,
+        latency=opts.latency,
+        error_rate=opts.error_rate,
+        rate_limit=opts.rate_limit,
+        seed=opts.seed,
+    )
+
+    server = StubServer(options, (opts.host, opts.port))
+    logger.info("serving %s stub on %s", options.job_type.value, server.url)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
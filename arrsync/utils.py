@@ -1,12 +1,22 @@
 #!/usr/bin/env python
 
-from typing import List, NoReturn, Optional, TypeVar, Union
-
-from arrsync.common import ContentItem, JobType, Language, LidarrContent, Profile, Tag
+import re
+from typing import List, NoReturn, Optional, Type, Union
+
+from arrsync.common import (
+    ContentItem,
+    Index,
+    JobType,
+    Languages,
+    LidarrContent,
+    Profiles,
+    RadarrContent,
+    SonarrContent,
+    T,
+    Tags,
+)
 from arrsync.config import logger
 
-T = TypeVar("T", Tag, Profile, Language)
-
 
 def _assert_never(x: NoReturn) -> NoReturn:
     assert False, "Unhandled type: {}".format(type(x).__name__)
@@ -18,21 +28,14 @@ def first_in_list(input_list: List[T]) -> Union[T, None]:
     return next(iter(input_list), None)
 
 
-def find_in_list(input_list: List[T], query: str) -> Union[T, None]:
+def find_in_list(input_list: Index[T], query: str) -> Union[T, None]:
     """Find an item in the input_list using query returning None if nothing is found"""
 
-    return next(
-        (
-            item
-            for item in input_list
-            if str(item.id) == query or item.normalized_title() == query.lower()
-        ),
-        None,
-    )
+    return input_list.find(query)
 
 
 def find_in_list_with_fallback(
-    input_list: List[T], query: Optional[str], list_name: str = "list"
+    input_list: Index[T], query: Optional[str], list_name: str = "list"
 ) -> Union[T, None]:
     """Find the item in the input list using query. If none is found fall back to the first item in the list"""
 
@@ -48,22 +51,14 @@ def find_in_list_with_fallback(
 
 
 def find_ids_in_list(
-    input_list: Union[List[Tag], List[Profile], List[Language]], opt_list: List[str]
+    input_list: Union[Tags, Profiles, Languages], opt_list: List[str]
 ) -> List[str]:
-    """Return the ids from the input_list using the opt_list"""
+    """Return the ids from the input_list using the opt_list, of every item matching
+    an option by id or name"""
 
-    normalized_list = list(map(lambda i: i.lower(), opt_list))
     return list(
-        map(
-            lambda i: str(i.id),
-            [
-                item
-                for item in input_list
-                if (
-                    str(item.id) in normalized_list
-                    or item.normalized_title() in normalized_list
-                )
-            ],
+        dict.fromkeys(
+            str(item.id) for opt in opt_list for item in input_list.find_all(opt)
         )
     )
 
@@ -84,3 +79,22 @@ def get_search_missing_attribute(job_type: JobType) -> str:
         return "searchForMissingAlbums"
     else:
         _assert_never(job_type)
+
+
+def get_content_model(
+    job_type: JobType,
+) -> Union[Type[SonarrContent], Type[RadarrContent], Type[LidarrContent]]:
+    if job_type is JobType.Sonarr:
+        return SonarrContent
+    if job_type is JobType.Radarr:
+        return RadarrContent
+    if job_type is JobType.Lidarr:
+        return LidarrContent
+    else:
+        _assert_never(job_type)
+
+
+def get_file_name(name: str) -> str:
+    """Return name with anything that is unsafe in a file name replaced"""
+
+    return re.sub(r"[^\w.-]", "_", name)
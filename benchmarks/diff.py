@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""Time validating and diffing a large generated library.
+
+python -m benchmarks.diff --type sonarr --size 200000
+"""
+
+import argparse
+import json
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from arrsync.api import STREAM_READ_SIZE, JsonArrayReader, get_content_adapter
+from arrsync.cli import get_sync_job
+from arrsync.common import (
+    BaseContent,
+    ContentItems,
+    Index,
+    JobType,
+    LidarrContent,
+    RadarrContent,
+    SonarrContent,
+    SyncJob,
+    Tag,
+)
+from arrsync.lib import calculate_content_diff
+from arrsync.stub import StubRecord, create_content_record, get_root_folder_path
+
+
+def parse_args(args: Optional[Any] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--type", type=JobType, default=JobType.Sonarr)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument(
+        "--padding",
+        type=int,
+        default=30,
+        help="Fields arrsync does not use to add to each record, as real ones have",
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    return parser.parse_args(args=args)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    started = time.monotonic()
+    yield
+    print(f"{name:<24} {time.monotonic() - started:7.2f}s")
+
+
+def create_records(job_type: JobType, size: int, padding: int) -> List[StubRecord]:
+    rng = random.Random(1)
+    records = [create_content_record(job_type, index, rng) for index in range(size)]
+
+    for record in records:
+        record.update({f"unused{field}": "x" * 20 for field in range(padding)})
+
+    return records
+
+
+def create_job(job_type: JobType) -> SyncJob:
+    return get_sync_job(
+        "benchmark",
+        {
+            "name": "benchmark",
+            "type": job_type.value,
+            "source_url": "http://source",
+            "source_tag_exclude": "tag-1",
+            "dest_url": "http://dest",
+            "dest_path": get_root_folder_path(job_type),
+            "dest_profile": "1",
+        },
+    )
+
+
+def read_chunked(job_type: JobType, body: bytes, chunk_size: int) -> ContentItems:
+    """Validate body as Api.content does with fetch_chunk_size set"""
+
+    adapter = get_content_adapter(job_type)
+    reader = JsonArrayReader()
+    content: ContentItems = []
+    chunk: List[Any] = []
+
+    for start in range(0, len(body), STREAM_READ_SIZE):
+        chunk.extend(reader.feed(body[start : start + STREAM_READ_SIZE].decode()))
+
+        if len(chunk) >= chunk_size:
+            content.extend(adapter.validate_python(chunk))
+            chunk = []
+
+    reader.close()
+    content.extend(adapter.validate_python(chunk))
+
+    return content
+
+
+def main(args: Optional[Any] = None) -> None:
+    opts = parse_args(args=args)
+
+    body = json.dumps(create_records(opts.type, opts.size, opts.padding)).encode()
+    models: Dict[JobType, Type[BaseContent]] = {
+        JobType.Sonarr: SonarrContent,
+        JobType.Radarr: RadarrContent,
+        JobType.Lidarr: LidarrContent,
+    }
+
+    print(f"{opts.size} {opts.type.value} records, {len(body) >> 20} MiB")
+
+    with timed("json + model_validate"):
+        list(map(models[opts.type].model_validate, json.loads(body)))
+
+    with timed("validate_json"):
+        content = get_content_adapter(opts.type).validate_json(body)
+
+    with timed(f"streamed, chunks of {opts.chunk_size}"):
+        read_chunked(opts.type, body, opts.chunk_size)
+
+    with timed("diff"):
+        calculate_content_diff(
+            job=create_job(opts.type),
+            source_content=content,
+            source_tags=Index([Tag(id=1, label="tag-1")]),
+            source_profiles=Index(),
+            dest_content=content[: opts.size // 2],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""Time starting arrsync in a fresh interpreter.
+
+python -m benchmarks.startup --runs 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, List, Optional
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "arrsync --help": ["-m", "arrsync", "--help"],
+    "import arrsync.cli": ["-c", "import arrsync.cli"],
+}
+
+
+def parse_args(args: Optional[Any] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    return parser.parse_args(args=args)
+
+
+def time_command(command: List[str], runs: int) -> float:
+    timings = []
+
+    for _ in range(runs):
+        started = time.monotonic()
+        subprocess.run([sys.executable, *command], check=True, capture_output=True)
+        timings.append(time.monotonic() - started)
+
+    return statistics.median(timings)
+
+
+def main(args: Optional[Any] = None) -> None:
+    opts = parse_args(args=args)
+
+    for name, command in COMMANDS.items():
+        print(f"{name:<24} {time_command(command, opts.runs) * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Any, Iterator, Protocol
+from typing import Any, Iterator, List, Protocol
 
 import pytest
 import responses
@@ -16,6 +16,7 @@ from arrsync.common import (
     SonarrSyncJob,
     SyncJob,
 )
+from arrsync.stub import StubOptions, StubServer, serve_in_thread
 from arrsync.utils import _assert_never
 
 
@@ -99,7 +100,7 @@ def create_content_item(
                     "tvdb_id": count,
                     "use_scene_numbering": True,
                     "season_folder": True,
-                    "seasons": [{"title": "Season 1", "attr": 10}],
+                    "seasons": [{"seasonNumber": 1, "monitored": True}],
                     **base_attrs,
                     **extra_attrs,
                 }
@@ -152,3 +153,27 @@ def api(request: SubRequest) -> Iterator[Api]:
 def file_body(request: SubRequest) -> Iterator[str]:
     with open(request.param) as file:
         yield file.read()
+
+
+class CreateStubServer(Protocol):
+    def __call__(self, job_type: JobType, **extra_attrs: Any) -> StubServer: ...
+
+
+@pytest.fixture(scope="function")
+def create_stub_server(request: FixtureRequest) -> Iterator[CreateStubServer]:
+    servers: List[StubServer] = []
+
+    def _create_stub_server(job_type: JobType, **extra_attrs: Any) -> StubServer:
+        server = serve_in_thread(
+            StubOptions.model_validate(
+                {"job_type": job_type, "size": 10, **extra_attrs}
+            )
+        )
+        servers.append(server)
+        return server
+
+    yield _create_stub_server
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -1,34 +1,66 @@
 import logging
 from argparse import Namespace
+from pathlib import Path
+from typing import Any
 
+import pytest
 from pytest_mock import MockerFixture
 
 from arrsync.__main__ import main
 
 
+def create_args(**extra_attrs: Any) -> Namespace:
+    return Namespace(
+        **{
+            "config": "config.conf",
+            "debug": False,
+            "dry_run": False,
+            "metrics": None,
+            "metrics_format": "json",
+            "interval": None,
+            "metrics_port": None,
+            "metrics_host": "",
+            "profile": False,
+            "profile_dir": ".",
+            "plan": None,
+            "apply": None,
+            "check_config": False,
+            "config_cache": None,
+            **extra_attrs,
+        }
+    )
+
+
 def test__main(mocker: MockerFixture) -> None:
     mock_create_config_parser = mocker.patch("arrsync.__main__.create_config_parser")
     mock_parse_args = mocker.patch("arrsync.__main__.parse_args")
     mock_set_debug_level = mocker.patch("arrsync.__main__.set_debug_level")
-    mock_cli_main = mocker.patch("arrsync.__main__.cli.main")
+    mock_cli_main = mocker.patch("arrsync.cli.main")
 
     spy = mocker.spy(mock_create_config_parser, "read_file")
     mock_create_config_parser.return_value = mock_create_config_parser
-    mock_parse_args.return_value = Namespace(
-        config="config.conf", debug=False, dry_run=False
-    )
+    mock_parse_args.return_value = create_args()
 
     main(["--config", "config.conf"])
 
     mock_create_config_parser.assert_called_once()
     spy.assert_called_once_with("config.conf")
-    mock_cli_main.assert_called_once_with(mock_create_config_parser, False)
+    mock_cli_main.assert_called_once_with(
+        mock_create_config_parser,
+        False,
+        metrics_path=None,
+        metrics_format="json",
+        registry=None,
+        profile=False,
+        profile_dir=".",
+        plan_path=None,
+        apply_path=None,
+        cache_path=None,
+    )
 
     mocker.resetall()
 
-    mock_parse_args.return_value = Namespace(
-        config="config.conf", debug=True, dry_run=False
-    )
+    mock_parse_args.return_value = create_args(debug=True)
 
     main(["--config", "config.conf", "--debug"])
 
@@ -36,10 +68,100 @@ def test__main(mocker: MockerFixture) -> None:
 
     mocker.resetall()
 
-    mock_parse_args.return_value = Namespace(
-        config="config.conf", debug=False, dry_run=True
+    mock_parse_args.return_value = create_args(
+        dry_run=True,
+        metrics="metrics.prom",
+        metrics_format="prometheus",
+        profile=True,
+        profile_dir="profiles",
+        plan="plan.json",
     )
 
     main(["--config", "config.conf", "--dry-run"])
 
-    mock_cli_main.assert_called_once_with(mock_create_config_parser, True)
+    mock_cli_main.assert_called_once_with(
+        mock_create_config_parser,
+        True,
+        metrics_path="metrics.prom",
+        metrics_format="prometheus",
+        registry=None,
+        profile=True,
+        profile_dir="profiles",
+        plan_path="plan.json",
+        apply_path=None,
+        cache_path=None,
+    )
+
+
+def test__main_interval(mocker: MockerFixture, tmp_path: Path) -> None:
+    mock_parse_args = mocker.patch("arrsync.__main__.parse_args")
+    mock_cli_main = mocker.patch("arrsync.cli.main")
+    mock_serve_metrics = mocker.patch("arrsync.metrics.serve_metrics")
+    mock_sleep = mocker.patch("arrsync.__main__.time.sleep")
+    mock_logger = mocker.patch("arrsync.__main__.logger")
+
+    config_path = tmp_path / "config.conf"
+    config_path.write_text("[common]\n")
+
+    # Stop the otherwise endless loop on the third sleep
+    mock_sleep.side_effect = [None, None, KeyboardInterrupt()]
+    mock_cli_main.side_effect = [None, Exception("reload failed"), None]
+
+    with open(config_path) as config_file:
+        mock_parse_args.return_value = create_args(
+            config=config_file, interval=60, metrics_port=9717
+        )
+
+        with pytest.raises(KeyboardInterrupt):
+            main(["--config", str(config_path), "--interval", "60"])
+
+    mock_serve_metrics.assert_called_once()
+    registry = mock_serve_metrics.call_args.args[0]
+
+    assert mock_cli_main.call_count == 3
+    assert mock_cli_main.call_args.kwargs["registry"] is registry
+    mock_sleep.assert_called_with(60)
+    mock_logger.error.assert_any_call("failed to run sync jobs")
+
+
+def test__main_interval_plan(mocker: MockerFixture) -> None:
+    mock_parse_args = mocker.patch("arrsync.__main__.parse_args")
+    mock_cli_main = mocker.patch("arrsync.cli.main")
+    mocker.patch("arrsync.__main__.create_config_parser")
+    mock_sleep = mocker.patch("arrsync.__main__.time.sleep")
+
+    mock_parse_args.return_value = create_args(interval=60, apply="plan.json")
+
+    main(["--config", "config.conf", "--interval", "60", "--apply", "plan.json"])
+
+    mock_cli_main.assert_called_once()
+    mock_sleep.assert_not_called()
+
+
+def test__main_check_config(mocker: MockerFixture) -> None:
+    mock_parse_args = mocker.patch("arrsync.__main__.parse_args")
+    mock_cli_main = mocker.patch("arrsync.cli.main")
+    mock_check_config = mocker.patch("arrsync.cli.check_config")
+    mock_create_config_parser = mocker.patch("arrsync.__main__.create_config_parser")
+    mock_sleep = mocker.patch("arrsync.__main__.time.sleep")
+
+    mock_create_config_parser.return_value = mock_create_config_parser
+    mock_parse_args.return_value = create_args(
+        interval=60, check_config=True, config_cache="jobs.cache"
+    )
+    mock_check_config.return_value = True
+
+    main(["--config", "config.conf", "--check-config"])
+
+    mock_check_config.assert_called_once_with(
+        mock_create_config_parser, cache_path="jobs.cache"
+    )
+    mock_cli_main.assert_not_called()
+    mock_sleep.assert_not_called()
+
+    mock_check_config.return_value = False
+
+    with pytest.raises(SystemExit) as exc_info:
+        main(["--config", "config.conf", "--check-config"])
+
+    assert exc_info.value.code == 1
@@ -5,20 +5,27 @@ from contextlib import nullcontext as does_not_raise
 from typing import Any, Union, cast
 
 import pytest
+import requests
 import responses
 from pydantic import ValidationError
 from pytest_mock.plugin import MockerFixture
 from responses import RequestsMock
+from tests.conftest import CreateContentItem, CreateStubServer
 
 from arrsync import routes
-from arrsync.api import Api
+from arrsync.api import Api, ApiError, JsonArrayReader, get_content_adapter
+from arrsync.breaker import CircuitBreaker, CircuitOpenError
 from arrsync.common import (
     ContentItem,
     JobType,
     LidarrContent,
     RadarrContent,
     SonarrContent,
+    SonarrSeason,
+    Tag,
 )
+from arrsync.metrics import JobMetrics
+from arrsync.retry import RetryPolicy
 
 
 @pytest.mark.parametrize(
@@ -268,6 +275,53 @@ def test_metadata_profile(resp: RequestsMock) -> None:
         assert len(metadata) == 0
 
 
+def test_create_tag(api: Api, resp: RequestsMock) -> None:
+    resp.add(
+        responses.POST,
+        url=routes.tag(api.job_type, api.url),
+        json={"id": 5, "label": "new"},
+        match=[responses.matchers.json_params_matcher({"label": "new"})],
+        status=201,
+    )
+
+    assert api.create_tag("new") == Tag(id=5, label="new")
+
+
+def test_album(resp: RequestsMock) -> None:
+    with Api(job_type=JobType.Lidarr, url="http://host/", api_key="aaa") as api:
+        resp.add(
+            responses.GET,
+            url=routes.album(api.job_type, api.url),
+            json=[
+                {
+                    "id": 3,
+                    "title": "Album",
+                    "foreignAlbumId": "abc",
+                    "artistId": 1,
+                    "monitored": True,
+                    "releases": [],
+                }
+            ],
+        )
+        resp.add(
+            responses.PUT,
+            url=routes.album_monitor(api.job_type, api.url),
+            json=[],
+            match=[
+                responses.matchers.json_params_matcher(
+                    {"albumIds": [3], "monitored": False}
+                )
+            ],
+            status=202,
+        )
+
+        albums = api.album()
+
+        assert (albums[0].foreign_album_id, albums[0].artist_id) == ("abc", 1)
+        assert not hasattr(albums[0], "releases")
+        assert api.monitor_albums([3], False) == []
+
+
 def test_language(resp: RequestsMock) -> None:
     with Api(job_type=JobType.Lidarr, url="http://host/", api_key="aaa") as api:
         assert len(api.language()) == 0
@@ -368,6 +422,8 @@ def test_radarr_content(resp: RequestsMock, api: Api, file_body: str) -> None:
 
         assert isinstance(item.title, str)
         assert isinstance(item.tmdb_id, int)
+        assert isinstance(item.id, int)
+        assert "id" not in item.model_dump()
         assert isinstance(item.year, int)
         assert len(item.images) > 0
         assert hasattr(item.images[0], "remote_url")
@@ -437,7 +493,7 @@ def test_unknown_content(mocker: MockerFixture, resp: RequestsMock) -> None:
                 monitored=False,
                 use_scene_numbering=True,
                 season_folder=True,
-                seasons=[{"title": "Season 1", "attr": 10}],
+                seasons=[SonarrSeason(season_number=1, monitored=True)],
                 quality_profile_id=10,
                 root_folder_path="/path",
                 tags=[],
@@ -491,3 +547,321 @@ def test_save_content(
             status=200,
         )
         api.save(item)
+
+
+def test_update_content(
+    resp: RequestsMock, api: Api, create_content_item: CreateContentItem
+) -> None:
+    full_url = routes.content_item(job_type=api.job_type, url=api.url, id=7)
+    record = {"id": 7, "title": "Movie", "monitored": False, "tags": [1]}
+    resp.add(responses.GET, url=full_url, json=record)
+    resp.add(
+        responses.PUT,
+        url=full_url,
+        json=record,
+        match=[
+            responses.matchers.json_params_matcher(
+                {**record, "monitored": True, "tags": []}
+            )
+        ],
+        status=202,
+    )
+
+    item = create_content_item(api.job_type, id=7)
+
+    assert api.update(item, {"monitored": True, "tags": []}) == record
+    assert api.metrics.routes[api._route(full_url)].count == 2
+    assert api._route(full_url).endswith("/{id}")
+
+    with pytest.raises(Exception, match="has no id"):
+        api.update(create_content_item(api.job_type), {})
+
+
+def test_delete_content(
+    resp: RequestsMock, api: Api, create_content_item: CreateContentItem
+) -> None:
+    full_url = routes.content_item(job_type=api.job_type, url=api.url, id=7)
+    resp.add(
+        responses.DELETE,
+        url=full_url,
+        match=[responses.matchers.query_param_matcher({"deleteFiles": "false"})],
+    )
+
+    assert api.delete(create_content_item(api.job_type, id=7))
+
+    resp.add(responses.DELETE, url=full_url, status=404)
+
+    with pytest.raises(ApiError, match="404"):
+        api.delete(create_content_item(api.job_type, id=7))
+
+    with pytest.raises(Exception, match="has no id"):
+        api.delete(create_content_item(api.job_type))
+
+
+def test_api_records_metrics(resp: RequestsMock) -> None:
+    metrics = JobMetrics("sync")
+
+    with Api(
+        job_type=JobType.Radarr, url="http://host/", api_key="aaa", metrics=metrics
+    ) as api:
+        full_url = routes.tag(api.job_type, api.url)
+
+        resp.add(responses.GET, url=full_url, json=[{"label": "My Tag", "id": 0}])
+        resp.add(responses.POST, url=f"{full_url}?x=1", json={}, status=201)
+
+        api.tag()
+        api.post(f"{full_url}?x=1", {})
+        api.get(full_url)
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 3
+    assert summary["routes"]["api/v3/tag"]["count"] == 3
+    assert summary["routes"]["api/v3/tag"]["statuses"] == {"200": 2, "201": 1}
+    assert "validate" not in summary["stages"]
+
+    other_metrics = JobMetrics("other")
+
+    with Api(
+        job_type=JobType.Radarr,
+        url="http://host/",
+        api_key="aaa",
+        metrics=other_metrics,
+    ) as api:
+        resp.add(responses.GET, url="http://other/route", json={})
+        resp.add(responses.GET, url=routes.content(api.job_type, api.url), json=[])
+
+        api.get("http://other/route")
+        api.content()
+
+    assert "http://other/route" in other_metrics.routes
+    assert "validate" in other_metrics.stages
+
+
+def test_api_retries_get(mocker: MockerFixture, resp: RequestsMock) -> None:
+    mock_sleep = mocker.patch("arrsync.api.time.sleep")
+    metrics = JobMetrics("sync")
+    url = "http://host/api/v3/tag"
+
+    with Api(
+        job_type=JobType.Sonarr,
+        url="http://host",
+        api_key="aaa",
+        metrics=metrics,
+        retry=RetryPolicy(retries=3),
+    ) as api:
+        resp.add(responses.GET, url=url, body=requests.ConnectionError())
+        resp.add(responses.GET, url=url, status=503, headers={"Retry-After": "2"})
+        resp.add(responses.GET, url=url, body=requests.ReadTimeout())
+        resp.add(responses.GET, url=url, json=[])
+
+        assert api.get(url) == []
+
+    assert mock_sleep.call_count == 3
+    mock_sleep.assert_any_call(2.0)
+    assert metrics.counters["retries"] == 3
+    assert metrics.routes["api/v3/tag"].retries == 3
+
+
+def test_api_retries_exhausted(mocker: MockerFixture, resp: RequestsMock) -> None:
+    mock_sleep = mocker.patch("arrsync.api.time.sleep")
+    url = "http://host/api/v3/tag"
+
+    with Api(
+        job_type=JobType.Sonarr,
+        url="http://host",
+        api_key="aaa",
+        retry=RetryPolicy(retries=2),
+    ) as api:
+        resp.add(responses.GET, url=url, status=502)
+
+        with pytest.raises(Exception, match="502"):
+            api.get(url)
+
+        assert mock_sleep.call_count == 2
+
+        resp.replace(responses.GET, url=url, body=requests.ConnectionError())
+
+        with pytest.raises(requests.ConnectionError):
+            api.get(url)
+
+        assert mock_sleep.call_count == 4
+
+
+def test_api_error(resp: RequestsMock, api: Api) -> None:
+    url = "http://host/api/v3/series"
+
+    resp.add(responses.POST, url=url, status=400, body='[{"errorMessage": "bad"}]')
+
+    with pytest.raises(ApiError, match="400") as error:
+        api.post(url, json={})
+
+    assert error.value.status_code == 400
+    assert error.value.body == '[{"errorMessage": "bad"}]'
+
+
+def test_api_retries_post(mocker: MockerFixture, resp: RequestsMock) -> None:
+    mock_sleep = mocker.patch("arrsync.api.time.sleep")
+    url = "http://host/api/v3/series"
+
+    with Api(
+        job_type=JobType.Sonarr,
+        url="http://host",
+        api_key="aaa",
+        retry=RetryPolicy(retries=3),
+    ) as api:
+        resp.add(responses.POST, url=url, body=requests.ConnectionError())
+        resp.add(responses.POST, url=url, status=429)
+        resp.add(responses.POST, url=url, json={"id": 1}, status=201)
+
+        assert api.post(url, {}) == {"id": 1}
+        assert mock_sleep.call_count == 2
+
+        resp.add(responses.POST, url=url, status=500)
+
+        with pytest.raises(Exception, match="500"):
+            api.post(url, {})
+
+        resp.add(responses.POST, url=url, body=requests.ReadTimeout())
+
+        with pytest.raises(requests.ReadTimeout):
+            api.post(url, {})
+
+        assert mock_sleep.call_count == 2
+
+
+def test_api_breaker(resp: RequestsMock) -> None:
+    url = "http://host/api/v3/tag"
+    breaker = CircuitBreaker("host", threshold=2)
+
+    with Api(
+        job_type=JobType.Sonarr, url="http://host", api_key="aaa", breaker=breaker
+    ) as api:
+        resp.add(responses.GET, url=url, status=503)
+        resp.add(responses.GET, url=url, body="[]")
+        resp.add(responses.GET, url=url, body=requests.ConnectionError())
+        resp.add(responses.GET, url=url, status=503)
+
+        with pytest.raises(ApiError):
+            api.get(url)
+
+        assert breaker.failures == 1
+        assert api.get(url) == []
+        assert breaker.failures == 0
+
+        with pytest.raises(requests.ConnectionError):
+            api.get(url)
+
+        with pytest.raises(ApiError):
+            api.get(url)
+
+        with pytest.raises(CircuitOpenError, match="host"):
+            api.get(url)
+
+        assert len(resp.calls) == 4
+
+
+def test_api_timeout(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Radarr, latency=0.5)
+
+    with Api(
+        job_type=JobType.Radarr,
+        url=server.url,
+        api_key="stub",
+        timeout=(1.0, 0.05),
+    ) as api:
+        with pytest.raises(requests.ReadTimeout):
+            api.status()
+
+
+def test_get_content_adapter() -> None:
+    adapter = get_content_adapter(JobType.Radarr)
+
+    assert adapter is get_content_adapter(JobType.Radarr)
+    assert adapter.validate_json(b"[]") == []
+
+    with pytest.raises(ValidationError):
+        adapter.validate_json(b'[{"title": "missing fields"}]')
+
+    with pytest.raises(Exception):
+        get_content_adapter(cast(JobType, "unknown"))
+
+
+def test_json_array_reader() -> None:
+    items = [{"id": 1, "title": "a, [b]"}, {"id": 2, "tags": [1, 2]}, {}]
+    text = json.dumps(items, indent=2)
+
+    for size in [1, 7, len(text)]:
+        reader = JsonArrayReader()
+        read = []
+
+        for start in range(0, len(text), size):
+            read.extend(reader.feed(text[start : start + size]))
+
+        reader.close()
+
+        assert read == items
+
+    reader = JsonArrayReader()
+
+    assert reader.feed(" [ ] ") == []
+    reader.close()
+
+
+@pytest.mark.parametrize("text", ['{"id": 1}', "[{}] {}", '[{"id": 1}', "[}"])
+def test_json_array_reader_invalid(text: str) -> None:
+    reader = JsonArrayReader()
+
+    with pytest.raises(ValueError):
+        reader.feed(text)
+        reader.close()
+
+
+@pytest.mark.parametrize("job_type", [JobType.Sonarr, JobType.Radarr, JobType.Lidarr])
+def test_content_chunked(
+    job_type: JobType, create_stub_server: CreateStubServer, mocker: MockerFixture
+) -> None:
+    mocker.patch("arrsync.api.STREAM_READ_SIZE", 100)
+    server = create_stub_server(job_type, size=25)
+
+    metrics = JobMetrics("whole")
+    chunked_metrics = JobMetrics("chunked")
+
+    with Api(job_type=job_type, url=server.url, api_key="stub", metrics=metrics) as api:
+        content = api.content()
+
+    with Api(
+        job_type=job_type,
+        url=server.url,
+        api_key="stub",
+        metrics=chunked_metrics,
+        chunk_size=10,
+    ) as api:
+        assert api.content() == content
+
+        content_url = routes.content(job_type, api.url)
+        tag_url = routes.tag(job_type, api.url)
+
+        assert [len(chunk) for chunk in api.get_stream(content_url)] == [10, 10, 5]
+        assert [len(chunk) for chunk in api.get_stream(tag_url)] == [4]
+
+    route = api._route(content_url)
+
+    # The size of a streamed response is taken from its Content-Length
+    assert chunked_metrics.routes[route].bytes == metrics.routes[route].bytes * 2
+
+
+def test_content_chunked_errors(resp: RequestsMock) -> None:
+    with Api(
+        job_type=JobType.Radarr, url="http://host", api_key="aaa", chunk_size=10
+    ) as api:
+        full_url = routes.content(api.job_type, api.url)
+
+        resp.add(responses.GET, url=full_url, status=500)
+        resp.add(responses.GET, url=full_url, body='[{"title": "partial"')
+
+        with pytest.raises(ApiError):
+            api.content()
+
+        with pytest.raises(ValueError):
+            api.content()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import pytest
+import requests
+
+from arrsync.breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    reset_breakers,
+)
+
+
+def test_circuit_breaker() -> None:
+    breaker = CircuitBreaker("host:8989")
+
+    breaker.check()
+    breaker.record_error(ValueError())
+    breaker.record_status(400)
+    breaker.record_status(500)
+
+    assert not breaker.is_open
+
+    breaker.record_error(requests.Timeout())
+
+    assert breaker.is_open
+
+    with pytest.raises(CircuitOpenError, match="host:8989"):
+        breaker.check()
+
+
+def test_circuit_breaker_threshold() -> None:
+    breaker = CircuitBreaker("host:8989", threshold=2)
+
+    breaker.record_status(502)
+    breaker.record_status(200)
+    breaker.record_status(504)
+
+    assert not breaker.is_open
+
+    breaker.record_error(requests.ConnectionError())
+
+    assert breaker.is_open
+
+
+def test_get_breaker_per_host() -> None:
+    reset_breakers()
+
+    breaker = get_breaker("http://host:8989/sonarr")
+
+    assert get_breaker("http://host:8989/other") is breaker
+    assert get_breaker("http://host2:8989/") is not breaker
+
+    reset_breakers()
+
+    assert get_breaker("http://host:8989/sonarr") is not breaker
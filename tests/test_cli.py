@@ -2,15 +2,21 @@
 
 import argparse
 import configparser
+import json
 import logging
+import os
+from pathlib import Path
 
 import pytest
 from pydantic import AnyHttpUrl, ValidationError
 from pytest_mock import MockerFixture
+from tests.conftest import CreateStubServer
 
 from arrsync import cli
-from arrsync.common import JobType, RadarrSyncJob
+from arrsync.common import JobType, RadarrSyncJob, SyncJob, SyncMode
 from arrsync.config import create_config_parser
+from arrsync.metrics import JobMetrics, MetricsRegistry
+from arrsync.plan import JobPlan, Plan
 
 
 def test_main(
@@ -18,6 +24,7 @@ def test_main(
 ) -> None:
     mocked_start_sync_job = mocker.patch("arrsync.cli.start_sync_job")
     mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+    mocked_reset_breakers = mocker.patch("arrsync.cli.reset_breakers")
 
     job = RadarrSyncJob.model_validate(
         dict(
@@ -42,7 +49,43 @@ def test_main(
 
     cli.main(config)
 
-    mocked_start_sync_job.assert_called_once_with(job, False)
+    mocked_start_sync_job.assert_called_once_with(
+        job, False, metrics=mocker.ANY, plan=None
+    )
+    mocked_reset_breakers.assert_called_once_with()
+
+
+def test_main_writes_metrics(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    mocker.patch("arrsync.cli.start_sync_job")
+    mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+
+    job = RadarrSyncJob.model_validate(
+        dict(
+            name="sync",
+            type=JobType.Radarr,
+            source_url="http://host",
+            source_key="aaa",
+            dest_url="http://host2",
+            dest_key="bbb",
+            dest_path="/path",
+            dest_profile="1",
+        )
+    )
+
+    mocked_get_sync_jobs.return_value = [job]
+
+    metrics_path = tmp_path / "metrics.json"
+    registry = MetricsRegistry()
+
+    cli.main(
+        configparser.ConfigParser(), metrics_path=str(metrics_path), registry=registry
+    )
+
+    assert json.loads(metrics_path.read_text())[0]["name"] == "sync"
+    assert 'arrsync_job_runs_total{job="sync",result="success"} 1' in registry.render()
 
 
 def test_main_fail(
@@ -116,6 +159,8 @@ source_headers =
   X-Test-Header-Id=aaa
   X-Test-Header-Secret=bbb
 source_tag_exclude = no-sync
+source_timeout = 5
+dest_timeout = 5, 120
 dest_profile = Any
   """
 
@@ -140,12 +185,38 @@ dest_profile = Any
             "X-Test-Header-Id": "aaa",
             "X-Test-Header-Secret": "bbb",
         },
+        "source_timeout": (5.0, 5.0),
         "dest_headers": {},
+        "dest_timeout": (5.0, 120.0),
         "source_tag_include": [],
         "source_tag_exclude": ["no-sync"],
         "source_profile_exclude": [],
         "source_profile_include": [],
         "dest_profile": "Any",
+        "dest_max_concurrency": 8,
+        "profile": False,
+        "retries": 3,
+        "retry_backoff": 0.5,
+        "retry_backoff_max": 30.0,
+        "journal_dir": None,
+        "continue_on_error": False,
+        "quarantine_file": None,
+        "quarantine_backoff": 86400.0,
+        "deadline": None,
+        "group": None,
+        "merge": False,
+        "source_precedence": [],
+        "mode": SyncMode.OneWay,
+        "source_path": None,
+        "source_profile": None,
+        "dest_update": False,
+        "dest_delete": False,
+        "dest_delete_max": 10,
+        "profile_map": {},
+        "tag_map": {},
+        "dest_tag_create": False,
+        "root_folder_map": [],
+        "fetch_chunk_size": 0,
     }
 
 
@@ -199,6 +270,86 @@ source_include_missing = 1
         cli.get_sync_jobs(config_parser)
 
 
+@pytest.mark.parametrize(
+    "option", ["fetch_chunk_size = -1", "dest_max_concurrency = 0"]
+)
+def test_get_sync_jobs_fail_out_of_range(option: str) -> None:
+    test_config = f"""
+[radarr-remote-to-local]
+type = radarr
+source_url = http://localhost:7878/
+dest_url = http://localhost:7879/
+dest_path = /movies
+dest_profile = Any
+{option}
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    with pytest.raises(ValidationError, match="greater than or equal"):
+        cli.get_sync_jobs(config_parser)
+
+
+@pytest.mark.parametrize("timeout", ["", "fast", "1, 2, 3"])
+def test_get_sync_jobs_fail_invalid_timeout(timeout: str) -> None:
+    test_config = f"""
+[radarr-remote-to-local]
+type=radarr
+source_url = http://localhost:7878/
+dest_url = http://localhost:7879/radarr
+dest_path = /movies
+dest_profile = Any
+dest_timeout = {timeout}
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    with pytest.raises(ValidationError):
+        cli.get_sync_jobs(config_parser)
+
+
+def test_get_sync_jobs_maps() -> None:
+    test_config = """
+[radarr-remote-to-local]
+type=radarr
+source_url = http://localhost:7878/
+dest_url = http://localhost:7879/radarr
+dest_path = /movies
+dest_profile = Any
+profile_map = HD-1080p: Ultra-HD, 4 : 2,
+tag_map = kids: family
+root_folder_map = /movies/4k -> /data/4k, ^/movies/.*kids -> /data/kids
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    job = cli.get_sync_jobs(config_parser)[0]
+
+    assert job.profile_map == {"HD-1080p": "Ultra-HD", "4": "2"}
+    assert job.tag_map == {"kids": "family"}
+    assert job.root_folder_map == [
+        ("/movies/4k", "/data/4k"),
+        ("^/movies/.*kids", "/data/kids"),
+    ]
+
+    config_parser.set("radarr-remote-to-local", "tag_map", "kids")
+
+    with pytest.raises(ValidationError, match="source: dest pairs"):
+        cli.get_sync_jobs(config_parser)
+
+    config_parser.set("radarr-remote-to-local", "tag_map", "")
+    config_parser.set("radarr-remote-to-local", "root_folder_map", "/movies/4k")
+
+    with pytest.raises(ValidationError, match="source -> dest rules"):
+        cli.get_sync_jobs(config_parser)
+
+
 def test_get_sync_jobs_allow_missing_key() -> None:
     test_config = """
 [radarr-remote-to-local]
@@ -228,10 +379,516 @@ source_include_missing = 0
         "dest_search_missing": False,
         "dest_monitor": False,
         "source_headers": {},
+        "source_timeout": (10.0, 60.0),
         "dest_headers": {},
+        "dest_timeout": (10.0, 60.0),
         "source_tag_include": [],
         "source_tag_exclude": [],
         "source_profile_exclude": [],
         "source_profile_include": [],
         "dest_profile": "1",
+        "dest_max_concurrency": 8,
+        "profile": False,
+        "retries": 3,
+        "retry_backoff": 0.5,
+        "retry_backoff_max": 30.0,
+        "journal_dir": None,
+        "continue_on_error": False,
+        "quarantine_file": None,
+        "quarantine_backoff": 86400.0,
+        "deadline": None,
+        "group": None,
+        "merge": False,
+        "source_precedence": [],
+        "mode": SyncMode.OneWay,
+        "source_path": None,
+        "source_profile": None,
+        "dest_update": False,
+        "dest_delete": False,
+        "dest_delete_max": 10,
+        "profile_map": {},
+        "tag_map": {},
+        "dest_tag_create": False,
+        "root_folder_map": [],
+        "fetch_chunk_size": 0,
     }
+
+
+def test_main_profile(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    mocked_start_sync_job = mocker.patch("arrsync.cli.start_sync_job")
+    mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+    mocked_profile_job = mocker.patch("arrsync.cli.profile_job")
+
+    job_attrs = dict(
+        type=JobType.Radarr,
+        source_url="http://host",
+        dest_url="http://host2",
+        dest_path="/path",
+        dest_profile="1",
+    )
+
+    mocked_get_sync_jobs.return_value = [
+        RadarrSyncJob.model_validate(dict(name="one", **job_attrs)),
+        RadarrSyncJob.model_validate(dict(name="two", profile=True, **job_attrs)),
+    ]
+
+    cli.main(configparser.ConfigParser(), profile_dir=str(tmp_path))
+
+    mocked_profile_job.assert_called_once_with("two", str(tmp_path))
+    assert mocked_start_sync_job.call_count == 2
+
+    mocked_profile_job.reset_mock()
+
+    cli.main(configparser.ConfigParser(), profile=True)
+
+    assert mocked_profile_job.call_count == 2
+
+
+def test_get_sync_jobs_destinations() -> None:
+    test_config = """
+[radarr-fan-out]
+type = radarr
+source_url = http://localhost:7878/
+dest_path = /movies
+dest_profile = Any
+dest_url.local = http://localhost:7879/
+dest_key.local = bbb
+dest_url.remote = http://remote:7878/
+dest_profile.remote = HD-1080p
+
+[radarr-single]
+type = radarr
+source_url = http://localhost:7878/
+dest_url = http://localhost:7879/
+dest_path = /movies
+dest_profile = Any
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    jobs = cli.get_sync_jobs(config_parser)
+
+    assert [(job.name, job.group) for job in jobs] == [
+        ("radarr-fan-out.local", "radarr-fan-out"),
+        ("radarr-fan-out.remote", "radarr-fan-out"),
+        ("radarr-single", None),
+    ]
+    assert str(jobs[0].dest_url) == "http://localhost:7879/"
+    assert jobs[0].dest_key == "bbb"
+    assert jobs[0].dest_profile == "Any"
+    assert str(jobs[1].dest_url) == "http://remote:7878/"
+    assert jobs[1].dest_key == ""
+    assert jobs[1].dest_profile == "HD-1080p"
+    assert jobs[1].dest_path == "/movies"
+
+    assert [[job.name for job in group] for group in cli.group_sync_jobs(jobs)] == [
+        ["radarr-fan-out.local", "radarr-fan-out.remote"],
+        ["radarr-single"],
+    ]
+
+
+def test_get_sync_jobs_fail_source_destination() -> None:
+    test_config = """
+[radarr-fan-out]
+type = radarr
+source_url.local = http://localhost:7878/
+dest_url.local = http://localhost:7879/
+dest_path = /movies
+dest_profile = Any
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    with pytest.raises(Exception, match="only sources or destinations"):
+        cli.get_sync_jobs(config_parser)
+
+    config_parser.set("radarr-fan-out", "type.local", "sonarr")
+
+    with pytest.raises(Exception, match="type.local is not a source or destination"):
+        cli.get_sync_jobs(config_parser)
+
+    config_parser.remove_option("radarr-fan-out", "type.local")
+    config_parser.set("radarr-fan-out", "mode", "bidirectional")
+
+    with pytest.raises(Exception, match="bidirectional jobs may not name"):
+        cli.get_sync_jobs(config_parser)
+
+
+def test_get_sync_jobs_fail_bidirectional_source_path() -> None:
+    test_config = """
+[radarr-mirror]
+type = radarr
+mode = bidirectional
+source_url = http://localhost:7878/
+dest_url = http://localhost:7879/
+dest_path = /movies
+dest_profile = Any
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    with pytest.raises(ValidationError, match="source_path is required"):
+        cli.get_sync_jobs(config_parser)
+
+    config_parser.set("radarr-mirror", "source_path", "/movies")
+    config_parser.set("radarr-mirror", "dest_delete", "1")
+
+    with pytest.raises(ValidationError, match="dest_delete is not supported"):
+        cli.get_sync_jobs(config_parser)
+
+    config_parser.set("radarr-mirror", "dest_delete", "0")
+    config_parser.set("radarr-mirror", "dest_update", "1")
+
+    with pytest.raises(ValidationError, match="dest_update is not supported"):
+        cli.get_sync_jobs(config_parser)
+
+    test_config = """
+[lidarr-mirror]
+type = lidarr
+mode = bidirectional
+source_url = http://localhost:8686/
+source_path = /music
+dest_url = http://localhost:8687/
+dest_path = /music
+dest_profile = Any
+dest_album_monitor = 1
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    with pytest.raises(ValidationError, match="dest_album_monitor is not supported"):
+        cli.get_sync_jobs(config_parser)
+
+
+def test_main_fan_out(
+    mocker: MockerFixture,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    mocked_start_fan_out_job = mocker.patch("arrsync.cli.start_fan_out_job")
+    mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+
+    job_attrs = dict(
+        type=JobType.Radarr,
+        source_url="http://host",
+        dest_url="http://host2",
+        dest_path="/path",
+        dest_profile="1",
+        group="fan-out",
+    )
+
+    jobs = [
+        RadarrSyncJob.model_validate(dict(name="fan-out.one", **job_attrs)),
+        RadarrSyncJob.model_validate(dict(name="fan-out.two", **job_attrs)),
+    ]
+
+    mocked_get_sync_jobs.return_value = jobs
+    mocked_start_fan_out_job.return_value = [None, Exception("host2 is down")]
+
+    registry = MetricsRegistry()
+
+    with caplog.at_level(logging.INFO):
+        cli.main(configparser.ConfigParser(), registry=registry)
+
+    mocked_start_fan_out_job.assert_called_once_with(
+        jobs, False, [mocker.ANY, mocker.ANY], mocker.ANY, plan=None
+    )
+    assert "fan-out: starting, syncing to 2 destinations" in caplog.text
+    assert "fan-out.one: finished" in caplog.text
+    assert "fan-out.two: error" in caplog.text
+    assert "fan-out: error" in caplog.text
+
+    output = registry.render()
+
+    assert 'arrsync_job_runs_total{job="fan-out.one",result="success"} 1' in output
+    assert 'arrsync_job_runs_total{job="fan-out.two",result="error"} 1' in output
+
+    mocked_start_fan_out_job.side_effect = Exception("source is down")
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO):
+        cli.main(configparser.ConfigParser())
+
+    assert "fan-out.one: error" in caplog.text
+    assert "fan-out.two: error" in caplog.text
+
+
+def test_get_sync_jobs_sources() -> None:
+    test_config = """
+[radarr-merge]
+type = radarr
+source_url.east = http://east:7878/
+source_url.west = http://west:7878/
+source_key.west = aaa
+source_url.north = http://north:7878/
+source_precedence = west, east
+dest_url = http://localhost:7879/
+dest_path = /movies
+dest_profile = Any
+"""
+
+    config_parser = create_config_parser()
+
+    config_parser.read_string(test_config)
+
+    jobs = cli.get_sync_jobs(config_parser)
+
+    assert [(job.name, job.group, job.merge) for job in jobs] == [
+        ("radarr-merge.west", "radarr-merge", True),
+        ("radarr-merge.east", "radarr-merge", True),
+        ("radarr-merge.north", "radarr-merge", True),
+    ]
+    assert str(jobs[0].source_url) == "http://west:7878/"
+    assert jobs[0].source_key == "aaa"
+    assert jobs[1].source_key == ""
+
+
+def test_main_merge(
+    mocker: MockerFixture,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    mocked_start_merge_job = mocker.patch("arrsync.cli.start_merge_job")
+    mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+
+    job_attrs = dict(
+        type=JobType.Radarr,
+        source_url="http://host",
+        dest_url="http://host2",
+        dest_path="/path",
+        dest_profile="1",
+        group="merge",
+        merge=True,
+    )
+
+    jobs = [
+        RadarrSyncJob.model_validate(dict(name="merge.one", **job_attrs)),
+        RadarrSyncJob.model_validate(dict(name="merge.two", **job_attrs)),
+    ]
+
+    mocked_get_sync_jobs.return_value = jobs
+
+    with caplog.at_level(logging.INFO):
+        cli.main(configparser.ConfigParser())
+
+    mocked_start_merge_job.assert_called_once_with(
+        jobs, False, metrics=mocker.ANY, plan=None
+    )
+    assert "merge: starting, merging 2 sources" in caplog.text
+    assert "merge: finished" in caplog.text
+
+    mocked_start_merge_job.side_effect = Exception("dest is down")
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO):
+        cli.main(configparser.ConfigParser())
+
+    assert "merge: error" in caplog.text
+
+
+def test_main_plan(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    mocked_start_sync_job = mocker.patch("arrsync.cli.start_sync_job")
+    mocked_start_merge_job = mocker.patch("arrsync.cli.start_merge_job")
+    mocked_apply_job_plan = mocker.patch("arrsync.cli.apply_job_plan")
+    mocked_get_sync_jobs = mocker.patch("arrsync.cli.get_sync_jobs")
+
+    job_attrs = dict(
+        type=JobType.Radarr,
+        source_url="http://host",
+        dest_url="http://host2",
+        dest_path="/path",
+        dest_profile="1",
+    )
+
+    jobs = [
+        RadarrSyncJob.model_validate(dict(name="one", **job_attrs)),
+        RadarrSyncJob.model_validate(
+            dict(name="two", mode="bidirectional", source_path="/path", **job_attrs)
+        ),
+        RadarrSyncJob.model_validate(
+            dict(name="merge.one", group="merge", merge=True, **job_attrs)
+        ),
+    ]
+
+    mocked_get_sync_jobs.return_value = jobs
+
+    def plan_job(job: SyncJob, dry_run: bool, metrics: JobMetrics, plan: Plan) -> None:
+        assert dry_run
+        plan.jobs[job.name] = JobPlan(type=job.type, dest_url=str(job.dest_url))
+
+    mocked_start_sync_job.side_effect = plan_job
+    path = str(tmp_path / "plan.json")
+
+    cli.main(configparser.ConfigParser(), plan_path=path)
+
+    plan = Plan.read(path)
+
+    assert plan.jobs.keys() == {"one", "two"}
+    mocked_start_merge_job.assert_called_once_with(
+        jobs[2:], True, metrics=mocker.ANY, plan=mocker.ANY
+    )
+    mocked_apply_job_plan.assert_not_called()
+
+    plan.jobs["merge"] = plan.jobs["two.reverse"] = plan.jobs["gone"] = plan.jobs["two"]
+    del plan.jobs["two"]
+    plan.write(path)
+
+    mocked_start_sync_job.reset_mock()
+    mocked_apply_job_plan.side_effect = [None, Exception("dest is down"), None]
+
+    with caplog.at_level(logging.INFO):
+        cli.main(
+            configparser.ConfigParser(),
+            apply_path=path,
+            metrics_path=str(tmp_path / "metrics.json"),
+        )
+
+    mocked_start_sync_job.assert_not_called()
+    assert [call.args[0].name for call in mocked_apply_job_plan.call_args_list] == [
+        "one",
+        "two.reverse",
+        "merge",
+    ]
+    assert mocked_apply_job_plan.call_args_list[0].args[1] == plan.jobs["one"]
+    assert "two: nothing planned, skipping" in caplog.text
+    assert "two.reverse: error" in caplog.text
+    assert "gone: planned job is not in the config, skipping" in caplog.text
+    assert len(json.loads((tmp_path / "metrics.json").read_text())) == 3
+
+
+def create_config(test_config: str) -> configparser.ConfigParser:
+    config = create_config_parser()
+    config.read_string(test_config)
+    return config
+
+
+def test_load_sync_jobs_cache(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    test_config = """
+[sync]
+type = radarr
+source_url = http://host
+dest_url = http://host2
+dest_path = /path
+dest_profile = 1
+source_headers = X-Test: aaa
+source_timeout = 5
+root_folder_map = /a -> /b
+
+[sonarr]
+type = sonarr
+source_url = http://host
+dest_url = http://host2
+dest_path = /path
+dest_profile = 1
+dest_season_monitor = all
+
+[lidarr]
+type = lidarr
+mode = bidirectional
+source_url = http://host
+source_path = /music
+dest_url = http://host2
+dest_path = /path
+dest_profile = 1
+"""
+    spy = mocker.spy(cli, "get_sync_jobs")
+    cache_path = str(tmp_path / "jobs.cache")
+
+    jobs = cli.load_sync_jobs(create_config(test_config))
+    assert spy.call_count == 1
+
+    assert cli.load_sync_jobs(create_config(test_config), cache_path) == jobs
+    assert spy.call_count == 2
+
+    # The jobs hold the api keys, so only the owner may read them
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+
+    # Unchanged options are read back without validating them again
+    assert cli.load_sync_jobs(create_config(test_config), cache_path) == jobs
+    assert spy.call_count == 2
+
+    # Upgrading pydantic compiles the jobs again
+    mocker.patch("arrsync.cli.pydantic.VERSION", "0")
+    assert cli.load_sync_jobs(create_config(test_config), cache_path) == jobs
+    assert spy.call_count == 3
+
+    changed = cli.load_sync_jobs(
+        create_config(test_config.replace("/path", "/other")), cache_path
+    )
+    assert spy.call_count == 4
+    assert str(changed[0].dest_path) == "/other"
+
+    (tmp_path / "jobs.cache").write_text("not json")
+
+    with caplog.at_level(logging.WARNING):
+        assert cli.load_sync_jobs(create_config(test_config), cache_path) == jobs
+
+    assert spy.call_count == 5
+    assert "ignoring unreadable config cache" in caplog.text
+
+
+def test_check_config(
+    create_stub_server: CreateStubServer,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    source_server = create_stub_server(JobType.Radarr)
+    dest_server = create_stub_server(JobType.Radarr)
+
+    test_config = f"""
+[common]
+type = radarr
+source_url = {source_server.url}
+source_key = stub
+dest_url = {dest_server.url}
+dest_key = stub
+dest_path = /path
+dest_profile = 1
+retries = 0
+
+[one]
+
+[two]
+"""
+
+    with caplog.at_level(logging.INFO):
+        assert cli.check_config(create_config(test_config))
+
+    assert f"one: reached radarr 3.0.0-stub at {source_server.url}" in caplog.text
+    assert "checked 2 jobs, reached 2 of 2 hosts" in caplog.text
+
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO):
+        # Without an api key the host is already needed to create the Api
+        assert not cli.check_config(
+            create_config(
+                test_config + "[three]\ndest_url = http://127.0.0.1:1\ndest_key =\n"
+            )
+        )
+
+    assert "three: could not reach http://127.0.0.1:1" in caplog.text
+    assert "checked 3 jobs, reached 2 of 3 hosts" in caplog.text
+
+    caplog.clear()
+
+    with caplog.at_level(logging.ERROR):
+        assert not cli.check_config(create_config("[sync]\ntype = radarr\n"))
+
+    assert "config error" in caplog.text
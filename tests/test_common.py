@@ -1,7 +1,17 @@
 #!/usr/bin/env python
 
 
-from arrsync.common import LidarrContent, RadarrContent, SonarrContent
+from arrsync.common import (
+    Index,
+    LidarrContent,
+    RadarrContent,
+    RootFolderMap,
+    SonarrContent,
+    SonarrSeason,
+    SourceLibrary,
+    Tag,
+    parse_headers,
+)
 
 
 def test_sonarr_item_equality() -> None:
@@ -13,7 +23,7 @@ def test_sonarr_item_equality() -> None:
         monitored=False,
         use_scene_numbering=True,
         season_folder=True,
-        seasons=[{"title": "Season 1", "attr": 10}],
+        seasons=[SonarrSeason(season_number=1, monitored=True)],
         quality_profile_id=10,
         root_folder_path="/path",
         tags=[],
@@ -27,7 +37,7 @@ def test_sonarr_item_equality() -> None:
         monitored=False,
         use_scene_numbering=True,
         season_folder=True,
-        seasons=[{"title": "Season 1", "attr": 10}],
+        seasons=[SonarrSeason(season_number=1, monitored=True)],
         quality_profile_id=10,
         root_folder_path="/path",
         tags=[],
@@ -93,3 +103,103 @@ def test_lidarr_item_equality() -> None:
 
     assert a == b
     assert a != {}
+
+
+def test_root_folder_map() -> None:
+    root_folders = RootFolderMap(
+        [("/tv/anime/", "/data/anime"), ("^/tv/.*kids", "/data/kids")], "/data/tv"
+    )
+
+    assert root_folders.get("/tv/anime") == "/data/anime"
+    assert root_folders.get("/tv/anime/") == "/data/anime"
+    assert root_folders.get("/tv/anime-old/") == "/data/tv"
+    assert root_folders.get("/tv/the-kids/") == "/data/kids"
+    assert root_folders.get("/tv/") == "/data/tv"
+    assert root_folders.get(None) == "/data/tv"
+
+
+def test_index() -> None:
+    tags = Index([Tag(id=1, label="Anime"), Tag(id=2, label="anime")])
+
+    assert tags.find("1") == Tag(id=1, label="Anime")
+    assert tags.find("ANIME") == Tag(id=1, label="Anime")
+    assert tags.find("3") is None
+
+    tags.append(Tag(id=3, label="kids"))
+
+    assert tags.find("3") == tags.find("Kids") == Tag(id=3, label="kids")
+    assert len(tags) == 3
+
+
+def test_index_find_all() -> None:
+    tags = Index(
+        [Tag(id=1, label="Anime"), Tag(id=2, label="anime"), Tag(id=3, label="1")]
+    )
+
+    assert tags.find_all("ANIME") == [
+        Tag(id=1, label="Anime"),
+        Tag(id=2, label="anime"),
+    ]
+    assert tags.find_all("1") == [Tag(id=1, label="Anime"), Tag(id=3, label="1")]
+    assert tags.find_all("3") == [Tag(id=3, label="1")]
+    assert tags.find_all("4") == []
+
+
+def test_index_changes() -> None:
+    anime, kids, family = (
+        Tag(id=1, label="anime"),
+        Tag(id=2, label="kids"),
+        Tag(id=3, label="family"),
+    )
+    tags = Index([anime])
+
+    tags.extend([kids])
+    assert tags.find("kids") == kids
+
+    tags.insert(0, family)
+    assert tags.find("3") == family
+
+    tags.remove(kids)
+    assert tags.find("kids") is None
+
+    assert tags.pop() == anime
+    assert tags.find("anime") is None
+
+    tags += [anime]
+    assert tags.find("1") == anime
+
+    tags[0] = kids
+    assert tags.find("family") is None
+    assert tags.find("kids") == kids
+
+    del tags[0]
+    assert tags.find("kids") is None
+
+    tags *= 2
+    assert tags.find_all("anime") == [anime, anime]
+
+    tags.clear()
+    assert tags.find("1") is None
+    assert isinstance(tags, Index)
+
+
+def test_index_validation() -> None:
+    library = SourceLibrary.model_validate(
+        {"tags": [{"id": 1, "label": "anime"}], "profiles": [], "content": []}
+    )
+
+    assert isinstance(library.tags, Index)
+    assert library.tags.find("anime") == Tag(id=1, label="anime")
+
+
+def test_parse_headers() -> None:
+    parse_headers.cache_clear()
+
+    headers = "X-Test-Header-Id=aaa\nX-Test-Header-Secret: bbb"
+
+    assert parse_headers(headers) == (
+        ("X-Test-Header-Id", "aaa"),
+        ("X-Test-Header-Secret", "bbb"),
+    )
+    assert parse_headers(headers) is parse_headers(headers)
+    assert parse_headers.cache_info().misses == 1
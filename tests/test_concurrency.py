@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import threading
+import time
+from typing import List
+
+from pytest_mock import MockerFixture
+
+from arrsync.concurrency import AdaptiveLimiter, get_limiter, reset_limiters
+
+
+def test_limiter_bounds() -> None:
+    limiter = AdaptiveLimiter(initial=20, min_limit=2, max_limit=4)
+    assert limiter.current == 4
+
+    limiter = AdaptiveLimiter(initial=0, min_limit=2, max_limit=1)
+    assert limiter.current == 2
+    assert limiter.max_limit == 2
+
+
+def test_limiter_additive_increase() -> None:
+    limiter = AdaptiveLimiter(initial=1, max_limit=4)
+
+    limiter.record(0.1, ok=True)
+    assert limiter.current == 2
+    assert limiter.baseline == 0.1
+
+    # Grows by about one per window of limit successful requests
+    limiter.record(0.1, ok=True)
+    limiter.record(0.1, ok=True)
+    limiter.record(0.1, ok=True)
+    assert limiter.current == 3
+
+    for _ in range(20):
+        limiter.record(0.1, ok=True)
+
+    assert limiter.current == 4
+
+
+def test_limiter_multiplicative_decrease(mocker: MockerFixture) -> None:
+    mock_monotonic = mocker.patch("arrsync.concurrency.time.monotonic")
+    mock_monotonic.return_value = 100.0
+
+    limiter = AdaptiveLimiter(initial=8, max_limit=8)
+
+    limiter.record(0.1, ok=True)
+    assert limiter.current == 8
+
+    limiter.record(0.1, ok=False)
+    assert limiter.current == 4
+
+    # Requests already in flight when the limit was lowered are ignored
+    limiter.record(0.1, ok=False)
+    assert limiter.current == 4
+
+    mock_monotonic.return_value = 102.0
+
+    # A latency spike backs off without moving the baseline much
+    limiter.record(1.0, ok=True)
+    assert limiter.current == 2
+    assert limiter.baseline is not None and limiter.baseline < 0.2
+
+    mock_monotonic.return_value = 104.0
+    limiter.record(0.1, ok=False)
+    mock_monotonic.return_value = 106.0
+    limiter.record(0.1, ok=False)
+    assert limiter.current == 1
+
+
+def test_limiter_acquire_limits_in_flight() -> None:
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    peak: List[int] = []
+
+    def work() -> None:
+        with limiter.acquire():
+            peak.append(limiter.in_flight)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert limiter.in_flight == 0
+
+
+def test_limiter_resize() -> None:
+    limiter = AdaptiveLimiter(initial=8, max_limit=8)
+
+    limiter.resize(2)
+    assert limiter.current == 2
+    assert limiter.max_limit == 2
+
+    limiter.resize(16)
+    assert limiter.current == 2
+    assert limiter.max_limit == 16
+
+
+def test_get_limiter_per_host() -> None:
+    reset_limiters()
+
+    limiter = get_limiter("http://host:8989/sonarr", 8)
+
+    assert get_limiter("http://host:8989/other", 4) is limiter
+    assert limiter.max_limit == 4
+    assert get_limiter("http://host2:8989/", 4) is not limiter
+
+    reset_limiters()
+
+    assert get_limiter("http://host:8989/sonarr", 8) is not limiter
@@ -5,7 +5,7 @@ import logging
 import pytest
 from pytest_mock import MockFixture
 
-from arrsync.config import parse_args, set_debug_level
+from arrsync.config import configure_logging, parse_args, set_debug_level
 
 
 def test_set_debug_level(mocker: MockFixture) -> None:
@@ -14,6 +14,13 @@ def test_set_debug_level(mocker: MockFixture) -> None:
     mock_logger.setLevel.assert_called_with(logging.CRITICAL)
 
 
+def test_configure_logging(mocker: MockFixture) -> None:
+    mocker.patch.dict("os.environ", {"SYNCARR_DEBUG_LEVEL": "DEBUG"})
+    mock_basic_config = mocker.patch("arrsync.config.logging.basicConfig")
+    configure_logging()
+    assert mock_basic_config.call_args.kwargs["level"] == "DEBUG"
+
+
 def test_parse_args_fails(mocker: MockFixture) -> None:
     with pytest.raises(SystemExit):
         parse_args()
@@ -47,3 +54,113 @@ def test_parse_args_dry_run(mocker: MockFixture) -> None:
     args = parse_args(["--config", "tests/fixtures/config.conf", "--dry-run"])
     assert isinstance(args.dry_run, bool)
     assert args.dry_run is True
+
+
+def test_parse_args_metrics(mocker: MockFixture) -> None:
+    mocker.patch("builtins.open")
+
+    args = parse_args(["--config", "tests/fixtures/config.conf"])
+    assert args.metrics is None
+    assert args.metrics_format == "json"
+
+    args = parse_args(
+        [
+            "--config",
+            "tests/fixtures/config.conf",
+            "--metrics",
+            "metrics.prom",
+            "--metrics-format",
+            "prometheus",
+        ]
+    )
+    assert args.metrics == "metrics.prom"
+    assert args.metrics_format == "prometheus"
+
+
+def test_parse_args_daemon(mocker: MockFixture) -> None:
+    mocker.patch("builtins.open")
+
+    args = parse_args(["--config", "tests/fixtures/config.conf"])
+    assert args.interval is None
+    assert args.metrics_port is None
+
+    args = parse_args(
+        [
+            "--config",
+            "tests/fixtures/config.conf",
+            "--interval",
+            "300",
+            "--metrics-port",
+            "9717",
+            "--metrics-host",
+            "127.0.0.1",
+        ]
+    )
+    assert args.interval == 300
+    assert args.metrics_port == 9717
+    assert args.metrics_host == "127.0.0.1"
+
+
+def test_parse_args_profile(mocker: MockFixture) -> None:
+    mocker.patch("builtins.open")
+
+    args = parse_args(["--config", "tests/fixtures/config.conf"])
+    assert args.profile is False
+    assert args.profile_dir == "."
+
+    args = parse_args(
+        ["--config", "tests/fixtures/config.conf", "--profile", "--profile-dir", "out"]
+    )
+    assert args.profile is True
+    assert args.profile_dir == "out"
+
+
+def test_parse_args_plan(mocker: MockFixture) -> None:
+    mocker.patch("builtins.open")
+
+    args = parse_args(["--config", "tests/fixtures/config.conf"])
+    assert args.plan is None
+    assert args.apply is None
+
+    args = parse_args(["--config", "tests/fixtures/config.conf", "--plan", "out.json"])
+    assert args.plan == "out.json"
+
+    args = parse_args(["--config", "tests/fixtures/config.conf", "--apply", "in.json"])
+    assert args.apply == "in.json"
+
+    with pytest.raises(SystemExit):
+        parse_args(
+            [
+                "--config",
+                "tests/fixtures/config.conf",
+                "--plan",
+                "out.json",
+                "--apply",
+                "in.json",
+            ]
+        )
+
+
+def test_parse_args_check_config(mocker: MockFixture) -> None:
+    mocker.patch("builtins.open")
+
+    args = parse_args(["--config", "tests/fixtures/config.conf"])
+    assert args.check_config is False
+    assert args.config_cache is None
+
+    args = parse_args(
+        [
+            "--config",
+            "tests/fixtures/config.conf",
+            "--check-config",
+            "--config-cache",
+            "jobs.cache",
+        ]
+    )
+    assert args.check_config is True
+    assert args.config_cache == "jobs.cache"
+
+    with pytest.raises(SystemExit):
+        parse_args(
+            ["--config", "tests/fixtures/config.conf", "--check-config", "--plan", "x"]
+        )
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+import json
+import logging
+from pathlib import Path
+
+import pytest
+from tests.conftest import CreateContentItem
+
+from arrsync.common import ContentItems, JobType
+from arrsync.journal import MAX_STALLED_RESUMES, Journal
+from arrsync.plan import JobPlan
+
+
+def get_pending_content(journal: Journal) -> ContentItems:
+    pending = journal.pending(JobType.Radarr)
+
+    assert pending is not None
+    return pending.get_content()
+
+
+def test_journal_path(tmp_path: Path) -> None:
+    journal = Journal(str(tmp_path / "journals"), "a/b c")
+
+    assert journal.path == str(tmp_path / "journals" / "a_b_c.journal")
+    assert (tmp_path / "journals").is_dir()
+
+
+def test_journal_pending_no_file(tmp_path: Path) -> None:
+    assert Journal(str(tmp_path), "sync").pending(JobType.Radarr) is None
+
+
+@pytest.mark.parametrize("job_type", [JobType.Sonarr, JobType.Radarr, JobType.Lidarr])
+def test_journal_pending(
+    tmp_path: Path,
+    job_type: JobType,
+    create_content_item: CreateContentItem,
+) -> None:
+    content = [create_content_item(job_type) for _ in range(3)]
+
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan(content)
+    journal.saved(content[1])
+
+    pending = journal.pending(job_type)
+
+    assert pending is not None
+    assert pending.get_content() == [content[0], content[2]]
+    assert pending.get_content()[0].model_dump() == content[0].model_dump()
+
+    journal.complete()
+
+    assert journal.pending(job_type) is None
+
+
+def test_journal_plan_starts_over(
+    tmp_path: Path, create_content_item: CreateContentItem
+) -> None:
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan([create_content_item(JobType.Radarr)])
+
+    item = create_content_item(JobType.Radarr)
+    journal.plan([item])
+
+    assert get_pending_content(journal) == [item]
+
+    with open(journal.path) as file:
+        assert [json.loads(line)["event"] for line in file] == ["plan", "planned"]
+
+
+def test_journal_pending_malformed_line(
+    tmp_path: Path,
+    create_content_item: CreateContentItem,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    content = [create_content_item(JobType.Radarr) for _ in range(2)]
+
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan(content)
+
+    # Simulate a run killed while writing a line
+    with open(journal.path, "a") as file:
+        file.write('{"event":"sav')
+
+    with caplog.at_level(logging.WARNING):
+        assert get_pending_content(journal) == content
+
+    assert "malformed" in caplog.text
+
+
+def test_journal_pending_ignores_unknown_events(tmp_path: Path) -> None:
+    journal = Journal(str(tmp_path), "sync")
+
+    with open(journal.path, "w") as file:
+        file.write('{"event":"plan"}\n{"event":"other"}\n')
+
+    assert get_pending_content(journal) == []
+
+
+def test_journal_pending_changes(
+    tmp_path: Path, create_content_item: CreateContentItem
+) -> None:
+    item = create_content_item(JobType.Radarr, id=1)
+    changes = JobPlan.create(
+        JobType.Radarr,
+        "http://dest",
+        [],
+        [(item, {"monitored": False})],
+        [item],
+        {},
+        [],
+    )
+
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan([], changes)
+
+    pending = journal.pending(JobType.Radarr)
+
+    assert pending is not None
+    assert pending.get_updates() == [(item, {"monitored": False})]
+    assert pending.get_deletions() == [item]
+
+
+def test_journal_pending_stalled(
+    tmp_path: Path,
+    create_content_item: CreateContentItem,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    content = [create_content_item(JobType.Radarr) for _ in range(2)]
+
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan(content)
+
+    for _ in range(MAX_STALLED_RESUMES - 1):
+        journal.resume()
+
+    # A resume that saved something starts the count over
+    journal.saved(content[0])
+
+    for _ in range(MAX_STALLED_RESUMES - 1):
+        journal.resume()
+
+    assert get_pending_content(journal) == content[1:]
+
+    journal.resume()
+
+    with caplog.at_level(logging.WARNING):
+        assert journal.pending(JobType.Radarr) is None
+
+    assert "the last 3 resumes saved nothing, planning again" in caplog.text
+    assert journal.pending(JobType.Radarr) is None
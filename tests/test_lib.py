@@ -1,31 +1,64 @@
 #!/usr/bin/env python
 
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
 import pytest
 from mock import MagicMock
 from pytest_mock import MockerFixture
-from tests.conftest import CreateContentItem, CreateSyncJob
+from tests.conftest import CreateContentItem, CreateStubServer, CreateSyncJob
 
-from arrsync.api import Api
+from arrsync.api import Api, ApiError
+from arrsync.breaker import CircuitOpenError
 from arrsync.common import (
     ContentItem,
     ContentItems,
+    ContentMapping,
+    Index,
     JobType,
     Language,
     Languages,
     LidarrContent,
     Profile,
     Profiles,
+    SeasonMonitor,
     SonarrContent,
+    SonarrSeason,
+    SourceLibrary,
     Status,
     Tag,
     Tags,
 )
+from arrsync.concurrency import AdaptiveLimiter
+from arrsync.journal import Journal
 from arrsync.lib import (
+    DeadlineExceededError,
+    DeleteLimitError,
+    SourceCache,
+    apply_job_plan,
     calculate_content_diff,
+    delete_content,
+    fetch_sources,
     get_content_payloads,
+    get_monitored_seasons,
+    get_remaining,
+    get_reverse_job,
+    merge_content,
+    resolve_profile_map,
+    resolve_tag_map,
+    start_fan_out_job,
+    start_merge_job,
     start_sync_job,
     sync_content,
+    update_content,
 )
+from arrsync.metrics import JobMetrics
+from arrsync.plan import JobPlan, Plan, SkippedItem
+from arrsync.quarantine import Quarantine
 from arrsync.utils import _assert_never
 
 
@@ -60,8 +93,8 @@ def test_calculate_content_diff(
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
-        source_tags=[],
-        source_profiles=[],
+        source_tags=Index(),
+        source_profiles=Index(),
         dest_content=dest_content,
     )
 
@@ -80,12 +113,14 @@ def test_calculate_content_diff_tag_include(
 ) -> None:
     job = create_sync_job(job_type, source_tag_include="1, tag 4")
 
-    source_tags: Tags = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    source_tags: Tags = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     item_one = create_content_item(
         job_type,
@@ -114,7 +149,7 @@ def test_calculate_content_diff_tag_include(
         job=job,
         source_content=source_content,
         source_tags=source_tags,
-        source_profiles=[],
+        source_profiles=Index(),
         dest_content=dest_content,
     )
 
@@ -133,12 +168,14 @@ def test_calculate_content_diff_tag_exclude(
 ) -> None:
     job = create_sync_job(job_type, source_tag_exclude="1, tag 4")
 
-    source_tags = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    source_tags = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     item_one = create_content_item(
         job_type,
@@ -165,14 +202,19 @@ def test_calculate_content_diff_tag_exclude(
 
     dest_content: ContentItems = []
 
+    metrics = JobMetrics("sync")
+
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
         source_tags=source_tags,
-        source_profiles=[],
+        source_profiles=Index(),
         dest_content=dest_content,
+        metrics=metrics,
     )
 
+    assert metrics.counters["diffed"] == 4
+    assert metrics.filtered == {"source_tag_exclude": 2}
     assert len(content_diff) == 2
     assert item_in_list(content_diff, item_two)
     assert item_in_list(content_diff, item_four)
@@ -207,8 +249,8 @@ def test_calculate_content_diff_radarr_skip_missing(
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
-        source_tags=[],
-        source_profiles=[],
+        source_tags=Index(),
+        source_profiles=Index(),
         dest_content=dest_content,
     )
 
@@ -244,8 +286,8 @@ def test_calculate_content_diff_radarr_include_missing(
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
-        source_tags=[],
-        source_profiles=[],
+        source_tags=Index(),
+        source_profiles=Index(),
         dest_content=dest_content,
     )
 
@@ -262,11 +304,13 @@ def test_calculate_content_quality_profile_include(
 ) -> None:
     job = create_sync_job(job_type, source_profile_include=" other one , 20")
 
-    source_profiles: Profiles = [
-        Profile(name="Any", id=1),
-        Profile(name="Other One", id=10),
-        Profile(name="Profile", id=20),
-    ]
+    source_profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+            Profile(name="Other One", id=10),
+            Profile(name="Profile", id=20),
+        ]
+    )
 
     item_one = create_content_item(job_type, quality_profile_id=1)
     item_two = create_content_item(job_type, quality_profile_id=10)
@@ -283,7 +327,7 @@ def test_calculate_content_quality_profile_include(
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
-        source_tags=[],
+        source_tags=Index(),
         source_profiles=source_profiles,
         dest_content=dest_content,
     )
@@ -307,11 +351,13 @@ def test_calculate_content_quality_profile_exclude(
         source_profile_exclude=" other one , 20",
     )
 
-    source_profiles: Profiles = [
-        Profile(name="Any", id=1),
-        Profile(name="Other One", id=10),
-        Profile(name="Profile", id=20),
-    ]
+    source_profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+            Profile(name="Other One", id=10),
+            Profile(name="Profile", id=20),
+        ]
+    )
 
     item_one = create_content_item(job_type, quality_profile_id=1)
     item_two = create_content_item(job_type, quality_profile_id=10)
@@ -326,7 +372,7 @@ def test_calculate_content_quality_profile_exclude(
     content_diff = calculate_content_diff(
         job=job,
         source_content=source_content,
-        source_tags=[],
+        source_tags=Index(),
         source_profiles=source_profiles,
         dest_content=[],
     )
@@ -348,7 +394,7 @@ def test_get_content_payloads_no_dest_profile(
         dest_profile="20",
     )
 
-    profiles: Profiles = []
+    profiles: Profiles = Index()
 
     item_one = create_content_item(job_type, quality_profile_id=1)
 
@@ -361,8 +407,8 @@ def test_get_content_payloads_no_dest_profile(
             job=job,
             content=content,
             dest_profiles=profiles,
-            dest_metadata_profiles=[],
-            dest_languages=[],
+            dest_metadata_profiles=Index(),
+            dest_languages=Index(),
         )
 
 
@@ -377,9 +423,11 @@ def test_get_content_payloads_dest_path(
         dest_path="/data/path",
     )
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
     item_one = create_content_item(job_type, root_folder_path="/old/path")
 
@@ -392,7 +440,7 @@ def test_get_content_payloads_dest_path(
         content=content,
         dest_profiles=profiles,
         dest_metadata_profiles=profiles,
-        dest_languages=[],
+        dest_languages=Index(),
     )
 
     payload = payloads[0]
@@ -412,11 +460,13 @@ def test_get_content_payloads_dest_profile(
         dest_profile="20",
     )
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-        Profile(name="Other One", id=10),
-        Profile(name="Profile", id=20),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+            Profile(name="Other One", id=10),
+            Profile(name="Profile", id=20),
+        ]
+    )
 
     item_one = create_content_item(job_type, quality_profile_id=1)
 
@@ -429,7 +479,7 @@ def test_get_content_payloads_dest_profile(
         content=content,
         dest_profiles=profiles,
         dest_metadata_profiles=profiles,
-        dest_languages=[],
+        dest_languages=Index(),
     )
 
     payload = payloads[0]
@@ -449,9 +499,11 @@ def test_get_content_payloads_monitored(
         dest_monitor=True,
     )
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
     item_one = create_content_item(job_type, monitored=False, quality_profile_id=10)
 
@@ -462,7 +514,7 @@ def test_get_content_payloads_monitored(
         content=content,
         dest_profiles=profiles,
         dest_metadata_profiles=profiles,
-        dest_languages=[],
+        dest_languages=Index(),
     )
 
     payload = payloads[0]
@@ -482,9 +534,11 @@ def test_get_content_payloads_search_missing(
         dest_search_missing=True,
     )
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
     item_one = create_content_item(job_type)
 
@@ -495,7 +549,7 @@ def test_get_content_payloads_search_missing(
         content=content,
         dest_profiles=profiles,
         dest_metadata_profiles=profiles,
-        dest_languages=[],
+        dest_languages=Index(),
     )
 
     payload = payloads[0]
@@ -520,11 +574,15 @@ def test_get_content_payloads_sonarr_languages(
     job_type = JobType.Sonarr
     job = create_sync_job(job_type, dest_language_profile="2")
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
-    languages: Languages = [Language(name="English", id=1), Language(name="Test", id=2)]
+    languages: Languages = Index(
+        [Language(name="English", id=1), Language(name="Test", id=2)]
+    )
 
     item_one = create_content_item(job_type, language_profile_id=1)
 
@@ -534,7 +592,7 @@ def test_get_content_payloads_sonarr_languages(
         job=job,
         content=content,
         dest_profiles=profiles,
-        dest_metadata_profiles=[],
+        dest_metadata_profiles=Index(),
         dest_languages=languages,
     )
 
@@ -544,6 +602,79 @@ def test_get_content_payloads_sonarr_languages(
     assert payload.language_profile_id == 2
 
 
+@pytest.mark.parametrize(
+    "season_monitor,expected",
+    [
+        (SeasonMonitor.Source, [True, False, True, False]),
+        (SeasonMonitor.All, [False, True, True, True]),
+        (SeasonMonitor.Latest, [False, False, False, True]),
+        (SeasonMonitor.First, [False, True, False, False]),
+        (SeasonMonitor.Off, [False, False, False, False]),
+    ],
+)
+def test_get_monitored_seasons(
+    season_monitor: SeasonMonitor, expected: List[bool]
+) -> None:
+    seasons = [
+        SonarrSeason(season_number=number, monitored=monitored)
+        for number, monitored in enumerate([True, False, True, False])
+    ]
+
+    monitored_seasons = get_monitored_seasons(seasons, season_monitor)
+
+    assert [season.monitored for season in monitored_seasons] == expected
+    assert [season.monitored for season in seasons] == [True, False, True, False]
+    assert all(
+        new is old
+        for new, old in zip(monitored_seasons, seasons)
+        if new.monitored == old.monitored
+    )
+
+
+def test_get_monitored_seasons_specials_only() -> None:
+    seasons = [SonarrSeason(season_number=0, monitored=True)]
+
+    with pytest.raises(Exception):
+        get_monitored_seasons(seasons, None)  # type: ignore[arg-type]
+
+    assert not get_monitored_seasons(seasons, SeasonMonitor.Latest)[0].monitored
+    assert not get_monitored_seasons(seasons, SeasonMonitor.First)[0].monitored
+
+
+def test_get_content_payloads_sonarr_seasons(
+    create_sync_job: CreateSyncJob,
+    create_content_item: CreateContentItem,
+) -> None:
+    job_type = JobType.Sonarr
+    job = create_sync_job(
+        job_type, dest_season_monitor="latest", dest_search_missing=True
+    )
+
+    item = create_content_item(
+        job_type,
+        seasons=[
+            {"seasonNumber": 1, "monitored": True},
+            {"seasonNumber": 2, "monitored": False},
+        ],
+    )
+
+    payload = get_content_payloads(
+        job=job,
+        content=[item],
+        dest_profiles=Index([Profile(name="Any", id=1)]),
+        dest_metadata_profiles=Index(),
+        dest_languages=Index(),
+    )[0]
+
+    assert isinstance(payload, SonarrContent) and isinstance(item, SonarrContent)
+    assert payload.model_dump(by_alias=True)["seasons"] == [
+        {"seasonNumber": 1, "monitored": False},
+        {"seasonNumber": 2, "monitored": True},
+    ]
+    assert [season.monitored for season in item.seasons] == [True, False]
+    assert payload.add_options and not item.add_options
+
+
 def test_get_content_payloads_lidarr_metadata_profile(
     create_sync_job: CreateSyncJob,
     create_content_item: CreateContentItem,
@@ -551,14 +682,18 @@ def test_get_content_payloads_lidarr_metadata_profile(
     job_type = JobType.Lidarr
     job = create_sync_job(job_type, dest_metadata_profile="other")
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
-    metadata_profiles: Profiles = [
-        Profile(name="Standard", id=1),
-        Profile(name="Other", id=10),
-    ]
+    metadata_profiles: Profiles = Index(
+        [
+            Profile(name="Standard", id=1),
+            Profile(name="Other", id=10),
+        ]
+    )
 
     item_one = create_content_item(job_type, metadata_profile_id=1)
 
@@ -571,7 +706,7 @@ def test_get_content_payloads_lidarr_metadata_profile(
         content=content,
         dest_profiles=profiles,
         dest_metadata_profiles=metadata_profiles,
-        dest_languages=[],
+        dest_languages=Index(),
     )
 
     payload = payloads[0]
@@ -587,11 +722,13 @@ def test_get_content_payloads_lidarr_no_metdata_profile(
     job_type = JobType.Lidarr
     job = create_sync_job(job_type)
 
-    profiles: Profiles = [
-        Profile(name="Any", id=1),
-    ]
+    profiles: Profiles = Index(
+        [
+            Profile(name="Any", id=1),
+        ]
+    )
 
-    metadata_profiles: Profiles = []
+    metadata_profiles: Profiles = Index()
 
     item_one = create_content_item(job_type, metadata_profile_id=1)
 
@@ -605,7 +742,7 @@ def test_get_content_payloads_lidarr_no_metdata_profile(
             content=content,
             dest_profiles=profiles,
             dest_metadata_profiles=metadata_profiles,
-            dest_languages=[],
+            dest_languages=Index(),
         )
 
 
@@ -623,9 +760,12 @@ def test_sync_content(
         dest_api = mocker.patch.object(target=api, attribute="save")
         dest_api.save.return_value = content[0].model_dump()
 
-        sync_content(content=content, dest_api=dest_api)
+        metrics = JobMetrics("sync")
+
+        sync_content(content=content, dest_api=dest_api, metrics=metrics)
 
         dest_api.save.assert_called_once_with(content_item=content[0])
+        assert metrics.counters["saved"] == 1
 
         dest_api.save.return_value = None
 
@@ -633,6 +773,45 @@ def test_sync_content(
             sync_content(content=content, dest_api=dest_api)
 
 
+def test_sync_content_concurrent(
+    mocker: MockerFixture,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(20)]
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = lambda content_item: content_item.model_dump()
+
+    # Mocked saves take microseconds, so ignore their jitter in latency
+    limiter = AdaptiveLimiter(max_limit=4, tolerance=float("inf"))
+    metrics = JobMetrics("sync")
+
+    sync_content(content=content, dest_api=dest_api, metrics=metrics, limiter=limiter)
+
+    assert dest_api.save.call_count == 20
+    assert metrics.counters["saved"] == 20
+    assert limiter.current == 4
+    assert limiter.in_flight == 0
+
+
+def test_sync_content_save_raises(
+    mocker: MockerFixture,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(5)]
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = Exception("failed to check status got 500")
+
+    limiter = AdaptiveLimiter(initial=4, max_limit=4)
+
+    with pytest.raises(Exception, match="500"):
+        sync_content(content=content, dest_api=dest_api, limiter=limiter)
+
+    assert limiter.current < 4
+    assert limiter.in_flight == 0
+
+
 @pytest.mark.parametrize("job_type", [JobType.Sonarr, JobType.Radarr, JobType.Lidarr])
 def test_sync_content_dry_run(
     mocker: MockerFixture,
@@ -662,7 +841,7 @@ def test_start_sync_job(
     mock_get_content_payloads = mocker.patch("arrsync.lib.get_content_payloads")
     mock_calculate_content_diff = mocker.patch("arrsync.lib.calculate_content_diff")
 
-    job = create_sync_job(job_type)
+    job = create_sync_job(job_type, source_timeout=(1.0, 2.0))
 
     source_api = MagicMock(spec=Api)
     source_api.__enter__.return_value = source_api
@@ -679,6 +858,8 @@ def test_start_sync_job(
     start_sync_job(job)
 
     assert mock_api.call_count == 2
+    assert mock_api.call_args_list[0].kwargs["timeout"] == (1.0, 2.0)
+    assert mock_api.call_args_list[1].kwargs["timeout"] == (10.0, 60.0)
     source_api.status.assert_called_once_with()
     dest_api.status.assert_called_once_with()
     source_api.tag.assert_called_once_with()
@@ -708,3 +889,1051 @@ def test_start_sync_job(
 
     with pytest.raises(Exception):
         start_sync_job(job)
+
+
+def test_start_sync_job_resume_changes(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    create_sync_job: CreateSyncJob,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(2)]
+    updated = create_content_item(JobType.Radarr, id=5)
+    deleted = create_content_item(JobType.Radarr, id=6)
+    gone = create_content_item(JobType.Radarr, id=7)
+
+    job = create_sync_job(
+        JobType.Radarr,
+        journal_dir=str(tmp_path),
+        quarantine_file=str(tmp_path / "quarantine.json"),
+    )
+
+    quarantine = Quarantine(job.quarantine_file or "", job.name, 3600)
+    quarantine.add(content[0], Exception("rejected"))
+    quarantine.save()
+
+    Journal(str(tmp_path), job.name).plan(
+        content,
+        JobPlan.create(
+            JobType.Radarr,
+            str(job.dest_url),
+            [],
+            [(updated, {"monitored": False})],
+            [deleted, gone],
+            {},
+            [],
+        ),
+    )
+
+    source_api, dest_api = MagicMock(spec=Api), MagicMock(spec=Api)
+
+    for api in (source_api, dest_api):
+        api.__enter__.return_value = api
+        api.status.return_value = Status.model_validate({"version": "3"})
+
+    # The item planned for deletion as gone was deleted since
+    dest_api.content.return_value = [updated, deleted]
+    dest_api.save.side_effect = lambda content_item: content_item.model_dump()
+    mocker.patch("arrsync.lib.Api", side_effect=[source_api, dest_api])
+
+    start_sync_job(job)
+
+    source_api.content.assert_not_called()
+    dest_api.save.assert_called_once_with(content_item=content[1])
+    dest_api.update.assert_called_once_with(
+        content_item=updated, changes={"monitored": False}
+    )
+    dest_api.delete.assert_called_once_with(content_item=deleted)
+    assert Journal(str(tmp_path), job.name).pending(JobType.Radarr) is None
+
+
+def test_sync_content_journal(
+    tmp_path: Path,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(3)]
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = lambda content_item: content_item.model_dump()
+
+    journal = Journal(str(tmp_path), "sync")
+    journal.plan(content)
+
+    sync_content(content=content[:2], dest_api=dest_api, journal=journal)
+
+    pending = journal.pending(JobType.Radarr)
+
+    assert pending is not None
+    assert pending.get_content() == content[2:]
+
+
+def test_start_sync_job_resume(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    create_sync_job: CreateSyncJob,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(3)]
+
+    mock_calculate_content_diff = mocker.patch("arrsync.lib.calculate_content_diff")
+    mocker.patch("arrsync.lib.get_content_payloads", return_value=content)
+
+    job = create_sync_job(
+        JobType.Radarr, journal_dir=str(tmp_path), dest_max_concurrency=1
+    )
+
+    def create_apis() -> List[MagicMock]:
+        apis = [MagicMock(spec=Api), MagicMock(spec=Api)]
+
+        for api in apis:
+            api.__enter__.return_value = api
+            api.status.return_value = Status.model_validate({"version": "3"})
+
+        return apis
+
+    source_api, dest_api = create_apis()
+    dest_api.save.side_effect = [content[0].model_dump(), Exception("interrupted")]
+    mocker.patch("arrsync.lib.Api", side_effect=[source_api, dest_api])
+
+    with pytest.raises(Exception, match="interrupted"):
+        start_sync_job(job)
+
+    source_api, dest_api = create_apis()
+    # The second item was saved even though the run died before journaling it
+    dest_api.content.return_value = [content[1]]
+    dest_api.save.side_effect = lambda content_item: content_item.model_dump()
+    mocker.patch("arrsync.lib.Api", side_effect=[source_api, dest_api])
+
+    metrics = JobMetrics("sync")
+    start_sync_job(job, metrics=metrics)
+
+    source_api.content.assert_not_called()
+    dest_api.save.assert_called_once_with(content_item=content[2])
+    assert mock_calculate_content_diff.call_count == 1
+    assert "verify" in metrics.stages
+    assert Journal(str(tmp_path), "sync").pending(JobType.Radarr) is None
+
+    source_api, dest_api = create_apis()
+    dest_api.save.side_effect = lambda content_item: content_item.model_dump()
+    mocker.patch("arrsync.lib.Api", side_effect=[source_api, dest_api])
+
+    start_sync_job(job, dry_run=True)
+
+    source_api.content.assert_called_once_with()
+    dest_api.save.assert_not_called()
+    assert mock_calculate_content_diff.call_count == 2
+
+
+def test_sync_content_continue_on_error(
+    tmp_path: Path,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(4)]
+
+    def save(content_item: ContentItem) -> Any:
+        if content_item == content[1]:
+            raise ApiError("got 400", status_code=400, body="bad")
+
+        return content_item.model_dump()
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = save
+
+    quarantine = Quarantine(str(tmp_path / "quarantine.json"), "sync", 60)
+    quarantine.add(content[0], Exception("failed"))
+
+    metrics = JobMetrics("sync")
+
+    sync_content(
+        content=content,
+        dest_api=dest_api,
+        metrics=metrics,
+        quarantine=quarantine,
+        continue_on_error=True,
+    )
+
+    assert dest_api.save.call_count == 4
+    assert metrics.counters["saved"] == 3
+    assert metrics.counters["failed"] == 1
+    assert list(quarantine.entries) == [str(content[1]._id_attr)]
+    assert quarantine.entries[str(content[1]._id_attr)].status_code == 400
+
+    with pytest.raises(ApiError):
+        sync_content(content=content, dest_api=dest_api, quarantine=quarantine)
+
+
+def test_calculate_content_diff_quarantined(
+    tmp_path: Path,
+    create_sync_job: CreateSyncJob,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(2)]
+
+    quarantine = Quarantine(str(tmp_path / "quarantine.json"), "sync", 60)
+    quarantine.add(content[0], Exception("failed"))
+
+    metrics = JobMetrics("sync")
+
+    assert calculate_content_diff(
+        job=create_sync_job(JobType.Radarr),
+        source_content=content,
+        source_tags=Index(),
+        source_profiles=Index(),
+        dest_content=[],
+        metrics=metrics,
+        quarantine=quarantine,
+    ) == [content[1]]
+    assert metrics.filtered == {"quarantined": 1}
+
+
+def test_start_sync_job_quarantine(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    create_sync_job: CreateSyncJob,
+    create_content_item: CreateContentItem,
+) -> None:
+    item = create_content_item(JobType.Radarr)
+    path = str(tmp_path / "quarantine.json")
+
+    mocker.patch("arrsync.lib.calculate_content_diff")
+    mocker.patch("arrsync.lib.get_content_payloads", return_value=[item])
+
+    source_api, dest_api = MagicMock(spec=Api), MagicMock(spec=Api)
+
+    for api in [source_api, dest_api]:
+        api.__enter__.return_value = api
+        api.status.return_value = Status.model_validate({"version": "3"})
+
+    dest_api.save.return_value = None
+    mocker.patch("arrsync.lib.Api", side_effect=[source_api, dest_api])
+
+    job = create_sync_job(JobType.Radarr, quarantine_file=path)
+
+    with pytest.raises(Exception, match="Failed to create"):
+        start_sync_job(job)
+
+    assert Quarantine(path, "sync", 60).is_quarantined(item)
+
+
+def test_sync_content_circuit_open(
+    tmp_path: Path,
+    create_content_item: CreateContentItem,
+) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr)]
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = CircuitOpenError("host is down")
+
+    quarantine = Quarantine(str(tmp_path / "quarantine.json"), "sync", 60)
+
+    with pytest.raises(CircuitOpenError):
+        sync_content(
+            content=content,
+            dest_api=dest_api,
+            quarantine=quarantine,
+            continue_on_error=True,
+        )
+
+    assert quarantine.entries == {}
+
+
+def test_get_remaining(mocker: MockerFixture) -> None:
+    mocker.patch("arrsync.lib.time.monotonic", return_value=100.0)
+
+    assert get_remaining(None) is None
+    assert get_remaining(110.0) == 10.0
+    assert get_remaining(90.0) == 0.0
+
+
+def test_sync_content_deadline(create_content_item: CreateContentItem) -> None:
+    content: ContentItems = [create_content_item(JobType.Radarr) for _ in range(5)]
+
+    def save(content_item: ContentItem) -> Any:
+        time.sleep(0.2)
+        return content_item.model_dump()
+
+    dest_api = MagicMock(spec=Api)
+    dest_api.save.side_effect = save
+
+    metrics = JobMetrics("sync")
+
+    with pytest.raises(DeadlineExceededError, match="cancelled 4 saves"):
+        sync_content(
+            content=content,
+            dest_api=dest_api,
+            metrics=metrics,
+            deadline=time.monotonic() + 0.1,
+        )
+
+    # The save in flight at the deadline is allowed to finish
+    assert dest_api.save.call_count == 1
+    assert metrics.counters["saved"] == 1
+    assert metrics.counters["cancelled"] == 4
+
+
+def test_source_cache(create_sync_job: CreateSyncJob) -> None:
+    source_api = MagicMock(spec=Api)
+    source_api.tag.return_value = []
+    source_api.profile.return_value = []
+    source_api.content.side_effect = [Exception("failed"), []]
+
+    source_api.status.return_value = Status.model_validate({"version": "3"})
+    job = create_sync_job(JobType.Radarr)
+
+    source = SourceCache(job, source_api, JobMetrics("sync"))
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="failed"):
+            source.get()
+
+    assert source_api.content.call_count == 1
+
+    source = SourceCache(job, source_api, JobMetrics("sync"))
+
+    assert source.get() is source.get()
+    assert source_api.content.call_count == 2
+
+
+def test_fetch_sources_threads(
+    mocker: MockerFixture, create_sync_job: CreateSyncJob
+) -> None:
+    threads: List[str] = []
+
+    def get(source: SourceCache) -> SourceLibrary:
+        threads.append(threading.current_thread().name)
+        return SourceLibrary(content=[], tags=Index(), profiles=Index())
+
+    mocker.patch.object(SourceCache, "get", get)
+
+    def create_source() -> SourceCache:
+        return SourceCache(create_sync_job(JobType.Radarr), MagicMock(), JobMetrics(""))
+
+    # A lone source is fetched on the calling thread, where profilers see it
+    assert len(fetch_sources([create_source()])) == 1
+    assert threads == [threading.current_thread().name]
+
+    assert len(fetch_sources([create_source(), create_source()])) == 2
+    assert threading.current_thread().name not in threads[1:]
+
+
+def test_start_fan_out_job(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr)
+    dest_servers = [
+        create_stub_server(JobType.Radarr, size=0),
+        create_stub_server(JobType.Radarr, size=0),
+        create_stub_server(JobType.Radarr, size=0, api_key="other"),
+    ]
+
+    jobs = [
+        create_sync_job(
+            JobType.Radarr,
+            name=f"fan-out.{index}",
+            group="fan-out",
+            source_url=source_server.url,
+            source_key="stub",
+            dest_url=server.url,
+            dest_key="stub",
+            dest_profile="Any",
+            source_include_missing=True,
+            retries=0,
+        )
+        for index, server in enumerate(dest_servers)
+    ]
+
+    metrics = [JobMetrics(job.name) for job in jobs]
+    source_metrics = JobMetrics("fan-out")
+
+    errors = start_fan_out_job(jobs, False, metrics, source_metrics)
+
+    assert errors[:2] == [None, None]
+    assert isinstance(errors[2], ApiError)
+    assert [len(server.library.content) for server in dest_servers] == [10, 10, 0]
+    assert [job_metrics.counters.get("saved") for job_metrics in metrics] == [
+        10,
+        10,
+        None,
+    ]
+    assert source_metrics.routes["api/v3/movie"].count == 1
+    assert "api/v3/movie" not in metrics[2].routes
+
+
+def test_merge_content(create_content_item: CreateContentItem) -> None:
+    first = [create_content_item(JobType.Radarr, tmdb_id=id) for id in [1, 2]]
+    second = [create_content_item(JobType.Radarr, tmdb_id=id) for id in [2, 3]]
+
+    merged = merge_content([first, second, []])
+
+    assert merged == [first[0], first[1], second[1]]
+    assert merged[1] is first[1]
+    assert merge_content([]) == []
+
+
+def test_start_merge_job(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_servers = [
+        create_stub_server(JobType.Radarr, size=15),
+        create_stub_server(JobType.Radarr, size=10),
+    ]
+    dest_server = create_stub_server(JobType.Radarr, size=0)
+
+    source_servers[0].library.content[0]["title"] = "Preferred"
+
+    jobs = [
+        create_sync_job(
+            JobType.Radarr,
+            name=f"merge.{index}",
+            group="merge",
+            merge=True,
+            source_url=server.url,
+            source_key="stub",
+            dest_url=dest_server.url,
+            dest_key="stub",
+            dest_profile="Any",
+            source_include_missing=True,
+        )
+        for index, server in enumerate(source_servers)
+    ]
+
+    metrics = JobMetrics("merge")
+
+    start_merge_job(jobs, metrics=metrics)
+
+    assert len(dest_server.library.content) == 15
+    assert [
+        record["title"]
+        for record in dest_server.library.content
+        if record["tmdbId"] == 100001
+    ] == ["Preferred"]
+    assert metrics.counters["saved"] == 15
+    assert metrics.counters["diffed"] == 25
+    assert metrics.routes["api/v3/movie"].count == 3 + 15
+
+
+def test_get_reverse_job(create_sync_job: CreateSyncJob) -> None:
+    job = create_sync_job(
+        JobType.Radarr,
+        mode="bidirectional",
+        source_path="/source",
+        source_profile="HD-1080p",
+        dest_timeout=(1.0, 2.0),
+        profile_map="Any: Ultra-HD",
+        tag_map="kids: family",
+    )
+
+    reverse_job = get_reverse_job(job)
+
+    assert reverse_job.name == "sync.reverse"
+    assert (str(reverse_job.source_url), reverse_job.source_key) == (
+        "http://host2/",
+        "bbb",
+    )
+    assert (str(reverse_job.dest_url), reverse_job.dest_key) == ("http://host/", "aaa")
+    assert reverse_job.source_timeout == (1.0, 2.0)
+    assert reverse_job.dest_path == "/source"
+    assert reverse_job.dest_profile == "HD-1080p"
+    assert reverse_job.profile_map == {"Ultra-HD": "Any"}
+    assert reverse_job.tag_map == {"family": "kids"}
+    assert reverse_job.root_folder_map == []
+    assert (
+        get_reverse_job(job.model_copy(update={"source_profile": None})).dest_profile
+        == ""
+    )
+
+
+def test_start_sync_job_bidirectional(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=10)
+    dest_server = create_stub_server(JobType.Radarr, size=6)
+
+    # The source is missing 1 to 3, and the destination 7 to 10
+    del source_server.library.content[:3]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        mode="bidirectional",
+        source_url=source_server.url,
+        source_key="stub",
+        source_path="/source",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        source_include_missing=True,
+    )
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, metrics=metrics)
+
+    source_content = source_server.library.content
+    dest_content = dest_server.library.content
+
+    assert sorted(record["tmdbId"] for record in source_content) == sorted(
+        record["tmdbId"] for record in dest_content
+    )
+    assert len(source_content) == len(dest_content) == 10
+    assert {record["rootFolderPath"] for record in source_content[-3:]} == {"/source"}
+    assert {record["rootFolderPath"] for record in dest_content[-4:]} == {"/path"}
+    assert metrics.counters["saved"] == 7
+    assert metrics.routes["api/v3/movie"].count == 2 + 7
+
+
+def test_start_sync_job_update(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=10, seed=1)
+    dest_server = create_stub_server(JobType.Radarr, size=10, seed=1)
+
+    # Only the source's monitored state changed
+    source_server.library.content[0]["monitored"] = False
+    dest_server.library.content[0]["monitored"] = True
+    dest_server.library.content[0]["extra"] = "kept"
+    # Items tagged 2 are filtered out so they are never updated
+    source_server.library.content[1]["tags"] = [2]
+    source_server.library.content[1]["monitored"] = False
+    dest_server.library.content[1]["monitored"] = True
+    # Without a profile or tag mapping the source ids are not copied onto the
+    # destination
+    dest_server.library.content[3]["qualityProfileId"] = 2
+    source_server.library.content[2]["tags"] = [3]
+    dest_server.library.content[2]["tags"] = [4]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        dest_monitor=True,
+        dest_update=True,
+        source_include_missing=True,
+        source_tag_exclude="2",
+    )
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, metrics=metrics)
+
+    source_content = source_server.library.content
+    dest_content = dest_server.library.content
+
+    assert dest_content[0]["monitored"] is False
+    assert dest_content[0]["extra"] == "kept"
+    assert dest_content[1]["monitored"] is True
+    assert dest_content[2]["tags"] == [4]
+    assert dest_content[3]["qualityProfileId"] == 2
+    # Neither dest_monitor nor dest_profile is applied to the items on both sides
+    assert all(
+        dest["monitored"] == source["monitored"]
+        for source, dest in zip(source_content, dest_content)
+        if 2 not in source["tags"]
+    )
+    assert metrics.counters["updated"] == 1
+    assert "saved" not in metrics.counters
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, metrics=metrics)
+
+    assert "updated" not in metrics.counters
+
+    # Mapped profiles and tags are updated like the monitored state
+    start_sync_job(
+        job.model_copy(
+            update={
+                "profile_map": {"Any": "Any"},
+                "tag_map": {"tag-3": "tag-3"},
+            }
+        )
+    )
+
+    assert dest_content[2]["tags"] == [3]
+    assert dest_content[3]["qualityProfileId"] == 1
+    assert all(
+        dest["qualityProfileId"] == source["qualityProfileId"]
+        for source, dest in zip(source_content[2:], dest_content[2:])
+    )
+
+
+def test_update_content_dry_run(
+    mocker: MockerFixture, create_content_item: CreateContentItem
+) -> None:
+    dest_api = mocker.MagicMock()
+    metrics = JobMetrics("sync")
+    item = create_content_item(JobType.Radarr, id=1)
+
+    update_content(
+        updates=[(item, {"monitored": True})],
+        dest_api=dest_api,
+        dry_run=True,
+        metrics=metrics,
+        limiter=AdaptiveLimiter(max_limit=1),
+    )
+
+    assert metrics.counters["updated"] == 1
+    dest_api.update.assert_not_called()
+
+
+def test_update_content_fails(
+    mocker: MockerFixture, create_content_item: CreateContentItem
+) -> None:
+    dest_api = mocker.MagicMock()
+    dest_api.update.return_value = None
+    metrics = JobMetrics("sync")
+    item = create_content_item(JobType.Radarr, id=1)
+
+    with pytest.raises(Exception, match="Failed to update"):
+        update_content(
+            updates=[(item, {"monitored": True})],
+            dest_api=dest_api,
+            dry_run=False,
+            metrics=metrics,
+            limiter=AdaptiveLimiter(max_limit=1),
+        )
+
+
+def test_start_sync_job_delete(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=8)
+    dest_server = create_stub_server(JobType.Radarr, size=10)
+
+    # Filtered items are still on the source, so they are not deleted
+    source_server.library.content[0]["hasFile"] = False
+    dest_server.library.content[0]["hasFile"] = False
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        dest_delete=True,
+        dest_delete_max=2,
+    )
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, dry_run=True, metrics=metrics)
+
+    assert metrics.counters["deleted"] == 2
+    assert len(dest_server.library.content) == 10
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, metrics=metrics)
+
+    assert metrics.counters["deleted"] == 2
+    assert [record["tmdbId"] for record in dest_server.library.content] == [
+        record["tmdbId"] for record in source_server.library.content
+    ]
+
+    del source_server.library.content[:3]
+
+    with pytest.raises(DeleteLimitError, match="refusing to delete 3 items"):
+        start_sync_job(job)
+
+    assert len(dest_server.library.content) == 8
+
+
+def test_delete_content_continue_on_error(
+    mocker: MockerFixture, create_content_item: CreateContentItem
+) -> None:
+    dest_api = mocker.MagicMock()
+    dest_api.delete.side_effect = [True, ApiError("gone", status_code=404)]
+    metrics = JobMetrics("sync")
+
+    delete_content(
+        deletions=[create_content_item(JobType.Radarr, id=id) for id in [1, 2]],
+        dest_api=dest_api,
+        dry_run=False,
+        metrics=metrics,
+        limiter=AdaptiveLimiter(max_limit=1),
+        continue_on_error=True,
+    )
+
+    assert metrics.counters["deleted"] == 1
+    assert metrics.counters["failed"] == 1
+
+
+def test_start_sync_job_album_monitor(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    create_sync_job: CreateSyncJob,
+    create_stub_server: CreateStubServer,
+) -> None:
+    mocker.patch("arrsync.lib.ALBUM_BATCH_SIZE", 2)
+
+    source_server = create_stub_server(JobType.Lidarr, size=6, seed=1)
+    dest_server = create_stub_server(JobType.Lidarr, size=5, seed=2)
+
+    def monitored(albums: List[Any]) -> Dict[str, bool]:
+        return {album["foreignAlbumId"]: album["monitored"] for album in albums}
+
+    source_albums = monitored(source_server.library.albums)
+
+    job = create_sync_job(
+        JobType.Lidarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        dest_album_monitor=True,
+    )
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, dry_run=True, metrics=metrics)
+
+    changed = sum(
+        monitored != source_albums[id]
+        for id, monitored in monitored(dest_server.library.albums).items()
+    )
+
+    assert changed > 0
+    assert (
+        metrics.counters.get("albums_monitored", 0)
+        + metrics.counters.get("albums_unmonitored", 0)
+        == changed
+    )
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(job, metrics=metrics)
+
+    assert all(
+        monitored == source_albums[id]
+        for id, monitored in monitored(dest_server.library.albums).items()
+    )
+    assert metrics.routes["api/v1/album/monitor"].count == sum(
+        -(-metrics.counters.get(name, 0) // 2)
+        for name in ["albums_monitored", "albums_unmonitored"]
+    )
+    # The new artist is added without monitoring its albums
+    assert dest_server.library.content[-1]["addOptions"]["monitor"] == "none"
+    assert metrics.counters["saved"] == 1
+
+    metrics = JobMetrics("sync")
+
+    start_sync_job(
+        job.model_copy(update={"journal_dir": str(tmp_path)}), metrics=metrics
+    )
+
+    assert "api/v1/album/monitor" not in metrics.routes
+    # Nothing to change, so no journal is written
+    assert not os.listdir(tmp_path)
+
+
+def test_content_mapping_map_tags() -> None:
+    assert ContentMapping().map_tags([1, 2]) == [1, 2]
+    assert ContentMapping(tags={1: 5, 2: 5, 3: 6}).map_tags([3, 1, 2, 4]) == [6, 5]
+
+
+def test_resolve_profile_map(create_sync_job: CreateSyncJob) -> None:
+    source_profiles = Index([Profile(name="Any", id=1), Profile(name="HD-1080p", id=2)])
+    dest_profiles = Index([Profile(name="Any", id=3), Profile(name="Ultra-HD", id=4)])
+
+    job = create_sync_job(JobType.Radarr, profile_map="hd-1080p: Ultra-HD, 1: 3")
+
+    assert resolve_profile_map(job, source_profiles, dest_profiles) == {2: 4, 1: 3}
+
+    job = create_sync_job(JobType.Radarr, profile_map={"Any": "Missing"})
+
+    with pytest.raises(Exception, match="unable to map profile 'Any' to 'Missing'"):
+        resolve_profile_map(job, source_profiles, dest_profiles)
+
+
+def test_resolve_tag_map(mocker: MockerFixture, create_sync_job: CreateSyncJob) -> None:
+    source_tags = Index(
+        [
+            Tag(label="kids", id=1),
+            Tag(label="anime", id=2),
+            Tag(label="other", id=3),
+        ]
+    )
+    dest_tags = Index([Tag(label="family", id=7), Tag(label="Anime", id=8)])
+    dest_api = mocker.MagicMock()
+    dest_api.create_tag.side_effect = [
+        Tag(label="kids", id=9),
+        Tag(label="other", id=10),
+    ]
+
+    tag_ids = {1, 2, 3}
+    job = create_sync_job(JobType.Radarr)
+
+    assert (
+        resolve_tag_map(job, source_tags, dest_tags, dest_api, False, tag_ids) is None
+    )
+
+    job = create_sync_job(JobType.Radarr, tag_map="kids: family")
+
+    assert resolve_tag_map(job, source_tags, dest_tags, dest_api, False, tag_ids) == {
+        1: 7,
+        2: 8,
+    }
+
+    job = create_sync_job(JobType.Radarr, dest_tag_create=True)
+
+    # A dry run maps the tags it would create to placeholders
+    assert resolve_tag_map(
+        job, source_tags, Index(dest_tags), dest_api, True, tag_ids
+    ) == {
+        1: -1,
+        2: 8,
+        3: -2,
+    }
+    dest_api.create_tag.assert_not_called()
+
+    assert resolve_tag_map(job, source_tags, dest_tags, dest_api, False, tag_ids) == {
+        1: 9,
+        2: 8,
+        3: 10,
+    }
+    assert dest_api.create_tag.call_count == 2
+    assert dest_tags[-2:] == [Tag(label="kids", id=9), Tag(label="other", id=10)]
+
+    # Only the tags on synced items are resolved, or created
+    assert resolve_tag_map(job, source_tags, dest_tags, dest_api, False, {2}) == {2: 8}
+    assert dest_api.create_tag.call_count == 2
+
+    job = create_sync_job(JobType.Radarr, tag_map="unknown: family")
+
+    with pytest.raises(Exception, match="unknown tag 'unknown'"):
+        resolve_tag_map(job, source_tags, dest_tags, dest_api, False, tag_ids)
+
+
+def test_start_sync_job_mapping(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=10)
+    dest_server = create_stub_server(JobType.Radarr, size=5)
+
+    source_server.library.tags[0]["label"] = "kids"
+    dest_server.library.tags = [{"id": 7, "label": "family"}]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        source_include_missing=True,
+        profile_map="HD-1080p: HD-1080p",
+        tag_map="kids: family",
+        dest_tag_create=True,
+        dest_update=True,
+    )
+
+    start_sync_job(job)
+
+    source_tags = {tag["id"]: tag["label"] for tag in source_server.library.tags}
+    dest_tags = {tag["id"]: tag["label"] for tag in dest_server.library.tags}
+
+    assert sorted(dest_tags.values()) == ["family", "tag-2", "tag-3", "tag-4"]
+
+    dest_content = sorted(dest_server.library.content, key=lambda item: item["tmdbId"])
+
+    for source, dest in zip(source_server.library.content, dest_content):
+        assert dest["qualityProfileId"] == source["qualityProfileId"]
+        assert [dest_tags[tag] for tag in dest["tags"]] == [
+            "family" if source_tags[tag] == "kids" else source_tags[tag]
+            for tag in source["tags"]
+        ]
+
+
+def test_start_sync_job_create_tags_synced(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=4)
+    dest_server = create_stub_server(JobType.Radarr, size=0)
+
+    source_server.library.tags.append({"id": 9, "label": "no-sync"})
+    source_server.library.content[0]["tags"] = [9]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        source_include_missing=True,
+        source_tag_exclude="no-sync",
+        dest_tag_create=True,
+    )
+
+    dest_server.library.tags = [{"id": 7, "label": "family"}]
+
+    start_sync_job(job)
+
+    # Only the tag of the one tagged item synced is created
+    labels = [tag["label"] for tag in dest_server.library.tags]
+
+    assert labels == ["family", "tag-4"]
+
+    start_sync_job(job)
+
+    assert [tag["label"] for tag in dest_server.library.tags] == labels
+
+
+def test_apply_job_plan_create_tags(
+    tmp_path: Path,
+    create_sync_job: CreateSyncJob,
+    create_stub_server: CreateStubServer,
+    create_content_item: CreateContentItem,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=2)
+    dest_server = create_stub_server(JobType.Radarr, size=0)
+
+    source_server.library.tags.append({"id": 9, "label": "kids"})
+    source_server.library.content[0]["tags"] = [9]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        source_include_missing=True,
+        dest_tag_create=True,
+        journal_dir=str(tmp_path),
+    )
+
+    plan = Plan()
+
+    start_sync_job(job, dry_run=True, plan=plan)
+
+    planned = plan.jobs["sync"]
+
+    assert planned.create_tags == [Tag(id=-1, label="kids")]
+    assert "kids" not in [tag["label"] for tag in dest_server.library.tags]
+
+    # The plan is applied rather than the journal left by an interrupted run
+    Journal(str(tmp_path), job.name).plan([create_content_item(JobType.Radarr)])
+
+    with caplog.at_level(logging.WARNING):
+        apply_job_plan(job, planned)
+
+    assert "applying the plan instead of resuming" in caplog.text
+
+    kids = next(tag for tag in dest_server.library.tags if tag["label"] == "kids")
+    tags = {record["tmdbId"]: record["tags"] for record in dest_server.library.content}
+
+    assert tags == {100001: [kids["id"]], 100002: []}
+    assert Journal(str(tmp_path), job.name).pending(JobType.Radarr) is None
+
+
+def test_start_sync_job_root_folders(
+    create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Sonarr, size=6)
+    dest_server = create_stub_server(JobType.Sonarr, size=0)
+
+    for record, path in zip(
+        source_server.library.content, ["/tv/anime/", "/tv/kids/", "/tv/"] * 2
+    ):
+        record["rootFolderPath"] = path
+
+    dest_server.library.root_folders = [
+        {"id": 1, "path": "/data/tv/"},
+        {"id": 2, "path": "/data/anime"},
+    ]
+
+    job = create_sync_job(
+        JobType.Sonarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_path="/data/tv",
+        dest_profile="Any",
+        root_folder_map=[("/tv/anime", "/data/anime/")],
+    )
+
+    start_sync_job(job)
+
+    assert sorted(
+        (record["tvdbId"], record["rootFolderPath"])
+        for record in dest_server.library.content
+    ) == [
+        (100000 + index, path)
+        for index, path in enumerate(["/data/anime/", "/data/tv", "/data/tv"] * 2, 1)
+    ]
+
+    job = job.model_copy(update={"root_folder_map": [("/tv/kids", "/data/kids")]})
+
+    with pytest.raises(Exception, match="/data/kids is not a root folder"):
+        start_sync_job(job)
+
+
+def test_start_sync_job_plan(
+    tmp_path: Path, create_sync_job: CreateSyncJob, create_stub_server: CreateStubServer
+) -> None:
+    source_server = create_stub_server(JobType.Radarr, size=10, seed=1)
+    dest_server = create_stub_server(JobType.Radarr, size=6, seed=1)
+
+    source_content = source_server.library.content
+    dest_content = dest_server.library.content
+
+    # Items to update, one to delete, three to add and one filtered out
+    source_content[0]["monitored"] = True
+    dest_content[0]["monitored"] = False
+    del source_content[1]
+    source_content[-1]["tags"] = [1]
+
+    job = create_sync_job(
+        JobType.Radarr,
+        source_url=source_server.url,
+        source_key="stub",
+        dest_url=dest_server.url,
+        dest_key="stub",
+        dest_profile="Any",
+        dest_monitor=True,
+        dest_update=True,
+        dest_delete=True,
+        source_include_missing=True,
+        source_tag_exclude="1",
+    )
+
+    plan = Plan()
+
+    start_sync_job(job, dry_run=True, metrics=JobMetrics("sync"), plan=plan)
+
+    assert len(dest_content) == 6
+    assert dest_content[0]["monitored"] is False
+
+    job_plan = plan.jobs["sync"]
+
+    assert sorted(item["tmdbId"] for item in job_plan.add) == [100007, 100008, 100009]
+    assert [update.id for update in job_plan.update] == [1]
+    assert [item.id for item in job_plan.delete] == [2]
+    assert job_plan.skipped == [
+        SkippedItem(id="100010", title="Movie 10", reason="source_tag_exclude")
+    ]
+
+    plan.write(str(tmp_path / "plan.json"))
+    planned = Plan.read(str(tmp_path / "plan.json")).jobs["sync"]
+    source_requests = source_server.request_count
+    metrics = JobMetrics("sync")
+
+    apply_job_plan(job, planned, metrics=metrics)
+
+    assert source_server.request_count == source_requests
+    assert dest_content[0]["monitored"] is True
+    assert sorted(record["tmdbId"] for record in dest_content) == sorted(
+        record["tmdbId"] for record in source_content[:-1]
+    )
+    assert (metrics.counters["saved"], metrics.counters["updated"]) == (3, 1)
+    assert metrics.counters["deleted"] == 1
+
+    with pytest.raises(Exception, match="the plan is for a radarr destination at"):
+        apply_job_plan(job.model_copy(update={"dest_url": source_server.url}), planned)
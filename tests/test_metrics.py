@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+import json
+from pathlib import Path
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from arrsync.metrics import (
+    Histogram,
+    JobMetrics,
+    MetricsRegistry,
+    percentile,
+    serve_metrics,
+    to_prometheus,
+    write_metrics,
+)
+
+
+@pytest.mark.parametrize(
+    "values,pct,expected",
+    [
+        ([], 50, 0.0),
+        ([1.0], 99, 1.0),
+        ([3.0, 1.0, 2.0], 50, 2.0),
+        ([1.0, 2.0, 3.0, 4.0], 90, 4.0),
+        ([1.0, 2.0, 3.0, 4.0], 0, 1.0),
+    ],
+)
+def test_percentile(values: list[float], pct: float, expected: float) -> None:
+    assert percentile(values, pct) == expected
+
+
+def test_job_metrics_summary(mocker: MockerFixture) -> None:
+    mock_monotonic = mocker.patch("arrsync.metrics.time.monotonic")
+    mock_monotonic.side_effect = [0.0, 1.0, 3.0, 4.0]
+
+    metrics = JobMetrics("sync")
+
+    metrics.record_request("api/v3/movie", 200, 100, 0.5)
+    metrics.record_request("api/v3/movie", 503, 10, 1.5)
+    metrics.record_request("api/v3/tag", 200, 5, 0.1)
+
+    with metrics.stage("sync"):
+        metrics.increment("saved", 4)
+
+    metrics.increment("diffed", 6)
+    metrics.filter("source_tag_exclude")
+    metrics.filter("source_tag_exclude")
+    metrics.finish()
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 3
+    assert summary["bytes"] == 115
+    assert summary["duration"] == 4.0
+    assert summary["stages"] == {"sync": 2.0}
+    assert summary["saves_per_second"] == 2.0
+    assert summary["filtered"] == {"source_tag_exclude": 2}
+    assert summary["routes"]["api/v3/movie"]["statuses"] == {"200": 1, "503": 1}
+    assert summary["routes"]["api/v3/movie"]["latency"]["p99"] == 1.5
+
+    assert metrics.log_line() == (
+        "3 requests (115 bytes), 6 diffed, 2 filtered, 4 saved (2.0/s) in 4.00s"
+    )
+
+
+def test_job_metrics_no_sync() -> None:
+    metrics = JobMetrics("sync")
+
+    assert metrics.saves_per_second == 0.0
+    assert metrics.summary()["requests"] == 0
+
+
+def test_to_prometheus() -> None:
+    metrics = JobMetrics('my "job"')
+    metrics.record_request("api/v3/series", 200, 100, 0.25)
+    metrics.increment("saved")
+    metrics.filter("source_profile_include")
+
+    with metrics.stage("fetch"):
+        pass
+
+    output = to_prometheus([metrics])
+
+    assert 'arrsync_job_items{job="my \\"job\\"",counter="saved"} 1' in output
+    assert (
+        'arrsync_job_filtered_items{job="my \\"job\\"",reason="source_profile_include"} 1'
+        in output
+    )
+    assert 'arrsync_job_requests{job="my \\"job\\"",route="api/v3/series"} 1' in output
+    assert (
+        'arrsync_job_request_latency_seconds{job="my \\"job\\"",route="api/v3/series",quantile="0.5"} 0.25'
+        in output
+    )
+    assert 'arrsync_job_stage_seconds{job="my \\"job\\"",stage="fetch"}' in output
+    assert output.endswith("\n")
+
+
+def test_write_metrics(tmp_path: Path) -> None:
+    metrics = JobMetrics("sync")
+
+    json_path = tmp_path / "metrics.json"
+    write_metrics(str(json_path), [metrics], "json")
+    assert json.loads(json_path.read_text())[0]["name"] == "sync"
+
+    prom_path = tmp_path / "metrics.prom"
+    write_metrics(str(prom_path), [metrics], "prometheus")
+    assert 'arrsync_job_duration_seconds{job="sync"}' in prom_path.read_text()
+
+
+def test_histogram() -> None:
+    histogram = Histogram((0.1, 1.0))
+
+    histogram.observe((("job", "sync"),), 0.05)
+    histogram.observe((("job", "sync"),), 0.5)
+    histogram.observe((("job", "sync"),), 5.0)
+
+    assert histogram.render("latency") == [
+        "# TYPE latency histogram",
+        'latency_bucket{job="sync",le="0.1"} 1',
+        'latency_bucket{job="sync",le="1.0"} 2',
+        'latency_bucket{job="sync",le="+Inf"} 3',
+        'latency_sum{job="sync"} 5.55',
+        'latency_count{job="sync"} 3',
+    ]
+
+
+def test_metrics_registry() -> None:
+    registry = MetricsRegistry()
+
+    metrics = JobMetrics("sync")
+    metrics.record_request("api/v3/movie", 200, 10, 0.2, host="host:7878")
+    metrics.record_request("api/v3/movie", 503, 10, 0.3, host="host2:7878")
+    metrics.record_request("api/v3/movie", 503, 10, 0.3, host="host2:7878")
+    metrics.increment("diffed", 3)
+    metrics.increment("saved", 2)
+    metrics.increment("failed")
+    metrics.finish()
+
+    registry.observe(metrics, True)
+    registry.observe(JobMetrics("sync"), False)
+
+    output = registry.render()
+
+    assert 'arrsync_job_runs_total{job="sync",result="success"} 1' in output
+    assert 'arrsync_job_runs_total{job="sync",result="error"} 1' in output
+    assert 'arrsync_job_items_diffed_total{job="sync"} 3' in output
+    assert 'arrsync_job_items_synced_total{job="sync"} 2' in output
+    assert 'arrsync_job_items_failed_total{job="sync"} 1' in output
+    assert 'arrsync_job_last_items_synced{job="sync"} 0' in output
+    assert 'arrsync_job_last_success_timestamp_seconds{job="sync"}' in output
+    assert (
+        'arrsync_http_errors_total{job="sync",host="host2:7878",status="503"} 2'
+        in output
+    )
+    assert 'host="host:7878",status' not in output
+    assert (
+        'arrsync_request_duration_seconds_count{job="sync",host="host2:7878"} 2'
+        in output
+    )
+    assert 'arrsync_job_duration_seconds_count{job="sync"} 2' in output
+
+
+def test_serve_metrics() -> None:
+    registry = MetricsRegistry()
+    metrics = JobMetrics("sync")
+    metrics.finish()
+    registry.observe(metrics, True)
+
+    server = serve_metrics(registry, "127.0.0.1", 0)
+
+    try:
+        host, port = server.server_address[:2]
+        response = requests.get(f"http://{str(host)}:{port}/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'arrsync_job_runs_total{job="sync",result="success"} 1' in response.text
+
+        response = requests.get(f"http://{str(host)}:{port}/other")
+
+        assert response.status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+from pathlib import Path
+
+from tests.conftest import CreateContentItem
+
+from arrsync.common import JobType, Tag
+from arrsync.plan import JobPlan, Plan, PlannedItem
+
+
+def test_job_plan(create_content_item: CreateContentItem) -> None:
+    item = create_content_item(JobType.Lidarr, id=3)
+
+    job_plan = JobPlan.create(
+        JobType.Lidarr,
+        "http://dest/",
+        content=[item],
+        updates=[(item, {"monitored": True})],
+        deletions=[item, create_content_item(JobType.Lidarr)],
+        album_changes={True: [1, 2]},
+        skipped=[(item, "source_tag_include")],
+    )
+
+    assert job_plan.add == [item.model_dump(by_alias=True)]
+    assert job_plan.delete == [PlannedItem(id=3, item=job_plan.add[0])]
+    assert job_plan.skipped[0].reason == "source_tag_include"
+
+    assert job_plan.get_content() == [item]
+    assert job_plan.get_content()[0].id is None
+    assert job_plan.get_updates() == [(item, {"monitored": True})]
+    assert job_plan.get_updates()[0][0].id == 3
+    assert job_plan.get_deletions()[0].id == 3
+    assert job_plan.get_album_changes() == {True: [1, 2]}
+
+
+def test_job_plan_map_tags(create_content_item: CreateContentItem) -> None:
+    item = create_content_item(JobType.Radarr, id=3, tags=[1, -1, -2])
+
+    job_plan = JobPlan.create(
+        JobType.Radarr,
+        "http://dest/",
+        content=[item],
+        updates=[(item, {"tags": [-1]}), (item, {"monitored": True})],
+        deletions=[],
+        album_changes={},
+        skipped=[],
+        create_tags=[Tag(id=-1, label="kids"), Tag(id=-2, label="anime")],
+    )
+
+    # The tag that was not created is dropped
+    mapped = job_plan.map_tags({-1: 7})
+
+    assert mapped.add[0]["tags"] == [1, 7]
+    assert [update.changes for update in mapped.update] == [
+        {"tags": [7]},
+        {"monitored": True},
+    ]
+    assert mapped.create_tags == []
+    assert job_plan.add[0]["tags"] == [1, -1, -2]
+
+
+def test_plan_read_write(tmp_path: Path) -> None:
+    path = str(tmp_path / "plan.json")
+    plan = Plan(jobs={"sync": JobPlan(type=JobType.Radarr, dest_url="http://dest/")})
+
+    plan.write(path)
+
+    # Empty changes are left out
+    assert Path(path).read_text() == (
+        '{"jobs":{"sync":{"type":"radarr","dest_url":"http://dest/"}}}'
+    )
+    assert Plan.read(path) == plan
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import logging
+import pstats
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+from pytest_mock import MockerFixture
+
+from arrsync.profiling import ThreadProfilers, get_profile_path, profile_job
+
+
+def test_get_profile_path() -> None:
+    assert get_profile_path("sonarr-remote", "out") == "out/sonarr-remote.prof"
+    assert get_profile_path("a/b c", "out") == "out/a_b_c.prof"
+
+
+def test_profile_job(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    directory = tmp_path / "profiles"
+
+    with caplog.at_level(logging.INFO):
+        with profile_job("sync", str(directory)):
+            sorted(range(1000))
+
+    path = directory / "sync.prof"
+
+    assert path.exists()
+    assert pstats.Stats(str(path)).get_stats_profile().func_profiles
+    assert "profile written to" in caplog.text
+    assert "cumulative" in caplog.text
+
+
+def sort_range(size: int) -> List[int]:
+    return sorted(range(size))
+
+
+def test_profile_job_threads(tmp_path: Path) -> None:
+    with profile_job("sync", str(tmp_path)):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(sort_range, [10, 100, 1000]))
+
+    profiles = pstats.Stats(str(tmp_path / "sync.prof")).get_stats_profile()
+
+    assert profiles.func_profiles["sort_range"].ncalls == "3"
+
+
+def test_profile_job_threads_shared(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch("arrsync.profiling.PROFILE_THREADS", False)
+    mock_setprofile = mocker.patch("arrsync.profiling.threading.setprofile")
+
+    with profile_job("sync", str(tmp_path)):
+        sort_range(10)
+
+    mock_setprofile.assert_not_called()
+    assert (tmp_path / "sync.prof").exists()
+
+
+def test_thread_profilers() -> None:
+    thread_profilers = ThreadProfilers()
+
+    # Called as the first profile event of each new thread
+    thread_profilers(sys._getframe(), "call", None)
+    sort_range(10)
+    thread_profilers.profilers[0].disable()
+
+    profiles = pstats.Stats(thread_profilers.profilers[0]).get_stats_profile()
+
+    assert "sort_range" in profiles.func_profiles
+
+
+def test_profile_job_raises(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        with profile_job("sync", str(tmp_path)):
+            raise ValueError()
+
+    assert (tmp_path / "sync.prof").exists()
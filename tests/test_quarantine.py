@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import json
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+from tests.conftest import CreateContentItem
+
+from arrsync.api import ApiError
+from arrsync.common import JobType
+from arrsync.quarantine import MAX_BODY_LENGTH, Quarantine
+
+
+def test_quarantine_no_file(tmp_path: Path) -> None:
+    quarantine = Quarantine(str(tmp_path / "quarantine.json"), "sync", 60)
+
+    assert quarantine.entries == {}
+
+    quarantine.save()
+
+    assert not (tmp_path / "quarantine.json").exists()
+
+
+def test_quarantine_add(
+    tmp_path: Path, mocker: MockerFixture, create_content_item: CreateContentItem
+) -> None:
+    mock_time = mocker.patch("arrsync.quarantine.time.time", return_value=1000.0)
+
+    item = create_content_item(JobType.Radarr)
+    quarantine = Quarantine(str(tmp_path / "quarantine.json"), "sync", 60)
+
+    assert not quarantine.is_quarantined(item)
+
+    quarantine.add(item, ApiError("got 400", status_code=400, body="x" * 2000))
+    quarantine.add(item, Exception("Failed to create Item 1"))
+
+    entry = quarantine.entries[str(item._id_attr)]
+
+    assert entry.title == "Item 1"
+    assert entry.error == "Failed to create Item 1"
+    assert entry.status_code is None
+    assert entry.failures == 2
+    assert quarantine.is_quarantined(item)
+
+    mock_time.return_value = 1060.0
+
+    assert not quarantine.is_quarantined(item)
+
+
+def test_quarantine_save(
+    tmp_path: Path, create_content_item: CreateContentItem
+) -> None:
+    path = str(tmp_path / "state" / "quarantine.json")
+    item, other_item = create_content_item(JobType.Radarr), create_content_item(
+        JobType.Radarr
+    )
+
+    quarantine = Quarantine(path, "sync", 60)
+    other_quarantine = Quarantine(path, "other", 60)
+
+    quarantine.add(item, ApiError("got 400", status_code=400, body="x" * 2000))
+    quarantine.add(other_item, Exception("failed"))
+    quarantine.save()
+
+    other_quarantine.add(other_item, Exception("failed"))
+    other_quarantine.save()
+
+    with open(path) as file:
+        data = json.load(file)
+
+    assert set(data) == {"sync", "other"}
+    assert data["sync"]["1"]["status_code"] == 400
+    assert len(data["sync"]["1"]["body"]) == MAX_BODY_LENGTH
+
+    reloaded = Quarantine(path, "sync", 60)
+
+    assert reloaded.is_quarantined(item)
+
+    reloaded.remove(item)
+    reloaded.remove(item)
+    reloaded.save()
+
+    assert Quarantine(path, "sync", 60).entries.keys() == {"2"}
+    assert Quarantine(path, "other", 60).entries.keys() == {"2"}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.models import Response
+
+from arrsync.retry import (
+    RetryPolicy,
+    get_backoff,
+    get_retry_after,
+    is_retryable_error,
+    is_retryable_status,
+)
+
+
+def create_response(headers: Dict[str, str]) -> Response:
+    response = Response()
+    response.headers.update(headers)
+    return response
+
+
+@pytest.mark.parametrize(
+    "method,error,expected",
+    [
+        ("GET", ConnectionError(), True),
+        ("GET", ReadTimeout(), True),
+        ("GET", ValueError(), False),
+        ("PUT", ReadTimeout(), True),
+        ("POST", ConnectionError(), True),
+        ("POST", ConnectTimeout(), True),
+        ("POST", ReadTimeout(), False),
+    ],
+)
+def test_is_retryable_error(method: str, error: Exception, expected: bool) -> None:
+    assert is_retryable_error(method, error) is expected
+
+
+@pytest.mark.parametrize(
+    "method,status,expected",
+    [
+        ("GET", 429, True),
+        ("GET", 500, True),
+        ("GET", 503, True),
+        ("GET", 404, False),
+        ("PUT", 500, True),
+        ("POST", 429, True),
+        ("POST", 504, True),
+        ("POST", 500, False),
+        ("POST", 400, False),
+    ],
+)
+def test_is_retryable_status(method: str, status: int, expected: bool) -> None:
+    assert is_retryable_status(method, status) is expected
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    [
+        ({}, None),
+        ({"Retry-After": "5"}, 5.0),
+        ({"Retry-After": "-5"}, 0.0),
+        ({"Retry-After": "soon"}, None),
+        ({"Retry-After": "Wed, 21 Oct 2015 07:28:00"}, 0.0),
+    ],
+)
+def test_get_retry_after(headers: Dict[str, str], expected: Optional[float]) -> None:
+    assert get_retry_after(create_response(headers)) == expected
+
+
+def test_get_retry_after_date() -> None:
+    date = datetime.now(timezone.utc) + timedelta(seconds=60)
+    response = create_response({"Retry-After": format_datetime(date, usegmt=True)})
+
+    retry_after = get_retry_after(response)
+
+    assert retry_after is not None
+    assert 50 < retry_after <= 60
+
+
+def test_get_backoff(mocker: MockerFixture) -> None:
+    mock_uniform = mocker.patch("arrsync.retry.random.uniform")
+    mock_uniform.side_effect = lambda low, high: high
+
+    policy = RetryPolicy(retries=5, backoff=0.5, backoff_max=3.0)
+
+    assert get_backoff(policy, 0) == 0.5
+    assert get_backoff(policy, 2) == 2.0
+    assert get_backoff(policy, 4) == 3.0
+    assert get_backoff(policy, 0, retry_after=2.5) == 2.5
+    assert get_backoff(policy, 0, retry_after=60) == 3.0
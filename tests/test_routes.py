@@ -57,6 +57,22 @@ def test_content(
         assert routes.content(job_type, url) == f"{url}{expected}"
 
 
+@pytest.mark.parametrize(
+    "job_type,url,expected,excpetion",
+    [
+        (JobType.Sonarr, "http://host/", "api/v3/series/5", does_not_raise()),
+        (JobType.Radarr, "http://host/", "api/v3/movie/5", does_not_raise()),
+        (JobType.Lidarr, "http://host/", "api/v1/artist/5", does_not_raise()),
+        (None, None, None, pytest.raises(Exception)),
+    ],
+)
+def test_content_item(
+    job_type: JobType, url: str, expected: Union[str, None], excpetion: Any
+) -> None:
+    with excpetion:
+        assert routes.content_item(job_type, url, 5) == f"{url}{expected}"
+
+
 @pytest.mark.parametrize(
     "job_type,url,expected,excpetion",
     [
@@ -73,6 +89,22 @@ def test_profile(
         assert routes.profile(job_type, url) == f"{url}{expected}"
 
 
+@pytest.mark.parametrize(
+    "job_type,url,expected,excpetion",
+    [
+        (JobType.Sonarr, "http://host/", "api/v3/rootfolder", does_not_raise()),
+        (JobType.Radarr, "http://host/", "api/v3/rootfolder", does_not_raise()),
+        (JobType.Lidarr, "http://host/", "api/v1/rootfolder", does_not_raise()),
+        (None, None, None, pytest.raises(Exception)),
+    ],
+)
+def test_root_folder(
+    job_type: JobType, url: str, expected: Union[str, None], excpetion: Any
+) -> None:
+    with excpetion:
+        assert routes.root_folder(job_type, url) == f"{url}{expected}"
+
+
 @pytest.mark.parametrize(
     "job_type,url,expected,excpetion",
     [
@@ -119,3 +151,35 @@ def test_metadata(
 ) -> None:
     with excpetion:
         assert routes.metadata(job_type, url) == f"{url}{expected}"
+
+
+@pytest.mark.parametrize(
+    "job_type,url,expected,excpetion",
+    [
+        (JobType.Sonarr, None, None, pytest.raises(Exception)),
+        (JobType.Radarr, None, None, pytest.raises(Exception)),
+        (JobType.Lidarr, "http://host/", "api/v1/album", does_not_raise()),
+        (None, None, None, pytest.raises(Exception)),
+    ],
+)
+def test_album(
+    job_type: JobType, url: str, expected: Union[str, None], excpetion: Any
+) -> None:
+    with excpetion:
+        assert routes.album(job_type, url) == f"{url}{expected}"
+
+
+@pytest.mark.parametrize(
+    "job_type,url,expected,excpetion",
+    [
+        (JobType.Sonarr, None, None, pytest.raises(Exception)),
+        (JobType.Radarr, None, None, pytest.raises(Exception)),
+        (JobType.Lidarr, "http://host/", "api/v1/album/monitor", does_not_raise()),
+        (None, None, None, pytest.raises(Exception)),
+    ],
+)
+def test_album_monitor(
+    job_type: JobType, url: str, expected: Union[str, None], excpetion: Any
+) -> None:
+    with excpetion:
+        assert routes.album_monitor(job_type, url) == f"{url}{expected}"
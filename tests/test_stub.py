@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+import random
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+from tests.conftest import CreateStubServer
+
+from arrsync import routes
+from arrsync.api import Api
+from arrsync.common import JobType, LidarrContent, SonarrContent
+from arrsync.stub import (
+    StubOptions,
+    StubRateLimiter,
+    create_content_record,
+    get_id_alias,
+    get_root_folder_path,
+    main,
+)
+
+
+@pytest.mark.parametrize("job_type", [JobType.Sonarr, JobType.Radarr, JobType.Lidarr])
+def test_stub_serves_routes(
+    job_type: JobType, create_stub_server: CreateStubServer
+) -> None:
+    server = create_stub_server(job_type, api_key="key")
+
+    with Api(job_type=job_type, url=server.url, api_key="") as api:
+        assert api.session.headers.get("X-Api-Key") == "key"
+        assert api.status().version
+        assert len(api.tag()) == 4
+        assert len(api.profile()) == 2
+        assert len(api.root_folder()) == 1
+
+        content = api.content()
+
+        assert len(content) == 10
+
+        if job_type is JobType.Sonarr:
+            assert len(api.language()) == 1
+            assert isinstance(content[0], SonarrContent)
+
+        if job_type is JobType.Lidarr:
+            assert len(api.metadata()) == 1
+            assert isinstance(content[0], LidarrContent)
+
+
+@pytest.mark.parametrize("job_type", [JobType.Sonarr, JobType.Radarr, JobType.Lidarr])
+def test_stub_saves_content(
+    job_type: JobType, create_stub_server: CreateStubServer
+) -> None:
+    source = create_stub_server(job_type, size=2, seed=1)
+    dest = create_stub_server(job_type, size=0)
+
+    with Api(job_type=job_type, url=source.url, api_key="stub") as source_api, Api(
+        job_type=job_type, url=dest.url, api_key="stub"
+    ) as dest_api:
+        item = source_api.content()[0]
+
+        assert dest_api.save(item)
+        assert dest_api.content() == [item]
+
+        with pytest.raises(Exception):
+            dest_api.save(item)
+
+        with pytest.raises(Exception):
+            dest_api.post(routes.content(job_type, dest_api.url), {})
+
+
+def test_stub_updates_content(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Radarr, size=2)
+    server.library.content[0]["extra"] = "kept"
+
+    with Api(job_type=JobType.Radarr, url=server.url, api_key="stub") as api:
+        item = api.content()[0]
+
+        assert api.update(item, {"monitored": True, "tags": [3]})
+        assert server.library.content[0]["extra"] == "kept"
+        assert (api.content()[0].monitored, api.content()[0].tags) == (True, [3])
+
+        with pytest.raises(Exception, match="404"):
+            api.update(item.model_copy(update={"id": 99}), {})
+
+        with pytest.raises(Exception, match="404"):
+            api.put(routes.content_item(JobType.Radarr, api.url, 99), {})
+
+        with pytest.raises(Exception, match="404"):
+            api.put(routes.tag(JobType.Radarr, api.url), {})
+
+
+def test_stub_deletes_content(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Radarr, size=3)
+
+    with Api(job_type=JobType.Radarr, url=server.url, api_key="stub") as api:
+        item = api.content()[-1]
+
+        assert api.delete(item)
+        assert [record["id"] for record in server.library.content] == [1, 2]
+
+        with pytest.raises(Exception, match="404"):
+            api.delete(item)
+
+        response = api._request("DELETE", url=routes.tag(JobType.Radarr, api.url))
+
+        assert response.status_code == 404
+
+        # Ids of deleted items are not handed out again
+        assert api.save(item)
+        assert server.library.content[-1]["id"] == 4
+
+
+def test_stub_monitors_albums(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Lidarr, size=2)
+
+    with Api(job_type=JobType.Lidarr, url=server.url, api_key="stub") as api:
+        albums = api.album()
+
+        assert len(albums) == 6
+        assert {album.artist_id for album in albums} == {1, 2}
+
+        assert len(api.monitor_albums([1, 2], True)) == 2
+        assert len(api.monitor_albums([2, 3], False)) == 2
+        assert [album.monitored for album in api.album()[:3]] == [True, False, False]
+
+
+def test_stub_creates_tags(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Sonarr)
+
+    with Api(job_type=JobType.Sonarr, url=server.url, api_key="stub") as api:
+        assert api.create_tag("new").id == 5
+        assert len(api.tag()) == 5
+
+        with pytest.raises(Exception, match="400"):
+            api.create_tag("new")
+
+
+def test_stub_unknown_routes(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Radarr)
+
+    with Api(job_type=JobType.Radarr, url=server.url, api_key="stub") as api:
+        with pytest.raises(Exception, match="404"):
+            api.get(routes.metadata(JobType.Lidarr, api.url))
+
+        with pytest.raises(Exception, match="404"):
+            api.get(routes.content_item(JobType.Radarr, api.url, 99))
+
+        with pytest.raises(Exception, match="404"):
+            api.post(routes.profile(JobType.Radarr, api.url), {})
+
+
+def test_stub_requires_api_key(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Radarr)
+
+    with Api(job_type=JobType.Radarr, url=server.url, api_key="wrong") as api:
+        with pytest.raises(Exception, match="401"):
+            api.status()
+
+
+def test_stub_error_rate(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Sonarr, error_rate=1.0)
+
+    with Api(job_type=JobType.Sonarr, url=server.url, api_key="stub") as api:
+        with pytest.raises(Exception, match="503"):
+            api.status()
+
+
+def test_stub_rate_limit_and_latency(create_stub_server: CreateStubServer) -> None:
+    server = create_stub_server(JobType.Sonarr, rate_limit=1, latency=0.01)
+
+    response = requests.get(routes.status(JobType.Sonarr, server.url))
+    assert response.status_code == 401
+
+    response = requests.get(routes.status(JobType.Sonarr, server.url))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    assert server.request_count == 2
+
+
+def test_stub_rate_limiter(mocker: MockerFixture) -> None:
+    mock_monotonic = mocker.patch("arrsync.stub.time.monotonic")
+    mock_monotonic.return_value = 0.0
+
+    limiter = StubRateLimiter(2)
+
+    assert limiter.allow()
+    assert limiter.allow()
+    assert not limiter.allow()
+
+    mock_monotonic.return_value = 0.5
+
+    assert limiter.allow()
+    assert not limiter.allow()
+
+    assert StubRateLimiter(0).allow()
+
+
+def test_stub_rate_limiter_below_one(mocker: MockerFixture) -> None:
+    mock_monotonic = mocker.patch("arrsync.stub.time.monotonic")
+    mock_monotonic.return_value = 0.0
+
+    limiter = StubRateLimiter(0.5)
+
+    assert limiter.allow()
+    assert not limiter.allow()
+
+    mock_monotonic.return_value = 1.1
+
+    assert not limiter.allow()
+
+    mock_monotonic.return_value = 2.1
+
+    assert limiter.allow()
+
+
+def test_stub_options_defaults() -> None:
+    options = StubOptions(job_type=JobType.Lidarr)
+
+    assert options.size == 100
+    assert options.error_rate == 0
+    assert get_id_alias(JobType.Lidarr) == "foreignArtistId"
+
+    with pytest.raises(Exception):
+        get_id_alias(None)  # type: ignore[arg-type]
+
+    with pytest.raises(Exception):
+        create_content_record(None, 1, random.Random())  # type: ignore[arg-type]
+
+    with pytest.raises(Exception):
+        get_root_folder_path(None)  # type: ignore[arg-type]
+
+
+def test_stub_main(mocker: MockerFixture) -> None:
+    mock_serve_forever = mocker.patch("arrsync.stub.StubServer.serve_forever")
+    mock_serve_forever.side_effect = KeyboardInterrupt()
+
+    main(["--type", "radarr", "--port", "0", "--size", "1"])
+
+    mock_serve_forever.assert_called_once()
@@ -7,24 +7,36 @@ import pytest
 from pytest_mock.plugin import MockerFixture
 from tests.conftest import CreateContentItem
 
-from arrsync.common import JobType, Profile, Tag
+from arrsync.common import (
+    Index,
+    JobType,
+    LidarrContent,
+    Profile,
+    RadarrContent,
+    SonarrContent,
+    Tag,
+)
 from arrsync.utils import (
     find_ids_in_list,
     find_in_list,
     find_in_list_with_fallback,
     first_in_list,
+    get_content_model,
     get_debug_title,
+    get_file_name,
     get_search_missing_attribute,
 )
 
 
 def test_find_job_tags() -> None:
-    tags = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    tags = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     tag_list = ["1", "tag 4"]
 
@@ -34,13 +46,28 @@ def test_find_job_tags() -> None:
     assert "4" in found_tag_ids
 
 
+def test_find_job_tags_duplicate_names() -> None:
+    tags = Index(
+        [
+            Tag(label="kids", id=1),
+            Tag(label="Kids", id=2),
+            Tag(label="anime", id=3),
+        ]
+    )
+
+    # Every tag with the name is matched, as a scan of the list would
+    assert find_ids_in_list(tags, ["kids", "2"]) == ["1", "2"]
+
+
 def test_find_job_profiles() -> None:
-    profiles = [
-        Profile(name="Profile 1", id=1),
-        Profile(name="Profile 2", id=2),
-        Profile(name="Profile 3", id=3),
-        Profile(name="Profile 4", id=4),
-    ]
+    profiles = Index(
+        [
+            Profile(name="Profile 1", id=1),
+            Profile(name="Profile 2", id=2),
+            Profile(name="Profile 3", id=3),
+            Profile(name="Profile 4", id=4),
+        ]
+    )
 
     profile_list = ["1", "profile 4"]
 
@@ -61,12 +88,14 @@ def test_find_job_profiles() -> None:
     ],
 )
 def test_find_job_profile(query: str, result: Profile | None) -> None:
-    profiles = [
-        Profile(name="Profile 1", id=1),
-        Profile(name="Profile 2", id=2),
-        Profile(name="Profile 3", id=3),
-        Profile(name="Profile 4", id=4),
-    ]
+    profiles = Index(
+        [
+            Profile(name="Profile 1", id=1),
+            Profile(name="Profile 2", id=2),
+            Profile(name="Profile 3", id=3),
+            Profile(name="Profile 4", id=4),
+        ]
+    )
 
     found_profile = find_in_list(profiles, query)
 
@@ -84,12 +113,14 @@ def test_find_job_profile(query: str, result: Profile | None) -> None:
     ],
 )
 def test_find_job_tag(query: str, result: Tag | None) -> None:
-    profiles = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    profiles = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     found_profile = find_in_list(profiles, query)
 
@@ -97,12 +128,14 @@ def test_find_job_tag(query: str, result: Tag | None) -> None:
 
 
 def test_first_in_list() -> None:
-    profiles = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    profiles = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     assert first_in_list(profiles) == profiles[0]
 
@@ -110,17 +143,19 @@ def test_first_in_list() -> None:
 def test_find_in_list_with_fallback(mocker: MockerFixture) -> None:
     mock_warnring = mocker.patch("arrsync.utils.logger.warning")
 
-    profiles = [
-        Tag(label="Tag 1", id=1),
-        Tag(label="Tag 2", id=2),
-        Tag(label="Tag 3", id=3),
-        Tag(label="Tag 4", id=4),
-    ]
+    profiles = Index(
+        [
+            Tag(label="Tag 1", id=1),
+            Tag(label="Tag 2", id=2),
+            Tag(label="Tag 3", id=3),
+            Tag(label="Tag 4", id=4),
+        ]
+    )
 
     assert find_in_list_with_fallback(profiles, "3") == profiles[2]
     assert find_in_list_with_fallback(profiles, "100", "tags") == profiles[0]
     mock_warnring.assert_called_once()
-    assert find_in_list_with_fallback([], "0") is None
+    assert find_in_list_with_fallback(Index(), "0") is None
 
 
 @pytest.mark.parametrize(
@@ -145,3 +180,22 @@ def test_get_debug_title(
     create_content_item: CreateContentItem,
 ) -> None:
     assert get_debug_title(create_content_item(job_type)) == "Item 1"
+
+
+@pytest.mark.parametrize(
+    "job_type,expected,excpetion",
+    [
+        (JobType.Sonarr, SonarrContent, does_not_raise()),
+        (JobType.Radarr, RadarrContent, does_not_raise()),
+        (JobType.Lidarr, LidarrContent, does_not_raise()),
+        (None, None, pytest.raises(Exception)),
+    ],
+)
+def test_get_content_model(job_type: JobType, expected: Any, excpetion: Any) -> None:
+    with excpetion:
+        assert get_content_model(job_type) is expected
+
+
+def test_get_file_name() -> None:
+    assert get_file_name("sonarr-remote") == "sonarr-remote"
+    assert get_file_name("a/b c") == "a_b_c"